@@ -1,14 +1,16 @@
 import streamlit as st
 import json
 import logging
-from datetime import datetime
 import os
 from dotenv import load_dotenv
-import hashlib
 from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, SystemMessage
 import traceback
 
+from context_builder import ContextBuilder, make_message
+from history_store import HistoryStore, new_conversation_id
+from summary_memory import Summarizer
+from user_store import UserStore
+
 # === LOGGING SETUP (Production Requirement) ===
 logging.basicConfig(
     level=logging.INFO,
@@ -21,45 +23,34 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 # === CONFIG ===
-USERS_FILE = "users.json"
+USERS_FILE = "users.json"  # legacy, imported into USERS_DB on first start
+USERS_DB = "users/accounts.db"
+HISTORY_DB = "users/history.db"
+CONTEXT_TOKEN_BUDGET = 4000  # estimated input tokens per call, system prompt included
 with open("system_prompt.txt", "r") as f:
     system_prompt = f.read().strip()
+context_builder = ContextBuilder(system_prompt, CONTEXT_TOKEN_BUDGET)
 
 
 # === USER MANAGEMENT ===
-def hash_password(password):
-    return hashlib.sha256(password.encode()).hexdigest()
+@st.cache_resource
+def get_user_store():
+    """One store per server process; the password KDF is calibrated once, here."""
+    return UserStore(USERS_DB, legacy_file=USERS_FILE)
 
 def get_user_dir(username):
     user_dir = f"users/{username}"
     os.makedirs(user_dir, exist_ok=True)
     return user_dir
 
-def get_user_history_file(username):
-    return f"users/{username}/history.json"
-
-def load_users():
-    if os.path.exists(USERS_FILE):
-        with open(USERS_FILE, "r") as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    with open(USERS_FILE, "w") as f:
-        json.dump(users, f, indent=2)
-
 def register_user(username, password):
-    users = load_users()
-    if username in users:
+    if not get_user_store().register(username, password):
         return False
     get_user_dir(username)
-    users[username] = hash_password(password)
-    save_users(users)
     return True
 
 def login_user(username, password):
-    users = load_users()
-    return username in users and users[username] == hash_password(password)
+    return get_user_store().login(username, password)
 
 load_dotenv()
 # === GEMINI API MODULE ===
@@ -80,42 +71,70 @@ def safe_generate(model, messages):
         return [{"content": "Sorry, I'm having technical issues. Please try again."}]
 
 # === MEMORY MANAGEMENT ===
+@st.cache_resource
+def get_history_store():
+    """One store per server process, shared by every session."""
+    store = HistoryStore(HISTORY_DB)
+    store.start_compactor()
+    return store
+
+@st.cache_resource
+def get_summarizer():
+    """Background summarizer for messages that age out of the context window."""
+    return Summarizer(get_history_store(), context_builder)
+
+def history_file_key():
+    """(mtime, size) of the history database and its WAL; changes whenever any process writes."""
+    key = []
+    for path in (HISTORY_DB, HISTORY_DB + "-wal"):
+        try:
+            stat = os.stat(path)
+            key.append((stat.st_mtime_ns, stat.st_size))
+        except OSError:
+            key.append(None)
+    return tuple(key)
+
 def load_user_history(username):
-    history_file = get_user_history_file(username)
-    if os.path.exists(history_file):
-        with open(history_file, "r") as f:
-            return json.load(f)
-    return []
+    """Conversation list (ids, timestamps, message counts); messages load when one is opened.
+
+    Cached in the session and reused across reruns until the history files change.
+    """
+    key = (username, history_file_key())
+    cache = st.session_state.get("history_cache")
+    if cache is None or cache["key"] != key:
+        cache = {"key": key, "history": get_history_store().list_conversations(username), "download": None}
+        st.session_state.history_cache = cache
+    return cache["history"]
+
+def history_download(username):
+    """The full history as JSON, built once per history version (only after the user asks for it)."""
+    load_user_history(username)
+    cache = st.session_state.history_cache
+    if cache["download"] is None:
+        cache["download"] = json.dumps(get_history_store().export(username), indent=2)
+    return cache["download"]
 
 def save_user_conversation(username):
-    history_file = get_user_history_file(username)
-    history = load_user_history(username)
-    
-    new_conversation = {
-        "id": datetime.now().strftime("%Y%m%d_%H%M%S"),
-        "timestamp": datetime.now().isoformat(),
-        "username": username,
-        "messages": st.session_state.messages.copy()
-    }
-    
-    history.append(new_conversation)
-    history = history[-10:]  # Keep last 10 conversations
-    
-    os.makedirs(os.path.dirname(history_file), exist_ok=True)
-    with open(history_file, "w") as f:
-        json.dump(history, f, indent=2)
+    """Append the messages added since the last save to the current conversation."""
+    if not st.session_state.get("conversation_id"):
+        st.session_state.conversation_id = new_conversation_id()
+    written = get_history_store().save_messages(
+        username, st.session_state.conversation_id, st.session_state.messages
+    )
+    st.session_state.pop("history_cache", None)
+    return written
 
 def build_conversation_context():
-    """Build context with token optimization"""
-    messages = [SystemMessage(content=system_prompt)]
-    
-    # Limit to last 20 messages (10 exchanges)
-    for msg in st.session_state.messages[-20:]:
-        if msg["role"] == "user":
-            messages.append(HumanMessage(content=msg["content"]))
-        elif msg["role"] == "assistant":
-            messages.append(HumanMessage(content=msg["content"]))  # Fixed: Use AIMessage
-    
+    """System prompt, the rolling summary of older turns, and the newest messages that fit in CONTEXT_TOKEN_BUDGET"""
+    summary = None
+    if st.session_state.get("conversation_id"):
+        summary = get_history_store().load_summary(st.session_state.username, st.session_state.conversation_id)
+    messages, stats = context_builder.build(st.session_state.messages, summary)
+    st.session_state.last_context = stats
+    logger.info(
+        f"Context - User: {st.session_state.username}, Input tokens: ~{stats['input_tokens']} of {stats['budget_tokens']}, "
+        f"Messages: {stats['messages']}, Summarized: {stats['summarized']}, Dropped: {stats['dropped']}"
+    )
     return messages
 
 # === SESSION INIT ===
@@ -125,6 +144,10 @@ if "username" not in st.session_state:
     st.session_state.username = None
 if "messages" not in st.session_state:
     st.session_state.messages = []
+if "conversation_id" not in st.session_state:
+    st.session_state.conversation_id = None
+if "opened_conversation" not in st.session_state:
+    st.session_state.opened_conversation = None
 if "google_api_key" not in st.session_state:
     st.session_state.google_api_key = os.getenv("GOOGLE_API_KEY")
 
@@ -141,6 +164,7 @@ if not st.session_state.logged_in:
                 st.session_state.logged_in = True
                 st.session_state.username = username
                 st.session_state.messages = []
+                st.session_state.conversation_id = None
                 st.success("Login successful!")
                 st.rerun()
             else:
@@ -183,23 +207,23 @@ with st.sidebar:
     st.title(" Conversations")
     history = load_user_history(st.session_state.username)
     
-    session_options = ["New Conversation"]
-    for conv in history[-5:]:
-        conv_id = (conv.get('id') or conv.get('timestamp') or 'unknown')[:15] + "..."
-        session_options.append(conv_id)
-    
-    selected = st.selectbox("Select:", session_options)
-    if selected != "New Conversation":
-        session_id = selected.replace("...", "")
-        for conv in history:
-            conv_id = conv.get('id') or conv.get('timestamp') or ''
-            if session_id in conv_id[:15]:
-                st.session_state.messages = conv["messages"].copy()
-                st.success("Loaded!")
-                break
+    session_options = ["New Conversation"] + [conv["id"] for conv in history[-5:]]
+    selected = st.selectbox(
+        "Select:", session_options,
+        format_func=lambda conv_id: conv_id if conv_id == "New Conversation" else conv_id[:15] + "..."
+    )
+    if selected == "New Conversation":
+        st.session_state.opened_conversation = None
+    elif selected != st.session_state.opened_conversation:
+        # Read the conversation's messages only when it is opened; later turns append to it
+        st.session_state.messages = get_history_store().load_messages(st.session_state.username, selected)
+        st.session_state.conversation_id = selected
+        st.session_state.opened_conversation = selected
+        st.success("Loaded!")
     
     if st.button(" Clear Chat"):
         st.session_state.messages = []
+        st.session_state.conversation_id = None
         st.rerun()
     
     if st.button(" Logout"):
@@ -208,13 +232,19 @@ with st.sidebar:
         st.rerun()
     
     # Download History
+    # The export reads every message, so it is built on request instead of on every rerun
     if history:
-        st.download_button(
-            "Download History",
-            data=json.dumps(history, indent=2),
-            file_name=f"{st.session_state.username}_history.json",
-            mime="application/json"
-        )
+        if st.session_state.history_cache["download"] is None:
+            if st.button("Prepare Download"):
+                history_download(st.session_state.username)
+                st.rerun()
+        else:
+            st.download_button(
+                "Download History",
+                data=history_download(st.session_state.username),
+                file_name=f"{st.session_state.username}_history.json",
+                mime="application/json"
+            )
 
 # === CHAT DISPLAY ===
 for message in st.session_state.messages:
@@ -227,7 +257,7 @@ if user_prompt:
     logger.info(f"New message from {st.session_state.username}: {user_prompt[:50]}")
     
     # Add user message
-    st.session_state.messages.append({"role": "user", "content": user_prompt})
+    st.session_state.messages.append(make_message("user", user_prompt))
     with st.chat_message("user"):
         st.markdown(user_prompt)
     
@@ -239,16 +269,27 @@ if user_prompt:
             
             response_container = st.empty()
             full_response = ""
+            usage = None
             
             stream = safe_generate(model, messages_with_context)
             for chunk in stream:
+                if getattr(chunk, 'usage_metadata', None):
+                    usage = chunk.usage_metadata
                 if hasattr(chunk, 'content') and chunk.content:
                     full_response += chunk.content
                     response_container.markdown(full_response + "▌")
             
             response_container.markdown(full_response)
-            st.session_state.messages.append({"role": "assistant", "content": full_response})
+            if usage:
+                logger.info(
+                    f"Token usage - User: {st.session_state.username}, Input: {usage.get('input_tokens')}, "
+                    f"Output: {usage.get('output_tokens')}"
+                )
+            st.session_state.messages.append(make_message("assistant", full_response))
     
     # Save conversation
     save_user_conversation(st.session_state.username)
     logger.info(f"Response saved for {st.session_state.username}, length: {len(full_response)}")
+    get_summarizer().schedule(
+        model, st.session_state.username, st.session_state.conversation_id, st.session_state.messages
+    )
@@ -0,0 +1,117 @@
+"""
+Token-budgeted conversation context for the Blog Assistant.
+
+Every message carries its token count, computed once when the message is
+created (`make_message`) and stored with it in the history store.
+`ContextBuilder.build` then fills a token budget from the newest message
+backwards: the system prompt is always sent, and older messages are added
+while they fit. The window is contiguous, so the model never sees a turn
+without the turns after it.
+
+With a rolling summary (summary_memory.py), the first `through` messages
+are replaced by the summary, appended to the system prompt, and the window
+is filled from the messages after them. `to_summarize` tells the
+summarizer which messages have aged out of the window and should be folded
+in: once the unsummarized messages pass `summarize_at` of the budget
+(leaving room for the user's next message), everything older than the
+newest `keep_ratio` of it, so one summary call covers several turns.
+
+Token counts are estimates (CHARS_PER_TOKEN characters per token plus a
+per-message overhead for the role markers). Gemini's tokenizer is only
+available through an API call, and the estimate is close enough to budget
+with. The actual input tokens of each call are logged from the response's
+usage metadata.
+
+Usage:
+    builder = ContextBuilder(system_prompt, budget_tokens=4000)
+    st.session_state.messages.append(make_message("user", prompt))
+    messages, stats = builder.build(st.session_state.messages)
+    stats   # {"input_tokens": 1834, "budget_tokens": 4000, "messages": 12, "summarized": 30, "dropped": 0}
+    messages, stats = builder.build(st.session_state.messages, summary={"text": "...", "through": 30})
+"""
+
+import math
+
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+CHARS_PER_TOKEN = 4
+MESSAGE_OVERHEAD_TOKENS = 4
+SUMMARY_HEADER = "\n\nSummary of the earlier part of this conversation:\n"
+
+
+def count_tokens(text):
+    """Estimated tokens for one message with `text` as its content."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN) + MESSAGE_OVERHEAD_TOKENS
+
+
+def make_message(role, content):
+    """A chat message with its token count, counted once here."""
+    return {"role": role, "content": content, "tokens": count_tokens(content)}
+
+
+def message_tokens(message):
+    tokens = message.get("tokens")
+    if tokens is None:  # saved before token counts were stored
+        tokens = message["tokens"] = count_tokens(message["content"])
+    return tokens
+
+
+def select_window(messages, budget_tokens):
+    """(newest messages that fit in `budget_tokens`, tokens they use); the last message is always kept."""
+    used = 0
+    start = len(messages)
+    while start > 0:
+        cost = message_tokens(messages[start - 1])
+        if used + cost > budget_tokens and start < len(messages):
+            break
+        used += cost
+        start -= 1
+    return messages[start:], used
+
+
+def to_langchain(message):
+    if message["role"] == "assistant":
+        return AIMessage(content=message["content"])
+    return HumanMessage(content=message["content"])
+
+
+class ContextBuilder:
+    def __init__(self, system_prompt, budget_tokens=4000, summarize_at=0.75, keep_ratio=0.5):
+        self.system_prompt = system_prompt
+        self.budget_tokens = budget_tokens
+        self.summarize_at = summarize_at
+        self.keep_ratio = keep_ratio
+
+    def _system_text(self, summary):
+        if summary is None:
+            return self.system_prompt
+        return self.system_prompt + SUMMARY_HEADER + summary["text"]
+
+    def build(self, messages, summary=None):
+        """(LangChain messages to send, token stats for this call); `summary` stands in for messages[:through]."""
+        system_text = self._system_text(summary)
+        system_tokens = count_tokens(system_text)
+        through = summary["through"] if summary else 0
+        recent = messages[through:]
+        window, used = select_window(recent, max(self.budget_tokens - system_tokens, 0))
+        context = [SystemMessage(content=system_text)] + [to_langchain(m) for m in window]
+        stats = {
+            "input_tokens": system_tokens + used,
+            "budget_tokens": self.budget_tokens,
+            "messages": len(window),
+            "summarized": through,
+            "dropped": len(recent) - len(window),
+        }
+        return context, stats
+
+    def to_summarize(self, messages, summary=None):
+        """(start, end) of the messages to fold into the summary, or None while the unsummarized ones fit comfortably."""
+        available = max(self.budget_tokens - count_tokens(self._system_text(summary)), 0)
+        through = summary["through"] if summary else 0
+        recent = messages[through:]
+        if sum(message_tokens(m) for m in recent) <= available * self.summarize_at:
+            return None
+        keep, _ = select_window(recent, int(available * self.keep_ratio))
+        if len(keep) == len(recent):
+            return None  # a single message larger than the budget; nothing older to fold in
+        return through, len(messages) - len(keep)
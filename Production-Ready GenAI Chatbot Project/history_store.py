@@ -0,0 +1,266 @@
+"""
+Conversation history store for the Blog Assistant (SQLite, WAL mode).
+
+Each chat turn writes only the messages that are new since the last save,
+appended to the conversation's rows and upserted by conversation id, so a
+save costs O(new messages) instead of rewriting the user's whole history file.
+
+ - conversations: one row per conversation (id, username, timestamps, message_count,
+                  plus the rolling summary of its first summarized_through messages)
+ - messages:      one row per message (conversation_id, seq, role, content, tokens)
+
+Reads are lazy: the sidebar lists conversation metadata only, and a
+conversation's messages are read when it is opened. A background thread
+compacts the store: it keeps the newest KEEP_CONVERSATIONS conversations per
+user, reclaims free pages and checkpoints the write-ahead log.
+
+Legacy users/<name>/history.json files (lists of full-conversation snapshots)
+are imported on first access. Snapshots that are a prefix of the next one
+are dropped as duplicates, and the file is renamed to history.json.migrated.
+
+Usage:
+    store = HistoryStore("users/history.db")
+    store.start_compactor()
+    store.save_messages("alice", conversation_id, st.session_state.messages)
+    store.list_conversations("alice")          # [{"id", "timestamp", "updated_at", "message_count"}, ...]
+    store.load_messages("alice", conversation_id)
+    store.load_summary("alice", conversation_id)   # {"text", "through"} or None
+    store.export("alice")                      # full history, in the old history.json layout
+"""
+
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+KEEP_CONVERSATIONS = 10
+COMPACT_INTERVAL_S = 300
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id            TEXT PRIMARY KEY,
+    username      TEXT NOT NULL,
+    created_at    TEXT NOT NULL,
+    updated_at    TEXT NOT NULL,
+    message_count INTEGER NOT NULL DEFAULT 0,
+    summary       TEXT,
+    summarized_through INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS conversations_by_user ON conversations (username, updated_at);
+CREATE TABLE IF NOT EXISTS messages (
+    conversation_id TEXT NOT NULL REFERENCES conversations (id) ON DELETE CASCADE,
+    seq             INTEGER NOT NULL,
+    role            TEXT NOT NULL,
+    content         TEXT NOT NULL,
+    tokens          INTEGER,
+    created_at      TEXT NOT NULL,
+    PRIMARY KEY (conversation_id, seq)
+) WITHOUT ROWID;
+"""
+# Columns added since the first release; older stores gain them when opened
+_ADDED_COLUMNS = [
+    ("messages", "tokens", "INTEGER"),
+    ("conversations", "summary", "TEXT"),
+    ("conversations", "summarized_through", "INTEGER NOT NULL DEFAULT 0"),
+]
+
+
+def new_conversation_id():
+    """Timestamp id (the sidebar shows its first 15 characters) with microseconds to keep it unique."""
+    return datetime.now().strftime("%Y%m%d_%H%M%S_%f")
+
+
+class HistoryStore:
+    def __init__(self, path="users/history.db", keep_conversations=KEEP_CONVERSATIONS, legacy_dir="users"):
+        self.path = path
+        self.keep_conversations = keep_conversations
+        self.legacy_dir = legacy_dir
+        self._local = threading.local()
+        self._migrated = set()
+        self._migrate_lock = threading.Lock()
+        self._compactor = None
+        self._stop = threading.Event()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        conn = self._conn()
+        # auto_vacuum only takes effect before the first table is created
+        conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        conn.executescript(_SCHEMA)
+        for table, column, decl in _ADDED_COLUMNS:
+            if column not in [row["name"] for row in conn.execute(f"PRAGMA table_info({table})")]:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {decl}")
+
+    def _conn(self):
+        """One connection per thread (Streamlit runs each session's script in its own thread)."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    # === WRITES ===
+    def save_messages(self, username, conversation_id, messages):
+        """Append messages[stored count:] to the conversation, creating it if needed. Returns rows written."""
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT username, message_count FROM conversations WHERE id = ?", (conversation_id,)
+            ).fetchone()
+            if row is not None and row["username"] != username:
+                raise ValueError(f"Conversation {conversation_id} belongs to another user")
+            stored = row["message_count"] if row is not None else 0
+            new = messages[stored:]
+            conn.execute(
+                "INSERT INTO conversations (id, username, created_at, updated_at, message_count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (id) DO UPDATE SET updated_at = excluded.updated_at, message_count = excluded.message_count",
+                (conversation_id, username, now, now, stored + len(new)),
+            )
+            conn.executemany(
+                "INSERT INTO messages (conversation_id, seq, role, content, tokens, created_at) VALUES (?, ?, ?, ?, ?, ?)",
+                [(conversation_id, stored + i, m["role"], m["content"], m.get("tokens"), now) for i, m in enumerate(new)],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return len(new)
+
+    def save_summary(self, username, conversation_id, summary, through):
+        """Store the summary of messages[:through]; False if a summary covering as much is already stored."""
+        return self._conn().execute(
+            "UPDATE conversations SET summary = ?, summarized_through = ? "
+            "WHERE id = ? AND username = ? AND summarized_through < ?",
+            (summary, through, conversation_id, username, through),
+        ).rowcount > 0
+
+    # === READS ===
+    def list_conversations(self, username, limit=None):
+        """Conversation metadata for `username`, oldest first (no message bodies)."""
+        self._migrate_legacy(username)
+        rows = self._conn().execute(
+            "SELECT id, created_at, updated_at, message_count FROM conversations "
+            "WHERE username = ? ORDER BY updated_at DESC, id DESC LIMIT ?",
+            (username, -1 if limit is None else limit),
+        ).fetchall()
+        return [
+            {"id": r["id"], "timestamp": r["created_at"], "updated_at": r["updated_at"], "message_count": r["message_count"]}
+            for r in reversed(rows)
+        ]
+
+    def load_messages(self, username, conversation_id):
+        rows = self._conn().execute(
+            "SELECT m.role, m.content, m.tokens FROM messages m JOIN conversations c ON c.id = m.conversation_id "
+            "WHERE c.id = ? AND c.username = ? ORDER BY m.seq",
+            (conversation_id, username),
+        ).fetchall()
+        messages = []
+        for r in rows:
+            message = {"role": r["role"], "content": r["content"]}
+            if r["tokens"] is not None:
+                message["tokens"] = r["tokens"]
+            messages.append(message)
+        return messages
+
+    def load_summary(self, username, conversation_id):
+        """{"text", "through"} for the conversation, or None before anything has been summarized."""
+        row = self._conn().execute(
+            "SELECT summary, summarized_through FROM conversations WHERE id = ? AND username = ?",
+            (conversation_id, username),
+        ).fetchone()
+        if row is None or row["summary"] is None:
+            return None
+        return {"text": row["summary"], "through": row["summarized_through"]}
+
+    def export(self, username):
+        """Every conversation with its messages, in the history.json layout."""
+        return [
+            {
+                "id": conv["id"],
+                "timestamp": conv["timestamp"],
+                "username": username,
+                "messages": self.load_messages(username, conv["id"]),
+            }
+            for conv in self.list_conversations(username)
+        ]
+
+    # === LEGACY IMPORT ===
+    def _migrate_legacy(self, username):
+        if username in self._migrated:
+            return
+        with self._migrate_lock:
+            legacy = os.path.join(self.legacy_dir, username, "history.json")
+            if username not in self._migrated and os.path.exists(legacy):
+                try:
+                    self.import_legacy(username, legacy)
+                    os.replace(legacy, legacy + ".migrated")
+                except (OSError, ValueError) as e:
+                    logger.error(f"History import failed for {username}: {e}")
+                    return
+            self._migrated.add(username)
+
+    def import_legacy(self, username, path):
+        """Import a history.json of conversation snapshots, skipping snapshots a later one extends."""
+        with open(path, "r") as f:
+            snapshots = json.load(f)
+        kept = []
+        for snapshot in snapshots:
+            messages = snapshot.get("messages") or []
+            if kept and messages[:len(kept[-1]["messages"])] == kept[-1]["messages"]:
+                kept[-1] = snapshot  # the same chat, saved again with more messages
+            elif messages:
+                kept.append(snapshot)
+        for snapshot in kept:
+            conversation_id = snapshot.get("id") or new_conversation_id()
+            if self._conn().execute("SELECT 1 FROM conversations WHERE id = ?", (conversation_id,)).fetchone():
+                conversation_id = f"{conversation_id}_{username}"
+            self.save_messages(username, conversation_id, snapshot["messages"])
+            stamp = snapshot.get("timestamp") or datetime.now().isoformat()
+            self._conn().execute(
+                "UPDATE conversations SET created_at = ?, updated_at = ? WHERE id = ?", (stamp, stamp, conversation_id)
+            )
+        logger.info(f"Imported {len(kept)} of {len(snapshots)} history snapshots for {username} from {path}")
+
+    # === COMPACTION ===
+    def compact(self):
+        """Drop conversations beyond the newest `keep_conversations` per user, then reclaim space."""
+        conn = self._conn()
+        started = time.perf_counter()
+        deleted = conn.execute(
+            "DELETE FROM conversations WHERE id IN ("
+            " SELECT id FROM (SELECT id, ROW_NUMBER() OVER (PARTITION BY username ORDER BY updated_at DESC, id DESC) AS n"
+            " FROM conversations) WHERE n > ?)",
+            (self.keep_conversations,),
+        ).rowcount
+        conn.execute("PRAGMA incremental_vacuum")
+        conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+        if deleted:
+            logger.info(f"History compaction: removed {deleted} old conversations in {time.perf_counter() - started:.3f}s")
+        return deleted
+
+    def start_compactor(self, interval_s=COMPACT_INTERVAL_S):
+        if self._compactor is not None:
+            return
+
+        def run():
+            while not self._stop.wait(interval_s):
+                try:
+                    self.compact()
+                except sqlite3.Error as e:
+                    logger.error(f"History compaction failed: {e}")
+
+        self._compactor = threading.Thread(target=run, name="history-compactor", daemon=True)
+        self._compactor.start()
+
+    def stop(self):
+        self._stop.set()
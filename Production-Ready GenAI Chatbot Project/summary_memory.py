@@ -0,0 +1,90 @@
+"""
+Rolling summary memory for long Blog Assistant conversations.
+
+Messages that age out of the context window are folded into a running
+summary of the conversation. The summary is stored with the conversation in
+the history store (conversations.summary / summarized_through), and
+ContextBuilder sends it in place of those turns, so the prompt stays within
+its budget however long the chat gets.
+
+Summarizing is an extra model call. It runs on a background thread after the
+response has streamed and been saved, so it never delays a reply, and it
+usually finishes before the user's next message. Each call sees only the
+previous summary and the newly aged-out messages, and at most one call per
+conversation is in flight.
+
+Usage:
+    summarizer = Summarizer(history_store, context_builder)
+    summarizer.schedule(model, "alice", conversation_id, st.session_state.messages)
+    summary = history_store.load_summary("alice", conversation_id)
+    messages, stats = context_builder.build(st.session_state.messages, summary)
+"""
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from langchain_core.messages import HumanMessage, SystemMessage
+
+from context_builder import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_WORDS = 250
+SUMMARY_INSTRUCTIONS = (
+    "You keep a running summary of a conversation between a blogger and their writing assistant. "
+    "Update the summary with the new messages. Keep the blog's topic and audience, names, decisions, "
+    "ideas the user liked or rejected, key points of drafts, and open requests; drop greetings and repetition. "
+    f"Reply with the updated summary only, in at most {SUMMARY_WORDS} words."
+)
+
+
+def summarize(model, previous, messages):
+    """The previous summary updated with `messages`, in one model call."""
+    transcript = "\n\n".join(f"{m['role'].capitalize()}: {m['content']}" for m in messages)
+    prompt = f"Current summary:\n{previous or '(none yet)'}\n\nNew messages:\n{transcript}"
+    reply = model.invoke([SystemMessage(content=SUMMARY_INSTRUCTIONS), HumanMessage(content=prompt)])
+    return reply.content.strip()
+
+
+class Summarizer:
+    def __init__(self, store, builder, max_workers=2):
+        self.store = store
+        self.builder = builder
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="summarizer")
+        self._pending = set()
+        self._lock = threading.Lock()
+
+    def schedule(self, model, username, conversation_id, messages):
+        """Fold the messages that aged out of the window into the summary, in the background.
+
+        Returns the Future, or None when nothing needs summarizing (or a summary of this conversation is already running).
+        """
+        summary = self.store.load_summary(username, conversation_id)
+        span = self.builder.to_summarize(messages, summary)
+        if span is None:
+            return None
+        with self._lock:
+            if conversation_id in self._pending:
+                return None
+            self._pending.add(conversation_id)
+        start, end = span
+        return self._executor.submit(
+            self._run, model, username, conversation_id, summary["text"] if summary else "", list(messages[start:end]), end
+        )
+
+    def _run(self, model, username, conversation_id, previous, messages, through):
+        started = time.perf_counter()
+        try:
+            text = summarize(model, previous, messages)
+            if self.store.save_summary(username, conversation_id, text, through):
+                logger.info(
+                    f"Summary updated - Conversation: {conversation_id}, Through: {through}, "
+                    f"Tokens: ~{count_tokens(text)}, Time: {time.perf_counter() - started:.2f}s"
+                )
+        except Exception as e:
+            logger.error(f"Summary failed for {conversation_id}: {e}")
+        finally:
+            with self._lock:
+                self._pending.discard(conversation_id)
@@ -0,0 +1,215 @@
+"""
+User accounts for the Blog Assistant (SQLite, WAL mode).
+
+ - Lookup by username uses the table's primary-key index; no file is parsed per login.
+ - Registration is one INSERT. The primary key makes two concurrent
+   registrations of the same name fail cleanly instead of losing an update.
+ - Account records are cached in-process; a write to a username drops its entry.
+ - Passwords use scrypt (PBKDF2-SHA256 where OpenSSL lacks scrypt) with a random
+   salt. Its cost is calibrated once per process to about KDF_TARGET_MS and
+   logged. The parameters are stored in each hash, so hashes made under older
+   settings still verify and are upgraded on the next successful login.
+
+Legacy users.json ({username: sha256 hex}) is imported on first start and
+renamed to users.json.migrated. Those SHA-256 hashes are verified once and
+replaced by KDF hashes at the user's next login.
+
+Usage:
+    store = UserStore("users/accounts.db", legacy_file="users.json")
+    store.register("alice", "s3cret")     # False if the name is taken
+    store.login("alice", "s3cret")        # True / False
+    store.kdf_info                        # {"algorithm": "scrypt", "n": 16384, ..., "measured_ms": 78.1}
+"""
+
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+KDF_TARGET_MS = 100
+# scrypt memory is 128 * r * n bytes: 16 MB at the floor, 64 MB at the cap (mind small instances)
+SCRYPT_MIN_N = 2 ** 14
+SCRYPT_MAX_N = 2 ** 16
+SCRYPT_R = 8
+SCRYPT_P = 1
+PBKDF2_MIN_ITERATIONS = 600_000
+SALT_BYTES = 16
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username      TEXT PRIMARY KEY,
+    password_hash TEXT NOT NULL,
+    created_at    TEXT NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    return hashlib.scrypt(password.encode(), salt=salt, n=n, r=r, p=p, maxmem=256 * r * n, dklen=32)
+
+
+def _pbkdf2(password, salt, iterations):
+    return hashlib.pbkdf2_hmac("sha256", password.encode(), salt, iterations)
+
+
+def calibrate_kdf(target_ms=KDF_TARGET_MS):
+    """Cheapest KDF setting at or above `target_ms` on this machine (within the limits above), with its measured cost."""
+    if hasattr(hashlib, "scrypt"):
+        n = SCRYPT_MIN_N
+        while True:
+            started = time.perf_counter()
+            _scrypt("calibration", b"\0" * SALT_BYTES, n, SCRYPT_R, SCRYPT_P)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= target_ms or n >= SCRYPT_MAX_N:
+                return {"algorithm": "scrypt", "n": n, "r": SCRYPT_R, "p": SCRYPT_P, "measured_ms": round(elapsed_ms, 1)}
+            n *= 2
+    iterations = PBKDF2_MIN_ITERATIONS
+    started = time.perf_counter()
+    _pbkdf2("calibration", b"\0" * SALT_BYTES, iterations)
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    if elapsed_ms < target_ms:
+        # PBKDF2 cost is linear in iterations
+        iterations = int(iterations * target_ms / elapsed_ms)
+        elapsed_ms = target_ms
+    return {"algorithm": "pbkdf2_sha256", "iterations": iterations, "measured_ms": round(elapsed_ms, 1)}
+
+
+def hash_password(password, kdf):
+    """Encoded hash: scrypt$n$r$p$salt$hash or pbkdf2_sha256$iterations$salt$hash."""
+    salt = os.urandom(SALT_BYTES)
+    if kdf["algorithm"] == "scrypt":
+        digest = _scrypt(password, salt, kdf["n"], kdf["r"], kdf["p"])
+        return f"scrypt${kdf['n']}${kdf['r']}${kdf['p']}${_b64(salt)}${_b64(digest)}"
+    digest = _pbkdf2(password, salt, kdf["iterations"])
+    return f"pbkdf2_sha256${kdf['iterations']}${_b64(salt)}${_b64(digest)}"
+
+
+def verify_password(password, encoded):
+    """Check `password` against any hash this module (or the old SHA-256 scheme) produced."""
+    parts = encoded.split("$")
+    if parts[0] == "scrypt" and len(parts) == 6:
+        n, r, p = (int(x) for x in parts[1:4])
+        digest = _scrypt(password, base64.b64decode(parts[4]), n, r, p)
+        return hmac.compare_digest(digest, base64.b64decode(parts[5]))
+    if parts[0] == "pbkdf2_sha256" and len(parts) == 4:
+        digest = _pbkdf2(password, base64.b64decode(parts[2]), int(parts[1]))
+        return hmac.compare_digest(digest, base64.b64decode(parts[3]))
+    if len(encoded) == 64:  # legacy unsalted SHA-256 hex from users.json
+        return hmac.compare_digest(hashlib.sha256(password.encode()).hexdigest(), encoded)
+    return False
+
+
+def needs_rehash(encoded, kdf):
+    """True for legacy hashes and for hashes made with weaker settings than `kdf`."""
+    parts = encoded.split("$")
+    if kdf["algorithm"] == "scrypt":
+        return parts[0] != "scrypt" or int(parts[1]) < kdf["n"]
+    return parts[0] != "pbkdf2_sha256" or int(parts[1]) < kdf["iterations"]
+
+
+class UserStore:
+    def __init__(self, path="users/accounts.db", legacy_file=None, kdf=None):
+        self.path = path
+        self._local = threading.local()
+        self._cache = {}
+        self._cache_lock = threading.Lock()
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._conn().executescript(_SCHEMA)
+        self.kdf_info = kdf or calibrate_kdf()
+        logger.info(f"Password KDF: {self.kdf_info}")
+        # Verified against on unknown usernames so a failed login costs the same either way
+        self._dummy_hash = hash_password("dummy", self.kdf_info)
+        if legacy_file and os.path.exists(legacy_file):
+            self.import_legacy(legacy_file)
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def _password_hash(self, username):
+        with self._cache_lock:
+            cached = self._cache.get(username)
+        if cached is not None:
+            return cached
+        row = self._conn().execute("SELECT password_hash FROM users WHERE username = ?", (username,)).fetchone()
+        if row is None:
+            return None  # not cached: another process may register the name later
+        with self._cache_lock:
+            self._cache[username] = row[0]
+        return row[0]
+
+    def _invalidate(self, username):
+        with self._cache_lock:
+            self._cache.pop(username, None)
+
+    def exists(self, username):
+        return self._password_hash(username) is not None
+
+    def register(self, username, password):
+        """Create the account; False if the username is taken (checked atomically by the primary key)."""
+        encoded = hash_password(password, self.kdf_info)
+        try:
+            self._conn().execute(
+                "INSERT INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                (username, encoded, datetime.now().isoformat()),
+            )
+        except sqlite3.IntegrityError:
+            return False
+        self._invalidate(username)
+        return True
+
+    def login(self, username, password):
+        encoded = self._password_hash(username)
+        if encoded is None:
+            verify_password(password, self._dummy_hash)
+            return False
+        if not verify_password(password, encoded):
+            return False
+        if needs_rehash(encoded, self.kdf_info):
+            self._conn().execute(
+                "UPDATE users SET password_hash = ? WHERE username = ? AND password_hash = ?",
+                (hash_password(password, self.kdf_info), username, encoded),
+            )
+            self._invalidate(username)
+            logger.info(f"Upgraded password hash for {username}")
+        return True
+
+    def import_legacy(self, path):
+        """Import users.json ({username: sha256 hex}); existing accounts win."""
+        with open(path, "r") as f:
+            users = json.load(f)
+        now = datetime.now().isoformat()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            before = conn.total_changes
+            conn.executemany(
+                "INSERT OR IGNORE INTO users (username, password_hash, created_at) VALUES (?, ?, ?)",
+                [(name, digest, now) for name, digest in users.items()],
+            )
+            imported = conn.total_changes - before
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        os.replace(path, path + ".migrated")
+        logger.info(f"Imported {imported} of {len(users)} users from {path}")
+        return imported
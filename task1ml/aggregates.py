@@ -0,0 +1,329 @@
+"""
+Pre-aggregated sentiment rollups for product dashboards.
+
+Scored reviews are folded into additive summaries instead of being kept and
+rescanned. Every batch is reduced to one row per cell of
+
+    product x place x rating x month
+
+with additive measures (reviews, positive, helpfulness weight and weighted
+positive, up/down votes, rating and score sums), and added into the running
+cell table. The groupings dashboards ask for most (DEFAULT_ROLLUPS) are kept
+as their own running tables and updated the same way, so those queries read a
+few hundred rows; any other grouping is rolled up from the cell table, which
+grows with distinct cells rather than with reviews.
+
+Each batch's own cell table is kept under its batch_id (the scored file's
+path in the CLI). Ingesting the same batch_id again with a new `version` (the
+file was re-scored) subtracts the previous contribution before adding the new
+one, so a source is replaced, never counted twice.
+
+Helpfulness weight of a review is 1 + max(Up_Votes - Down_Votes, 0): every
+review counts once, and net helpful votes add to it. Rates are computed at
+query time from the sums, so rollups of rollups stay exact.
+
+Usage:
+    aggs = SentimentAggregates()
+    aggs.ingest(scored_df, batch_id="scored/tea_scored.csv", version="v1")   # Product, Place_of_Review,
+                    # Reviewer_Rating, Up_Votes, Down_Votes, Date_of_Review, label[, score]
+    aggs.ingest(rescored_df, batch_id="scored/tea_scored.csv", version="v2")  # replaces v1's rows
+    aggs.query(by=["product", "rating"])
+    aggs.query(by=["place"], filters={"product": "tea"}, top=10, sort="weighted_positive_rate")
+
+    python score_reviews.py --output-dir scored
+    python aggregates.py ingest scored/ --store aggregates.pkl   # bundled products' outputs only
+    python aggregates.py query --store aggregates.pkl --by product place --top 10
+"""
+
+import argparse
+import glob
+import os
+import pickle
+import sys
+import time
+from typing import Any, Dict, Iterable, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+from review_data import load_reviews
+
+DIMENSIONS = ("product", "place", "rating", "month")
+MEASURES = (
+    "reviews", "positive", "weight", "weighted_positive",
+    "up_votes", "down_votes", "rating_sum", "score_sum", "scored",
+)
+DEFAULT_ROLLUPS: Tuple[Tuple[str, ...], ...] = (
+    ("product",),
+    ("product", "rating"),
+    ("product", "place"),
+    ("product", "month"),
+    ("place",),
+)
+UNKNOWN = "unknown"
+_PLACE_PREFIX = r"^\s*Certified Buyer,\s*"
+
+
+def prepare_batch(df: pd.DataFrame, positive_label: str = "Positive") -> pd.DataFrame:
+    """Per-review dimensions and measures from a scored review frame."""
+    n = len(df)
+
+    def column(name: str, default: Any = None) -> pd.Series:
+        return df[name] if name in df else pd.Series([default] * n, index=df.index)
+
+    up = pd.to_numeric(column("Up_Votes", 0), errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    down = pd.to_numeric(column("Down_Votes", 0), errors="coerce").fillna(0).to_numpy(dtype=np.float64)
+    rating = pd.to_numeric(column("Reviewer_Rating"), errors="coerce")
+    score = pd.to_numeric(column("score"), errors="coerce")
+    positive = (column("label").astype(str) == positive_label).to_numpy(dtype=np.float64)
+    weight = 1.0 + np.maximum(up - down, 0.0)
+    month = pd.to_datetime(column("Date_of_Review"), errors="coerce").dt.strftime("%Y-%m")
+    place = column("Place_of_Review").astype("string").str.replace(_PLACE_PREFIX, "", regex=True).str.strip()
+
+    return pd.DataFrame({
+        "product": column("Product", UNKNOWN).astype("string").fillna(UNKNOWN).to_numpy(),
+        "place": place.fillna(UNKNOWN).replace("", UNKNOWN).to_numpy(),
+        "rating": rating.fillna(0).astype(int).to_numpy(),  # 0 = unknown
+        "month": month.fillna(UNKNOWN).to_numpy(),
+        "reviews": 1.0,
+        "positive": positive,
+        "weight": weight,
+        "weighted_positive": weight * positive,
+        "up_votes": up,
+        "down_votes": down,
+        "rating_sum": rating.fillna(0).to_numpy(dtype=np.float64),
+        "score_sum": score.fillna(0).to_numpy(dtype=np.float64),
+        "scored": score.notna().to_numpy(dtype=np.float64),
+    }, index=df.index)
+
+
+def _summarize(rows: pd.DataFrame, dims: Sequence[str]) -> pd.DataFrame:
+    return rows.groupby(list(dims), sort=False)[list(MEASURES)].sum()
+
+
+def with_rates(summary: pd.DataFrame) -> pd.DataFrame:
+    """Add positive_rate, weighted_positive_rate, mean_rating and mean_score columns."""
+    out = summary.copy()
+    reviews = out["reviews"].where(out["reviews"] > 0)
+    out["positive_rate"] = out["positive"] / reviews
+    out["weighted_positive_rate"] = out["weighted_positive"] / out["weight"].where(out["weight"] > 0)
+    out["mean_rating"] = out["rating_sum"] / reviews
+    out["mean_score"] = out["score_sum"] / out["scored"].where(out["scored"] > 0)
+    return out
+
+
+class SentimentAggregates:
+    """Running group-by summaries of scored reviews, updated one batch at a time."""
+
+    def __init__(self, rollups: Iterable[Sequence[str]] = DEFAULT_ROLLUPS):
+        self.rollups: Dict[Tuple[str, ...], Optional[pd.DataFrame]] = {}
+        for dims in rollups:
+            unknown = set(dims) - set(DIMENSIONS)
+            if unknown:
+                raise ValueError(f"Unknown rollup dimensions {sorted(unknown)}; expected {DIMENSIONS}")
+            self.rollups[tuple(dims)] = None
+        self.cells: Optional[pd.DataFrame] = None
+        # batch_id -> {"version", "rows", "cells"}: what each source contributed, so it can be retracted
+        self.batches: Dict[str, Dict[str, Any]] = {}
+        self.rows = 0
+        self._results: Dict[Any, pd.DataFrame] = {}
+
+    def _apply(self, batch_cells: pd.DataFrame, retract: bool = False) -> None:
+        """Add a batch's cells to every summary, or subtract them (dropping cells left without reviews)."""
+
+        def combine(current: Optional[pd.DataFrame], part: pd.DataFrame) -> pd.DataFrame:
+            if not retract:
+                return part if current is None else current.add(part, fill_value=0)
+            out = current.sub(part, fill_value=0)
+            return out[out["reviews"] > 0]
+
+        self.cells = combine(self.cells, batch_cells)
+        for dims, current in self.rollups.items():
+            # From the batch's cells, not its rows: same sums, far fewer rows to group
+            self.rollups[dims] = combine(current, batch_cells.groupby(level=list(dims), sort=False).sum())
+
+    def is_current(self, batch_id: str, version: Optional[str] = None) -> bool:
+        """True when `batch_id` was ingested at `version`, so ingesting it again would change nothing."""
+        previous = self.batches.get(batch_id)
+        return previous is not None and previous["version"] == version
+
+    def ingest(self, df: pd.DataFrame, batch_id: Optional[str] = None, version: Optional[str] = None) -> int:
+        """Fold a scored batch into every summary. Returns rows added.
+
+        A batch_id seen before at the same `version` is skipped; at another
+        version its previous contribution is subtracted first and replaced.
+        """
+        previous = self.batches.get(batch_id) if batch_id is not None else None
+        if previous is not None:
+            if previous["version"] == version:
+                return 0
+            if previous["cells"] is not None:
+                self._apply(previous["cells"], retract=True)
+            self.rows -= previous["rows"]
+        batch_cells = _summarize(prepare_batch(df), DIMENSIONS) if len(df) else None
+        if batch_cells is not None:
+            self._apply(batch_cells)
+        self.rows += len(df)
+        if batch_id is not None:
+            self.batches[batch_id] = {"version": version, "rows": len(df), "cells": batch_cells}
+        self._results.clear()
+        return len(df)
+
+    def _source(self, dims: Sequence[str]) -> Tuple[Tuple[str, ...], Optional[pd.DataFrame]]:
+        """Smallest stored summary that has every dimension in `dims`, and its dimensions."""
+        candidates = [(len(t), d, t) for d, t in self.rollups.items() if t is not None and set(dims) <= set(d)]
+        if candidates:
+            _, found, table = min(candidates, key=lambda c: c[0])
+            return found, table
+        return DIMENSIONS, self.cells
+
+    def query(
+        self,
+        by: Sequence[str] = ("product",),
+        filters: Optional[Dict[str, Any]] = None,
+        top: Optional[int] = None,
+        sort: str = "reviews",
+        min_reviews: int = 1,
+    ) -> pd.DataFrame:
+        """Summary grouped by `by`, restricted by {dimension: value or list of values}, with rates.
+
+        Results are cached until the next ingest, so a dashboard refreshing the
+        same panels does not regroup anything; treat returned frames as read-only.
+        """
+        by, filters = list(by), dict(filters or {})
+        unknown = (set(by) | set(filters)) - set(DIMENSIONS)
+        if unknown:
+            raise ValueError(f"Unknown dimensions {sorted(unknown)}; expected {DIMENSIONS}")
+        key = (tuple(by), tuple(sorted((d, repr(v)) for d, v in filters.items())), top, sort, min_reviews)
+        cached = self._results.get(key)
+        if cached is not None:
+            return cached
+
+        dims, frame = self._source(by + list(filters))
+        if frame is None:
+            return with_rates(pd.DataFrame(columns=list(MEASURES), index=pd.Index([], name=by[0] if by else None)))
+        for dim, value in filters.items():
+            values = value if isinstance(value, (list, tuple, set)) else [value]
+            frame = frame[frame.index.get_level_values(dim).isin(values)]
+        if not by:
+            result = frame.sum().to_frame("all").T
+        elif set(by) == set(dims):
+            result = frame.reorder_levels(by) if len(by) > 1 else frame
+        else:
+            result = frame.groupby(level=by, sort=False).sum()
+        result = with_rates(result[result["reviews"] >= min_reviews])
+        result = result.sort_values(sort, ascending=False)
+        result = result.head(top) if top else result
+        self._results[key] = result
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rows": self.rows,
+            "batches": len(self.batches),
+            "cells": 0 if self.cells is None else len(self.cells),
+            "rollups": {"x".join(d): (0 if t is None else len(t)) for d, t in self.rollups.items()},
+        }
+
+    def __getstate__(self) -> Dict[str, Any]:
+        state = dict(self.__dict__)
+        state["_results"] = {}
+        return state
+
+    def save(self, path: str) -> None:
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump(self, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SentimentAggregates":
+        with open(path, "rb") as f:
+            aggs = pickle.load(f)
+        if any(not isinstance(b, dict) for b in aggs.batches.values()):
+            raise ValueError(f"{path} predates per-batch contributions and cannot replace re-scored files; "
+                             "delete it and ingest again")
+        return aggs
+
+
+def scored_with_reviews(scored_path: str, product: str) -> pd.DataFrame:
+    """A score_reviews.py output file joined back to its reviews' attributes by row.
+
+    `row` is a position in the product's bundled data.csv, so only outputs of
+    the bundled reviews_<product>/data.csv files can be joined; anything else
+    (or a file scored before the data changed) raises ValueError.
+    """
+    scored = pd.read_parquet(scored_path) if scored_path.endswith(".parquet") else pd.read_csv(scored_path)
+    reviews = load_reviews(
+        columns=["Reviewer_Rating", "Place_of_Review", "Date_of_Review", "Up_Votes", "Down_Votes"],
+        filters=[("Product", "=", product)],
+    ).reset_index(drop=True)
+    if len(scored) != len(reviews):
+        raise ValueError(
+            f"{scored_path} has {len(scored)} rows but the bundled reviews for {product!r} have {len(reviews)}; "
+            f"only score_reviews.py outputs of the current reviews_<product>/data.csv files can be ingested"
+        )
+    joined = reviews.iloc[scored["row"].to_numpy()].reset_index(drop=True)
+    joined["Product"] = product
+    joined["label"] = scored["label"].to_numpy()
+    joined["score"] = scored["score"].to_numpy()
+    return joined
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    sub = parser.add_subparsers(dest="command", required=True)
+    ingest = sub.add_parser("ingest", help="fold score_reviews.py outputs into the store")
+    ingest.add_argument("scored_dir")
+    ingest.add_argument("--store", default="aggregates.pkl")
+    query = sub.add_parser("query", help="print a rollup")
+    query.add_argument("--store", default="aggregates.pkl")
+    query.add_argument("--by", nargs="*", default=["product"], choices=DIMENSIONS)
+    query.add_argument("--filter", nargs="*", default=[], metavar="DIM=VALUE")
+    query.add_argument("--top", type=int, default=20)
+    query.add_argument("--sort", default="reviews")
+    args = parser.parse_args(argv)
+
+    if args.command == "ingest":
+        aggs = SentimentAggregates.load(args.store) if os.path.exists(args.store) else SentimentAggregates()
+        skipped = 0
+        for path in sorted(glob.glob(os.path.join(args.scored_dir, "*_scored.*"))):
+            product = os.path.basename(path).split("_scored.")[0]
+            started = time.perf_counter()
+            # Keyed by path; size and mtime tell whether the file was re-scored since it was ingested
+            batch_id = os.path.abspath(path)
+            st = os.stat(path)
+            version = f"{st.st_size}:{st.st_mtime_ns}"
+            if aggs.is_current(batch_id, version):
+                print(f"{path}: unchanged")
+                continue
+            replaced = batch_id in aggs.batches
+            try:
+                scored = scored_with_reviews(path, product)
+            except ValueError as ex:
+                print(f"{path}: skipped: {ex}", file=sys.stderr)
+                skipped += 1
+                continue
+            added = aggs.ingest(scored, batch_id=batch_id, version=version)
+            action = "replaced with" if replaced else "added"
+            print(f"{path}: {action} {added} rows in {time.perf_counter() - started:.3f}s")
+        aggs.save(args.store)
+        print(aggs.stats())
+        return 1 if skipped else 0
+
+    aggs = SentimentAggregates.load(args.store)
+    filters: Dict[str, Any] = {}
+    for item in args.filter:
+        dim, _, value = item.partition("=")
+        filters[dim] = int(value) if dim == "rating" else value
+    started = time.perf_counter()
+    result = aggs.query(args.by, filters, top=args.top, sort=args.sort)
+    elapsed = time.perf_counter() - started
+    with pd.option_context("display.width", 160, "display.max_columns", 20):
+        print(result[["reviews", "positive_rate", "weighted_positive_rate", "mean_rating", "mean_score"]])
+    print(f"query: {elapsed * 1000:.2f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -2,7 +2,8 @@
 Simple Flask app for sentiment analysis (Flipkart reviews)
 
 Usage:
- - Place your trained `model.pkl` (or `model.joblib`) in the same folder as this file.
+ - Place your trained `model.pkl` (or `model.joblib`) in the same folder as this file,
+   or rebuild it from the review CSVs with `python train.py --install`.
  - If your model is not a pipeline, optionally place a `vectorizer.pkl` / `tfidf.pkl` next to it.
  - Install dependencies: pip install flask joblib scikit-learn
  - Run: python app.py
@@ -10,7 +11,74 @@ Usage:
 Endpoints:
  - GET  /       -> HTML form to enter review text
  - POST /       -> Form submission returns prediction page
- - POST /api/predict -> JSON API: {"text": "..."} returns prediction and score
+ - POST /api/predict -> JSON API: {"text": "...", "model": "tea"} returns prediction and score
+                         ("model" is optional and picks one of MODELS, see below)
+ - POST /api/predict/stream -> NDJSON in, NDJSON out: one review per line (a JSON string
+                         or {"text": "...", "id": ...}); results stream back per chunk.
+                         ?model=NAME picks a named model
+ - GET  /api/models   -> per-model requests, hits, loads, evictions, latency and memory
+ - GET  /api/batching -> micro-batching metrics (batch sizes, queue waits)
+ - GET  /api/cache    -> prediction cache metrics (hits, misses, evictions)
+ - POST /api/feedback -> labelled reviews for online learning: {"text": "...", "label":
+                         "Positive"} or {"text": "...", "rating": 4}, or a list of them
+ - GET  /api/online   -> online learner status (rows learned, checkpoints, source offsets)
+ - POST /admin/reload -> reload the model file in the background (X-Admin-Token header)
+ - GET  /admin/reload -> status of the last reload
+ - GET  /metrics      -> Prometheus text format: per-stage latency histograms (parse,
+                         preprocess, each pipeline step, classify, postprocess,
+                         serialize), request counters, cache and batcher stats
+ - GET  /healthz      -> 200 once the model is loaded and warmed up (503 before), with
+                         startup time and per-worker memory (RSS/PSS)
+
+Micro-batching (opt-in): set BATCHING_ENABLED=1 to queue concurrent /api/predict
+requests and score them in combined model calls. Tune with BATCH_MAX_SIZE (texts
+per batch, default 64) and BATCH_MAX_WAIT_MS (default 5).
+
+Preprocessing: with PREPROCESS_TEXTS=1, reviews are normalized with
+preprocessing.preprocess_texts (READ MORE artifact, emojis, case, whitespace) before
+the model. Models must be served with the setting they were trained with (train.py
+and online.py read the same variable); the default, 0, sends the raw text that the
+bundled model.pkl was trained on.
+
+Prediction cache: repeated reviews are answered from an LRU/TTL cache keyed on the
+text as the model sees it (the preprocess_texts output; case- and whitespace-folded
+with PREPROCESS_TEXTS=0) and the active model version (a content hash of the model file), so
+it is cleared whenever a changed model.pkl is swapped in. Size with PREDICTION_CACHE_SIZE (default 50000, 0 disables) and
+PREDICTION_CACHE_TTL_S (default 3600).
+
+Pre-fork deployments (gunicorn): export the model once with `python export_model.py`
+and start workers with MODEL_FILE=model.joblib PRELOAD_MODEL=1. Each worker then
+memory-maps the vectorizer/classifier arrays (MODEL_MMAP_MODE, default "r"), so they
+are shared through the page cache instead of copied per worker, and runs a warm-up
+prediction before /healthz reports ready.
+
+Compact model: `python export_model.py --format slm` flattens a TF-IDF + linear
+Pipeline into model.slm, which is memory-mapped and scored with NumPy only (no
+scikit-learn import). Serve it with MODEL_FILE=model.slm.
+
+Online learning (opt-in): with ONLINE_LEARNING=1 an in-process learner (online.py)
+tails FEEDBACK_FILE, plus the review CSVs when ONLINE_TAIL_CSVS=1, updates a hashing +
+SGD model in mini-batches and checkpoints it to ONLINE_CHECKPOINT every
+ONLINE_CHECKPOINT_S seconds (both paths default to files next to online.py). Serve
+the checkpoint with MODEL_FILE=model_online.pkl and each checkpoint is swapped in
+through the hot-reload path below. POST /api/feedback appends labelled reviews to
+FEEDBACK_FILE; since the learner trains on them it requires ADMIN_TOKEN, accepts at
+most FEEDBACK_MAX_BYTES per request, and answers 404 while online learning is off.
+
+Multiple models: MODELS="tawa=models/tawa.pkl,tea=models/tea.pkl" (see
+`train.py --product`) serves named models next to the default one from the same
+process (model_registry.py). Each is loaded on its first request; when the
+estimated size of the loaded models would exceed MODEL_REGISTRY_BUDGET_MB (default
+512), the least recently used ones are evicted. Requests without "model", or with
+"model": "default", use the default model below; only it is hot-reloaded and
+micro-batched. Named models share the prediction cache, keyed by their version.
+
+Hot reload: a retrained model is loaded and warmed up in the background, then swapped
+in atomically; requests already running finish on the old model. Trigger it with
+POST /admin/reload (requires ADMIN_TOKEN to be set) or set MODEL_WATCH_INTERVAL_S to
+poll the model file for changes. Every prediction carries the `model_version` that
+produced it. Without a model file at startup /healthz answers 503 until a reload
+(e.g. the watcher, or the first online checkpoint) loads one.
 
 The loader is robust and tries joblib/pickle and attempts to detect whether the model
 already includes preprocessing (Pipeline). If not, it will try to use a `vectorizer` file
@@ -19,10 +87,14 @@ if present.
 
 import os
 import sys
+import hmac
+import json
+import time
 import logging
-from typing import Any, Dict, List
+import threading
+from typing import Any, Callable, Dict, List, Optional
 
-from flask import Flask, request, jsonify, render_template_string
+from flask import Flask, Response, g, request, jsonify, render_template_string, stream_with_context
 
 # try both joblib and pickle
 try:
@@ -31,13 +103,88 @@ except Exception:
     joblib = None
 import pickle
 
+import metrics
+from batching import MicroBatcher
+from model_registry import ModelRegistry, UnknownModelError
+from prediction_cache import PredictionCache, file_digest, normalize_texts
+from preprocessing import PREPROCESS_TEXTS, preprocess_texts
+from procstats import memory_usage
+from sparse_linear import SparseLinearModel
+
 app = Flask(__name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 MODEL_FILENAMES = ["model.pkl", "model.joblib", "best_model.pkl"]
+if os.environ.get("MODEL_FILE"):
+    MODEL_FILENAMES = [os.environ["MODEL_FILE"]]
+
+# Only effective for files written by joblib.dump (see export_model.py)
+MODEL_MMAP_MODE = os.environ.get("MODEL_MMAP_MODE", "r") or None
+PRELOAD_MODEL = os.environ.get("PRELOAD_MODEL", "0") == "1"
 
+WARMUP_TEXTS = ["Great product, totally worth the price.", "Worst quality, waste of money."]
+
+# The active model and everything derived from it; replaced as one object on reload.
+# `model`, `model_path` and `model_version` mirror it for callers that only need those.
+active_model = None
 model = None
+model_path = None
+model_version = None
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN", "")
+MODEL_WATCH_INTERVAL_S = float(os.environ.get("MODEL_WATCH_INTERVAL_S", "0"))
+
+_reload_lock = threading.Lock()
+reload_status: Dict[str, Any] = {"state": "idle"}
+_watcher = None
+# Called with each model a reload swaps in (asgi.py restarts its worker processes)
+reload_listeners: List[Callable[["ModelHandle"], None]] = []
+
+ready = False
+startup_stats: Dict[str, Any] = {}
+
+POSITIVE_LABELS = ["positive", "pos", "1", 1, "Positive"]
+
+BATCHING_ENABLED = os.environ.get("BATCHING_ENABLED", "0") == "1"
+BATCH_MAX_SIZE = int(os.environ.get("BATCH_MAX_SIZE", "64"))
+BATCH_MAX_WAIT_MS = float(os.environ.get("BATCH_MAX_WAIT_MS", "5"))
+
+batcher = None
+
+PREDICTION_CACHE_SIZE = int(os.environ.get("PREDICTION_CACHE_SIZE", "50000"))
+PREDICTION_CACHE_TTL_S = float(os.environ.get("PREDICTION_CACHE_TTL_S", "3600"))
+
+prediction_cache = None
+
+STAGE_SECONDS = metrics.Histogram(
+    "sentiment_stage_seconds", "Time spent per prediction stage (pipeline steps are separate series)", ["stage", "step"]
+)
+REQUEST_SECONDS = metrics.Histogram("sentiment_request_seconds", "End-to-end request latency", ["endpoint"])
+REQUESTS = metrics.Counter("sentiment_requests_total", "Requests served", ["endpoint", "status"])
+TEXTS_SCORED = metrics.Counter("sentiment_texts_scored_total", "Texts run through the model", ["model_version"])
+PREDICTION_ERRORS = metrics.Counter("sentiment_prediction_errors_total", "Failed model calls", ["model_version"])
+MODEL_SECONDS = metrics.Histogram("sentiment_model_request_seconds", "Scoring latency per named model", ["model"])
+
+# FEEDBACK_FILE and ONLINE_CHECKPOINT are read by online.py
+ONLINE_LEARNING = os.environ.get("ONLINE_LEARNING", "0") == "1"
+ONLINE_TAIL_CSVS = os.environ.get("ONLINE_TAIL_CSVS", "0") == "1"
+ONLINE_POLL_S = float(os.environ.get("ONLINE_POLL_S", "5"))
+ONLINE_CHECKPOINT_S = float(os.environ.get("ONLINE_CHECKPOINT_S", "60"))
+FEEDBACK_MAX_BYTES = int(os.environ.get("FEEDBACK_MAX_BYTES", str(1024 * 1024)))
+
+online_learner = None
+_feedback_lock = threading.Lock()
+
+# Reviews scored per model call by /api/predict/stream
+STREAM_CHUNK_SIZE = int(os.environ.get("STREAM_CHUNK_SIZE", "256"))
+
+# Named models ("name=path,name=path") routed by the request's "model" field
+DEFAULT_MODEL_NAME = "default"
+MODELS = os.environ.get("MODELS", "")
+MODEL_REGISTRY_BUDGET_MB = float(os.environ.get("MODEL_REGISTRY_BUDGET_MB", "512"))
+
+model_registry = None
 
 HTML_TEMPLATE = """
 <!doctype html>
@@ -65,14 +212,20 @@ HTML_TEMPLATE = """
 """
 
 
-def try_load_file(filenames: List[str]) -> Any:
+def try_load_file(filenames: List[str], mmap_mode: Any = None) -> Any:
     """Try to load a model-like object from a list of filenames."""
     for fn in filenames:
         if os.path.exists(fn):
             logger.info(f"Loading from {fn}")
+            if fn.endswith(".slm"):
+                try:
+                    return SparseLinearModel.load(fn)
+                except Exception as e:
+                    logger.warning(f"sparse-linear load failed for {fn}: {e}")
+                    continue
             try:
                 if joblib and fn.endswith((".joblib", ".pkl")):
-                    return joblib.load(fn)
+                    return joblib.load(fn, mmap_mode=mmap_mode)
             except Exception as e:
                 logger.warning(f"joblib load failed for {fn}: {e}")
             try:
@@ -83,67 +236,385 @@ def try_load_file(filenames: List[str]) -> Any:
     return None
 
 
+def resolve_positive_index(classes) -> Any:
+    """Index of the class that looks positive, or None if the model has no classes_."""
+    if classes is None:
+        return None
+    classes = list(classes)
+    for candidate in POSITIVE_LABELS:
+        if candidate in classes:
+            return classes.index(candidate)
+    # fallback: choose the class that is likely positive by looking at label type
+    return 1 if len(classes) > 1 else 0
+
+
+class ModelHandle:
+    """A loaded model plus the state derived from it, swapped in as one unit."""
+
+    def __init__(self, model: Any, path: Optional[str], version: str):
+        self.model = model
+        self.path = path
+        self.version = version
+        # Resolved once per loaded model so predict_texts does not search classes_ per row
+        self.classes = getattr(model, "classes_", None)
+        self.positive_index = resolve_positive_index(self.classes)
+        self.loaded_at = time.time()
+        # Pipelines (optionally inside a fitted search CV) are run step by step so
+        # each step can be timed on its own; other models are called directly.
+        self.transform_steps, self.final_step = split_pipeline(model)
+
+
+def split_pipeline(model: Any):
+    """([(name, transformer), ...], (name, estimator)) for a Pipeline, else (None, None)."""
+    estimator = getattr(model, "best_estimator_", model)
+    steps = getattr(estimator, "steps", None)
+    if not steps:
+        return None, None
+    transforms = [(name, step) for name, step in steps[:-1] if step is not None and step != "passthrough"]
+    return transforms, steps[-1]
+
+
+def find_model_file(filenames: List[str]) -> Optional[str]:
+    return next((fn for fn in filenames if os.path.exists(fn)), None)
+
+
+def load_model_handle(filenames: List[str]) -> Optional[ModelHandle]:
+    """Load the first usable model file without touching the active model."""
+    for fn in filenames:
+        if not os.path.exists(fn):
+            continue
+        version = file_digest(fn)[:16]
+        loaded = try_load_file([fn], mmap_mode=MODEL_MMAP_MODE)
+        if loaded is not None:
+            return ModelHandle(loaded, fn, version)
+    return None
+
+
+def activate_model(handle: ModelHandle) -> None:
+    global active_model, model, model_path, model_version
+    active_model = handle
+    model, model_path, model_version = handle.model, handle.path, handle.version
+
+
+def current_model_version() -> str:
+    handle = active_model
+    return handle.version if handle is not None else "none"
+
+
+def _new_prediction_cache() -> PredictionCache:
+    return PredictionCache(
+        current_model_version, max_entries=PREDICTION_CACHE_SIZE, ttl_s=PREDICTION_CACHE_TTL_S,
+        # score_texts hands the cache preprocessed texts already
+        normalize_fn=list if PREPROCESS_TEXTS else normalize_texts,
+    )
+
+
+def _mark_ready(handle: ModelHandle, load_s: float, warmup_s: float) -> None:
+    global ready
+    startup_stats.clear()
+    startup_stats.update({
+        "model_path": handle.path,
+        "model_version": handle.version,
+        "mmap_mode": MODEL_MMAP_MODE,
+        "load_s": round(load_s, 4),
+        "warmup_s": round(warmup_s, 4),
+        "memory_after_load": memory_usage(),
+    })
+    ready = True
+    logger.info(f"Startup: load {load_s:.3f}s, warm-up {warmup_s:.3f}s, memory {startup_stats['memory_after_load']}")
+
+
 def load_artifacts():
-    global model
-    model = try_load_file(MODEL_FILENAMES)
-    if model is None:
+    global prediction_cache, ready
+    ready = False
+    started = time.perf_counter()
+    handle = load_model_handle(MODEL_FILENAMES)
+    load_s = time.perf_counter() - started
+    if handle is None:
         logger.warning("No model file found. Please place `model.pkl` next to app.py")
-    else:
-        logger.info(f"Model loaded: {type(model)}")
+        # The watcher (or an online checkpoint) loads it once it appears
+        if MODEL_WATCH_INTERVAL_S > 0:
+            start_model_watcher(MODEL_WATCH_INTERVAL_S)
+        return
+    logger.info(f"Model loaded: {type(handle.model)} (version {handle.version})")
 
     # Model is expected to be a sklearn Pipeline that handles raw text input.
-    if hasattr(model, "named_steps"):
+    if hasattr(handle.model, "named_steps"):
         logger.info("Detected sklearn Pipeline. It will handle raw text input.")
     else:
         logger.warning("Loaded model does not appear to be a Pipeline. Ensure it accepts raw text strings or wrap preprocessing in a Pipeline.")
 
+    warmup_s = warm_up(handle)
+    activate_model(handle)
+
+    if PREDICTION_CACHE_SIZE > 0:
+        prediction_cache = _new_prediction_cache()
+    _mark_ready(handle, load_s, warmup_s)
+
+    if MODEL_WATCH_INTERVAL_S > 0:
+        start_model_watcher(MODEL_WATCH_INTERVAL_S)
+
+
+def warm_up(handle: Optional[ModelHandle] = None) -> float:
+    """Run a synthetic prediction so lazy initialisation happens before serving traffic."""
+    started = time.perf_counter()
+    try:
+        predict_texts(WARMUP_TEXTS, handle)
+    except Exception as ex:
+        logger.warning(f"Warm-up prediction failed: {ex}")
+    return time.perf_counter() - started
+
+
+def reload_model(force: bool = False) -> Dict[str, Any]:
+    """Load, warm up and atomically swap in the current model file.
+
+    Requests already holding the previous ModelHandle finish on it. When no
+    model was loaded at startup, the first successful reload makes the
+    service ready.
+    """
+    global prediction_cache
+    with _reload_lock:
+        previous = active_model
+        path = find_model_file(MODEL_FILENAMES)
+        if path is None:
+            raise RuntimeError("No model file found to reload")
+        if not force and previous is not None and previous.path == path and file_digest(path)[:16] == previous.version:
+            return {"status": "unchanged", "model_version": previous.version}
+
+        started = time.perf_counter()
+        handle = load_model_handle(MODEL_FILENAMES)
+        if handle is None:
+            raise RuntimeError(f"Could not load a model from {path}")
+        load_s = time.perf_counter() - started
+        warmup_s = warm_up(handle)
+        activate_model(handle)
+        if prediction_cache is None and PREDICTION_CACHE_SIZE > 0:
+            prediction_cache = _new_prediction_cache()
+        if not ready:
+            _mark_ready(handle, load_s, warmup_s)
+        elapsed = time.perf_counter() - started
+        logger.info(f"Model reloaded from {handle.path}: {getattr(previous, 'version', None)} -> {handle.version} in {elapsed:.3f}s")
+        for listener in reload_listeners:
+            try:
+                listener(handle)
+            except Exception:
+                logger.exception("Model reload listener failed")
+        return {
+            "status": "reloaded",
+            "model_version": handle.version,
+            "previous_version": getattr(previous, "version", None),
+            "reload_s": round(elapsed, 4),
+        }
+
+
+def _reload_job(force: bool) -> None:
+    try:
+        result = reload_model(force=force)
+        reload_status.update({"state": "idle", "last": result, "error": None, "finished_at": time.time()})
+    except Exception as ex:
+        logger.exception("Model reload failed: %s", ex)
+        reload_status.update({"state": "failed", "error": str(ex), "finished_at": time.time()})
+
+
+def start_background_reload(force: bool = False) -> bool:
+    """Start a reload thread unless one is already running."""
+    if reload_status.get("state") == "reloading":
+        return False
+    reload_status.update({"state": "reloading", "started_at": time.time()})
+    threading.Thread(target=_reload_job, args=(force,), name="model-reload", daemon=True).start()
+    return True
+
+
+def _stat_key(path: Optional[str]) -> Any:
+    try:
+        st = os.stat(path)
+        return path, st.st_size, st.st_mtime_ns
+    except (OSError, TypeError):
+        return None
+
+
+def start_model_watcher(interval_s: float) -> None:
+    """Poll the model file and reload it in the background when it changes."""
+    global _watcher
+    if _watcher is not None:
+        return
+
+    def watch():
+        last = _stat_key(find_model_file(MODEL_FILENAMES))
+        while True:
+            time.sleep(interval_s)
+            current = _stat_key(find_model_file(MODEL_FILENAMES))
+            if current is not None and current != last:
+                last = current
+                logger.info(f"Model file changed ({current[0]}); reloading")
+                _reload_job(force=False)
+
+    _watcher = threading.Thread(target=watch, name="model-watcher", daemon=True)
+    _watcher.start()
+
+
+def parse_model_map(spec: str) -> Dict[str, str]:
+    """"tawa=models/tawa.pkl,tea=models/tea.pkl" -> {"tawa": "models/tawa.pkl", "tea": "models/tea.pkl"}."""
+    paths = {}
+    for item in spec.split(","):
+        if not item.strip():
+            continue
+        name, sep, path = item.partition("=")
+        if not sep or not name.strip() or not path.strip():
+            raise ValueError(f"MODELS entries must look like name=path, got {item!r}")
+        if name.strip() == DEFAULT_MODEL_NAME:
+            raise ValueError(f"{DEFAULT_MODEL_NAME!r} is reserved for MODEL_FILE")
+        paths[name.strip()] = path.strip()
+    return paths
+
 
-def predict_texts(texts: List[str]) -> List[Dict[str, Any]]:
-    if model is None:
+def _load_registry_model(path: str) -> Optional[ModelHandle]:
+    handle = load_model_handle([path])
+    if handle is not None:
+        warm_up(handle)
+    return handle
+
+
+def build_model_registry() -> ModelRegistry:
+    global model_registry
+    if model_registry is None:
+        model_registry = ModelRegistry(
+            parse_model_map(MODELS), loader=_load_registry_model, budget_bytes=int(MODEL_REGISTRY_BUDGET_MB * 2**20)
+        )
+        if model_registry.names():
+            logger.info(f"Model registry: {model_registry.names()} (budget {MODEL_REGISTRY_BUDGET_MB:g} MB)")
+    return model_registry
+
+
+def start_batcher():
+    global batcher
+    if batcher is None:
+        batcher = MicroBatcher(predict_prepared_texts, max_batch_size=BATCH_MAX_SIZE, max_wait_ms=BATCH_MAX_WAIT_MS)
+    batcher.start()
+
+
+def _on_online_checkpoint(path: str) -> None:
+    # Only swap in the checkpoint when this process serves it
+    served = find_model_file(MODEL_FILENAMES)
+    if served is not None and os.path.abspath(served) == os.path.abspath(path):
+        _reload_job(force=False)
+
+
+def start_online_learner():
+    global online_learner
+    if online_learner is None:
+        # Imported here: the learner pulls in pandas and the training helpers
+        from online import OnlineLearner
+        from review_data import find_review_csvs
+
+        online_learner = OnlineLearner(
+            csv_paths=find_review_csvs() if ONLINE_TAIL_CSVS else [],
+            checkpoint_s=ONLINE_CHECKPOINT_S,
+            on_checkpoint=_on_online_checkpoint,
+        )
+    online_learner.start(ONLINE_POLL_S)
+
+
+def prepare_texts(texts: List[str]) -> List[str]:
+    """The model's input for `texts`: the normalization train.py applies before fitting, if enabled."""
+    if not PREPROCESS_TEXTS:
+        return texts
+    with STAGE_SECONDS.time(stage="preprocess", step="normalize"):
+        return preprocess_texts(texts)
+
+
+def predict_texts(texts: List[str], handle: Optional[ModelHandle] = None,
+                  prepared: bool = False) -> List[Dict[str, Any]]:
+    """Score reviews; `prepared` texts already went through prepare_texts."""
+    # Take one reference so a concurrent reload cannot swap the model mid-request
+    handle = handle or active_model
+    if handle is None:
         raise RuntimeError("Model not loaded. Put model.pkl next to app.py and restart the app.")
+    classes = handle.classes
 
-    # Prepare input
-    X = texts
+    X = texts if prepared else prepare_texts(texts)
     # Model pipeline should handle any required preprocessing of raw text strings.
-
-    # Predict
+    estimator, estimator_name = handle.model, type(handle.model).__name__
     try:
-        preds = model.predict(X)
+        if handle.transform_steps is not None:
+            for name, step in handle.transform_steps:
+                with STAGE_SECONDS.time(stage="vectorize", step=name):
+                    X = step.transform(X)
+            estimator_name, estimator = handle.final_step
+
+        with STAGE_SECONDS.time(stage="classify", step=estimator_name):
+            # Probabilistic models: one predict_proba pass gives both labels (argmax
+            # over classes_) and scores, so the vectorizer only runs once.
+            probs = None
+            if hasattr(estimator, "predict_proba") and classes is not None:
+                try:
+                    probs = estimator.predict_proba(X)
+                except Exception:
+                    probs = None
+
+            # Predict
+            if probs is not None:
+                preds = classes[probs.argmax(axis=1)]
+            else:
+                preds = estimator.predict(X)
     except Exception as ex:
+        PREDICTION_ERRORS.inc(model_version=handle.version)
         logger.exception("Model prediction failed: %s", ex)
         raise
+    TEXTS_SCORED.inc(len(texts), model_version=handle.version)
+
+    with STAGE_SECONDS.time(stage="postprocess", step="results"):
+        if probs is None:
+            return [{"label": str(p), "score": None, "model_version": handle.version} for p in preds]
+
+        # Choose probability for the positive class when known, else the highest one
+        pos_idx = handle.positive_index
+        if pos_idx is not None and pos_idx < probs.shape[1]:
+            scores = probs[:, pos_idx]
+        else:
+            scores = probs.max(axis=1)
+        return [{"label": str(p), "score": float(s), "model_version": handle.version} for p, s in zip(preds, scores)]
+
+
+def predict_prepared_texts(texts: List[str], handle: Optional[ModelHandle] = None) -> List[Dict[str, Any]]:
+    return predict_texts(texts, handle, prepared=True)
+
+
+def score_texts(texts: List[str], model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """predict_texts behind the prediction cache and micro-batcher, when enabled.
+
+    `model_name` picks a registry model (UnknownModelError if unknown); None uses the default model.
+    """
+    registry = build_model_registry()
+    name = model_name or DEFAULT_MODEL_NAME
+    started = time.perf_counter()
+    failed = True
+    try:
+        if name == DEFAULT_MODEL_NAME:
+            backend = batcher.submit if batcher is not None else predict_prepared_texts
+            namespace = ""
+        else:
+            handle = registry.get(name)
+            backend = lambda batch: predict_prepared_texts(batch, handle)  # noqa: E731
+            namespace = "\0" + handle.version
+        # Preprocessed once here; the cache keys on it and the model gets it as is
+        inputs = prepare_texts(texts)
+        if prediction_cache is not None:
+            results = prediction_cache.predict(inputs, backend, namespace)
+        else:
+            results = backend(inputs)
+        failed = False
+        return results
+    finally:
+        elapsed = time.perf_counter() - started
+        if name == DEFAULT_MODEL_NAME or name in registry.paths:
+            registry.record(name, elapsed, texts=len(texts), error=failed)
+            MODEL_SECONDS.observe(elapsed, model=name)
 
-    results = []
-    probs = None
-    if hasattr(model, "predict_proba"):
-        try:
-            probs = model.predict_proba(X)
-        except Exception:
-            probs = None
-    for i, p in enumerate(preds):
-        label = p
-        score = None
-        if probs is not None:
-            # Choose highest probability and, if possible, pick probability for positive class
-            try:
-                # if classes_ includes a recognizable positive label
-                classes = getattr(model, "classes_", None)
-                if classes is not None:
-                    pos_idx = None
-                    for candidate in ["positive", "pos", "1", 1, "Positive"]:
-                        if candidate in classes:
-                            pos_idx = list(classes).index(candidate)
-                            break
-                    if pos_idx is None:
-                        # fallback: choose the class that is likely positive by looking at label type
-                        pos_idx = 1 if probs.shape[1] > 1 else 0
-                    score = float(probs[i, pos_idx])
-                else:
-                    score = float(probs[i].max())
-            except Exception:
-                score = float(probs[i].max())
-        results.append({"label": str(label), "score": score})
-    return results
+
+def _unknown_model(name: Any):
+    models = [DEFAULT_MODEL_NAME] + build_model_registry().names()
+    return jsonify({"error": f"Unknown model {name!r}", "models": models}), 404
 
 
 @app.route("/", methods=["GET", "POST"])
@@ -156,7 +627,7 @@ def index():
         text = request.form.get("text", "").strip()
         if text:
             try:
-                res = predict_texts([text])[0]
+                res = score_texts([text])[0]
                 label = res["label"]
                 score = res["score"]
             except Exception as ex:
@@ -168,30 +639,242 @@ def index():
 
 @app.route("/api/predict", methods=["POST"])
 def api_predict():
-    payload = request.get_json(force=True, silent=True)
+    with STAGE_SECONDS.time(stage="parse", step="json"):
+        payload = request.get_json(force=True, silent=True)
     if payload is None:
         return jsonify({"error": "Invalid JSON payload"}), 400
-    text = payload.get("text")
+    text = payload.get("text") if isinstance(payload, dict) else None
     if text is None:
         return jsonify({"error": "Provide 'text' field in JSON."}), 400
     single = False
     if isinstance(text, str):
         texts = [text]
         single = True
-    elif isinstance(text, list):
+    elif isinstance(text, list) and all(isinstance(t, str) for t in text):
         texts = text
     else:
         return jsonify({"error": "'text' must be a string or a list of strings"}), 400
+    model_name = payload.get("model")
+    if model_name is not None and not isinstance(model_name, str):
+        return jsonify({"error": "'model' must be a string"}), 400
 
     try:
-        out = predict_texts(texts)
+        out = score_texts(texts, model_name)
+    except UnknownModelError:
+        return _unknown_model(model_name)
     except Exception as ex:
         return jsonify({"error": str(ex)}), 500
 
-    return jsonify({"predictions": out} if not single else out[0])
+    with STAGE_SECONDS.time(stage="serialize", step="jsonify"):
+        return jsonify({"predictions": out} if not single else out[0])
 
 
-if __name__ == "__main__":
+def _parse_ndjson_line(line: bytes) -> Dict[str, Any]:
+    item = json.loads(line)
+    if isinstance(item, str):
+        return {"text": item}
+    if isinstance(item, dict) and isinstance(item.get("text"), str):
+        return item
+    raise ValueError("each line must be a JSON string or an object with a string 'text' field")
+
+
+@app.route("/api/predict/stream", methods=["POST"])
+def api_predict_stream():
+    """Score newline-delimited JSON reviews incrementally, in STREAM_CHUNK_SIZE chunks.
+
+    Neither the request nor the response is buffered whole, so memory stays flat
+    for arbitrarily large inputs.
+    """
+    stream = request.stream
+    model_name = request.args.get("model") or None
+    if model_name not in (None, DEFAULT_MODEL_NAME) and model_name not in build_model_registry().paths:
+        return _unknown_model(model_name)
+
+    def flush(chunk: List[Dict[str, Any]]) -> str:
+        valid = [item for item in chunk if "error" not in item]
+        try:
+            results = iter(score_texts([item["text"] for item in valid], model_name))
+        except Exception as ex:
+            results = iter([{"error": str(ex)}] * len(valid))
+        out = []
+        for item in chunk:
+            row = {"index": item["index"], **(item if "error" in item else next(results))}
+            if "id" in item:
+                row["id"] = item["id"]
+            row.pop("text", None)
+            out.append(json.dumps(row))
+        return "\n".join(out) + "\n"
+
+    def generate():
+        chunk: List[Dict[str, Any]] = []
+        index = 0
+        for line in stream:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                item = _parse_ndjson_line(line)
+                entry = {"index": index, "text": item["text"]}
+                if "id" in item:
+                    entry["id"] = item["id"]
+            except ValueError as ex:
+                # Invalid lines are reported in place, without failing the stream
+                entry = {"index": index, "error": str(ex)}
+            chunk.append(entry)
+            index += 1
+            if len(chunk) >= STREAM_CHUNK_SIZE:
+                yield flush(chunk)
+                chunk = []
+        if chunk:
+            yield flush(chunk)
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@app.before_request
+def _start_request_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def _record_request(response):
+    # Label by route pattern, not raw path, to keep series cardinality bounded
+    endpoint = request.url_rule.rule if request.url_rule is not None else "unmatched"
+    started = g.get("request_started")
+    if started is not None:
+        REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    REQUESTS.inc(endpoint=endpoint, status=str(response.status_code))
+    return response
+
+
+def _collect_runtime_metrics() -> List[str]:
+    lines = metrics.gauge_lines(
+        "sentiment_model_info", "Active model version", 1 if active_model else None,
+        f'{{version="{current_model_version()}"}}',
+    )
+    if prediction_cache is not None:
+        cache = prediction_cache.stats()
+        for key in ("hits", "misses", "evictions", "expirations", "entries"):
+            lines += metrics.gauge_lines(f"sentiment_cache_{key}", f"Prediction cache {key}", cache[key])
+    if batcher is not None:
+        stats = batcher.stats()
+        for key in ("batches", "texts", "queue_depth"):
+            lines += metrics.gauge_lines(f"sentiment_batcher_{key}", f"Micro-batcher {key}", stats[key])
+        lines += metrics.gauge_lines("sentiment_batcher_batch_size_p99", "p99 texts per batch", stats["batch_size"]["p99"])
+        lines += metrics.gauge_lines("sentiment_batcher_queue_wait_ms_p99", "p99 queue wait", stats["queue_wait_ms"]["p99"])
+    return lines
+
+
+metrics.register_collector(_collect_runtime_metrics)
+
+
+@app.route("/metrics", methods=["GET"])
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/api/batching", methods=["GET"])
+def api_batching():
+    if batcher is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **batcher.stats()})
+
+
+@app.route("/healthz", methods=["GET"])
+def healthz():
+    body = {"ready": ready, "startup": startup_stats, "memory": memory_usage()}
+    return jsonify(body), (200 if ready else 503)
+
+
+def _admin_denied():
+    """An error response unless the request carries ADMIN_TOKEN; None when it does."""
+    if not ADMIN_TOKEN:
+        return jsonify({"error": "Admin endpoints are disabled. Set ADMIN_TOKEN to enable them."}), 403
+    if not hmac.compare_digest(request.headers.get("X-Admin-Token", ""), ADMIN_TOKEN):
+        return jsonify({"error": "Invalid admin token"}), 401
+    return None
+
+
+@app.route("/admin/reload", methods=["GET", "POST"])
+def admin_reload():
+    denied = _admin_denied()
+    if denied is not None:
+        return denied
+    if request.method == "POST":
+        started = start_background_reload(force=request.args.get("force") == "1")
+        return jsonify({"started": started, "model_version": current_model_version(), **reload_status}), 202
+    return jsonify({"model_version": current_model_version(), **reload_status})
+
+
+@app.route("/api/feedback", methods=["POST"])
+def api_feedback():
+    # Labels are trained on: only admins may send them, and only while a learner consumes them
+    denied = _admin_denied()
+    if denied is not None:
+        return denied
+    if online_learner is None or not online_learner.feedback_path:
+        return jsonify({"error": "Online learning is disabled. Set ONLINE_LEARNING=1 to accept feedback."}), 404
+    from online import feedback_label
+
+    body = request.stream.read(FEEDBACK_MAX_BYTES + 1)
+    if len(body) > FEEDBACK_MAX_BYTES:
+        return jsonify({"error": f"Feedback requests are limited to {FEEDBACK_MAX_BYTES} bytes"}), 413
+    try:
+        payload = json.loads(body)
+    except ValueError:
+        payload = None
+    items = payload if isinstance(payload, list) else [payload]
+    lines = []
+    for i, item in enumerate(items):
+        try:
+            label = feedback_label(item)
+        except ValueError as ex:
+            return jsonify({"error": f"item {i}: {ex}"}), 400
+        lines.append(json.dumps({"text": item["text"], "label": label, "received_at": time.time()}) + "\n")
+    # One write per request so the learner never reads half of a request's lines
+    with _feedback_lock, open(online_learner.feedback_path, "a", encoding="utf-8") as f:
+        f.write("".join(lines))
+    return jsonify({"accepted": len(lines), "online_learning": True}), 202
+
+
+@app.route("/api/online", methods=["GET"])
+def api_online():
+    if online_learner is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **online_learner.stats()})
+
+
+@app.route("/api/models", methods=["GET"])
+def api_models():
+    stats = build_model_registry().stats(include=[DEFAULT_MODEL_NAME])
+    stats["models"][DEFAULT_MODEL_NAME].update({"path": model_path, "resident": active_model is not None, "version": model_version})
+    return jsonify(stats)
+
+
+@app.route("/api/cache", methods=["GET"])
+def api_cache():
+    if prediction_cache is None:
+        return jsonify({"enabled": False})
+    return jsonify({"enabled": True, **prediction_cache.stats()})
+
+
+if PRELOAD_MODEL:
     load_artifacts()
-    # Helpful note: If you restart frequently while developing, run with debug=True
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    build_model_registry()
+    if BATCHING_ENABLED:
+        start_batcher()
+    if ONLINE_LEARNING:
+        start_online_learner()
+
+
+if __name__ == "__main__":
+    if not ready:
+        load_artifacts()
+        build_model_registry()
+        if BATCHING_ENABLED:
+            start_batcher()
+        if ONLINE_LEARNING:
+            start_online_learner()
+    # The debug reloader re-runs this module in a child process, which would start a
+    # second batcher, watcher and online learner; restart by hand instead
+    app.run(host="0.0.0.0", port=5000, debug=True, use_reloader=False)
@@ -0,0 +1,290 @@
+"""
+Production ASGI serving mode for the sentiment API.
+
+The prediction routes are served natively by Starlette and run `score_texts`
+on a bounded executor, so the event loop never blocks on the model. Admission
+control keeps at most MAX_CONCURRENCY predictions running and MAX_QUEUE
+waiting; anything beyond that gets an immediate 503 with Retry-After instead
+of piling up. A request that times out keeps its slot until its prediction
+has actually finished on the executor. All other routes (HTML form, admin,
+metrics) are the Flask app from app.py, mounted through a WSGI adapter.
+
+Usage:
+    pip install starlette uvicorn a2wsgi
+    uvicorn asgi:asgi_app --host 0.0.0.0 --port 8000
+
+Configuration (environment variables):
+    INFERENCE_EXECUTOR  "thread" (default) or "process"
+    INFERENCE_WORKERS   executor size (default: CPU count)
+    MAX_CONCURRENCY     predictions running at once (default: INFERENCE_WORKERS)
+    MAX_QUEUE           predictions allowed to wait for a slot (default 64)
+    REQUEST_TIMEOUT_S   per-request limit before a 503 (default 10)
+
+The process executor loads the model once per worker process and sidesteps the
+GIL for the vectorizer; the thread executor shares one model and the
+prediction cache. Named models ({"model": "tea"}, see MODELS in app.py) are
+loaded by whichever process scores them, so with the process executor each
+worker keeps its own registry and MODEL_REGISTRY_BUDGET_MB applies per worker.
+
+Worker processes are spawned, not forked, so they never inherit this process's
+threads (batcher, watcher, online learner) or their locks. When this process
+reloads its model (/admin/reload, MODEL_WATCH_INTERVAL_S, online checkpoints),
+a new pool is started and warmed up on the new model file, then takes over new
+requests while the old workers finish theirs and exit.
+
+/api/predict records the same request and stage metrics as the Flask route.
+Worker processes send the metrics they record (model stages, texts scored)
+back with each result, and they are merged into this process's /metrics.
+"""
+
+import asyncio
+import logging
+import multiprocessing
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, Dict, List, Optional, Tuple
+
+from a2wsgi import WSGIMiddleware
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Mount, Route
+
+import app as flask_service
+import metrics
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+INFERENCE_EXECUTOR = os.environ.get("INFERENCE_EXECUTOR", "thread")
+INFERENCE_WORKERS = int(os.environ.get("INFERENCE_WORKERS", str(os.cpu_count() or 1)))
+MAX_CONCURRENCY = int(os.environ.get("MAX_CONCURRENCY", str(INFERENCE_WORKERS)))
+MAX_QUEUE = int(os.environ.get("MAX_QUEUE", "64"))
+REQUEST_TIMEOUT_S = float(os.environ.get("REQUEST_TIMEOUT_S", "10"))
+
+
+def _init_process_worker() -> None:
+    os.chdir(HERE)
+    # The parent watches the model file and restarts the pool on reload
+    flask_service.MODEL_WATCH_INTERVAL_S = 0
+    flask_service.load_artifacts()
+
+
+def _score_in_worker(texts: List[str], model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    return flask_service.score_texts(texts, model_name)
+
+
+def _score_in_process(texts: List[str], model_name: Optional[str] = None) -> Tuple[List[Dict[str, Any]], list]:
+    """_score_in_worker plus the metrics the worker recorded since its last job.
+
+    A failed job's metrics stay in the worker and go out with its next result.
+    """
+    return _score_in_worker(texts, model_name), metrics.drain()
+
+
+class AdmissionController:
+    """Bounds running and waiting predictions; rejects instead of queueing without limit."""
+
+    def __init__(self, max_concurrency: int, max_queue: int):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self.in_system = 0
+        self.admitted = 0
+        self.rejected = 0
+        self.timeouts = 0
+
+    def try_admit(self) -> bool:
+        if self.in_system >= self.max_concurrency + self.max_queue:
+            self.rejected += 1
+            return False
+        self.in_system += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.in_system -= 1
+
+    def slot(self) -> asyncio.Semaphore:
+        return self._slots
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "max_queue": self.max_queue,
+            "in_system": self.in_system,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "timeouts": self.timeouts,
+        }
+
+
+executor: Executor = None
+admission: AdmissionController = None
+_loop: asyncio.AbstractEventLoop = None
+
+
+def _start_process_pool() -> ProcessPoolExecutor:
+    """A warmed-up pool of spawned workers, each with the current model file loaded."""
+    # Spawned workers import app afresh; its import-time startup (PRELOAD_MODEL:
+    # batcher, online learner) belongs to this process only
+    os.environ["PRELOAD_MODEL"] = "0"
+    pool = ProcessPoolExecutor(
+        max_workers=INFERENCE_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_process_worker,
+    )
+    # Start every worker (each loads and warms its model) before it takes traffic;
+    # draining leaves the warmup out of the metrics later requests bring back
+    for future in [pool.submit(_score_in_process, flask_service.WARMUP_TEXTS) for _ in range(INFERENCE_WORKERS)]:
+        future.result()
+    return pool
+
+
+def _swap_executor(pool: Executor) -> None:
+    global executor
+    # On the event loop, so no request is between reading `executor` and submitting to it
+    old, executor = executor, pool
+    # Jobs already submitted finish on the old workers, which then exit
+    old.shutdown(wait=False)
+
+
+def _recycle_process_pool(handle: Any) -> None:
+    """Reload listener: move the workers to the model version the parent just swapped in."""
+    started = time.perf_counter()
+    pool = _start_process_pool()
+    _loop.call_soon_threadsafe(_swap_executor, pool)
+    logger.info(f"Restarted {INFERENCE_WORKERS} worker processes on model {handle.version} "
+                f"in {time.perf_counter() - started:.2f}s")
+
+
+def _overloaded(reason: str) -> JSONResponse:
+    return JSONResponse({"error": f"Server overloaded: {reason}"}, status_code=503, headers={"Retry-After": "1"})
+
+
+async def run_prediction(texts: List[str], model_name: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Score an admitted request on the executor.
+
+    Its admission is released when the executor job finishes, not when the
+    request stops waiting for it, so abandoned work still counts against the limits.
+    """
+    loop = asyncio.get_running_loop()
+    in_process = INFERENCE_EXECUTOR == "process"
+    slots = admission.slot()
+    try:
+        await slots.acquire()
+    except BaseException:
+        admission.release()
+        raise
+    try:
+        future = loop.run_in_executor(
+            executor, _score_in_process if in_process else _score_in_worker, texts, model_name
+        )
+    except BaseException:
+        slots.release()
+        admission.release()
+        raise
+
+    def finished(done: "asyncio.Future") -> None:
+        slots.release()
+        admission.release()
+        # exception() retrieves it, so an abandoned job's error is not reported as unhandled
+        if not done.cancelled() and done.exception() is None and in_process:
+            metrics.merge(done.result()[1])  # abandoned jobs' metrics count too
+
+    future.add_done_callback(finished)
+    # shield: a timeout cancels the wait, not the job (and not the callback above)
+    result = await asyncio.shield(future)
+    return result[0] if in_process else result
+
+
+async def predict(request: Request) -> JSONResponse:
+    # Same series as the Flask route's after_request hook
+    started = time.perf_counter()
+    response = await _predict(request)
+    flask_service.REQUEST_SECONDS.observe(time.perf_counter() - started, endpoint="/api/predict")
+    flask_service.REQUESTS.inc(endpoint="/api/predict", status=str(response.status_code))
+    return response
+
+
+async def _predict(request: Request) -> JSONResponse:
+    try:
+        with flask_service.STAGE_SECONDS.time(stage="parse", step="json"):
+            payload = await request.json()
+    except Exception:
+        return JSONResponse({"error": "Invalid JSON payload"}, status_code=400)
+    if not isinstance(payload, dict) or payload.get("text") is None:
+        return JSONResponse({"error": "Provide 'text' field in JSON."}, status_code=400)
+    text = payload["text"]
+    single = isinstance(text, str)
+    if single:
+        texts = [text]
+    elif isinstance(text, list) and all(isinstance(t, str) for t in text):
+        texts = text
+    else:
+        return JSONResponse({"error": "'text' must be a string or a list of strings"}, status_code=400)
+    model_name = payload.get("model")
+    if model_name is not None and not isinstance(model_name, str):
+        return JSONResponse({"error": "'model' must be a string"}, status_code=400)
+    known = [flask_service.DEFAULT_MODEL_NAME] + flask_service.build_model_registry().names()
+    if model_name is not None and model_name not in known:
+        return JSONResponse({"error": f"Unknown model {model_name!r}", "models": known}, status_code=404)
+
+    if not admission.try_admit():
+        return _overloaded("queue full")
+    try:
+        out = await asyncio.wait_for(run_prediction(texts, model_name), timeout=REQUEST_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        admission.timeouts += 1
+        return _overloaded(f"no result within {REQUEST_TIMEOUT_S}s")
+    except Exception as ex:
+        return JSONResponse({"error": str(ex)}, status_code=500)
+
+    with flask_service.STAGE_SECONDS.time(stage="serialize", step="jsonify"):
+        return JSONResponse({"predictions": out} if not single else out[0])
+
+
+async def serving_stats(request: Request) -> JSONResponse:
+    return JSONResponse({"executor": INFERENCE_EXECUTOR, "workers": INFERENCE_WORKERS, **admission.stats()})
+
+
+@asynccontextmanager
+async def lifespan(_app):
+    global executor, admission, _loop
+    started = time.perf_counter()
+    _loop = asyncio.get_running_loop()
+    admission = AdmissionController(MAX_CONCURRENCY, MAX_QUEUE)
+    # The mounted Flask routes (form, /healthz, admin) use the in-process model
+    if not flask_service.ready:
+        flask_service.load_artifacts()
+    if flask_service.BATCHING_ENABLED:
+        flask_service.start_batcher()
+    if INFERENCE_EXECUTOR == "process":
+        executor = await _loop.run_in_executor(None, _start_process_pool)
+        flask_service.reload_listeners.append(_recycle_process_pool)
+    elif INFERENCE_EXECUTOR == "thread":
+        executor = ThreadPoolExecutor(max_workers=INFERENCE_WORKERS, thread_name_prefix="inference")
+    else:
+        raise ValueError(f"INFERENCE_EXECUTOR must be 'thread' or 'process', not {INFERENCE_EXECUTOR!r}")
+    logger.info(
+        f"ASGI serving ready in {time.perf_counter() - started:.2f}s "
+        f"({INFERENCE_EXECUTOR} executor x{INFERENCE_WORKERS}, concurrency {MAX_CONCURRENCY}, queue {MAX_QUEUE})"
+    )
+    try:
+        yield
+    finally:
+        if _recycle_process_pool in flask_service.reload_listeners:
+            flask_service.reload_listeners.remove(_recycle_process_pool)
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+asgi_app = Starlette(
+    routes=[
+        Route("/api/predict", predict, methods=["POST"]),
+        Route("/api/serving", serving_stats, methods=["GET"]),
+        Mount("/", app=WSGIMiddleware(flask_service.app)),
+    ],
+    lifespan=lifespan,
+)
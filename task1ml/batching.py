@@ -0,0 +1,194 @@
+"""
+Dynamic micro-batching for the sentiment API.
+
+Concurrent requests are queued and a single worker thread drains the queue,
+running one combined prediction call once either `max_batch_size` texts are
+waiting or the oldest request has waited `max_wait_ms`. Each caller then gets
+back only its own slice of the results.
+
+Usage (see app.py):
+    batcher = MicroBatcher(predict_texts, max_batch_size=64, max_wait_ms=5)
+    batcher.start()
+    results = batcher.submit(["great product", "waste of money"])
+    batcher.stats()  # batch-size and queue-wait metrics
+"""
+
+import logging
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Number of recent batches kept for percentile metrics
+STATS_WINDOW = 2048
+
+
+class _Pending:
+    """A single caller's request waiting in the batch queue."""
+
+    __slots__ = ("texts", "enqueued_at", "done", "result", "error")
+
+    def __init__(self, texts: List[str]):
+        self.texts = texts
+        self.enqueued_at = time.perf_counter()
+        self.done = threading.Event()
+        self.result: Optional[List[Dict[str, Any]]] = None
+        self.error: Optional[BaseException] = None
+
+
+def _percentile(values: List[float], pct: float) -> Optional[float]:
+    if not values:
+        return None
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(round(pct / 100.0 * (len(ordered) - 1))))
+    return ordered[idx]
+
+
+class MicroBatcher:
+    """Collects concurrent prediction requests into combined model calls."""
+
+    def __init__(
+        self,
+        predict_fn: Callable[[List[str]], List[Dict[str, Any]]],
+        max_batch_size: int = 64,
+        max_wait_ms: float = 5.0,
+        timeout_s: float = 30.0,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be >= 1")
+        self.predict_fn = predict_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait_s = max_wait_ms / 1000.0
+        self.timeout_s = timeout_s
+        self._queue: "queue.Queue[_Pending]" = queue.Queue()
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+        self._lock = threading.Lock()
+        self._batches = 0
+        self._requests = 0
+        self._texts = 0
+        self._fallbacks = 0
+        self._batch_sizes: deque = deque(maxlen=STATS_WINDOW)
+        self._queue_waits_ms: deque = deque(maxlen=STATS_WINDOW)
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="micro-batcher", daemon=True)
+        self._thread.start()
+        logger.info(
+            f"Micro-batching enabled (max_batch_size={self.max_batch_size}, "
+            f"max_wait_ms={self.max_wait_s * 1000:.1f})"
+        )
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout=1.0)
+            self._thread = None
+
+    def submit(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Queue `texts` for the next batch and block until their results are ready."""
+        if not texts:
+            return []
+        item = _Pending(texts)
+        self._queue.put(item)
+        if not item.done.wait(self.timeout_s):
+            raise TimeoutError(f"Prediction not completed within {self.timeout_s}s")
+        if item.error is not None:
+            raise item.error
+        return item.result
+
+    def _collect(self) -> List[_Pending]:
+        """Block for the first request, then gather more until size or wait limit is hit."""
+        try:
+            first = self._queue.get(timeout=0.1)
+        except queue.Empty:
+            return []
+        batch = [first]
+        size = len(first.texts)
+        deadline = first.enqueued_at + self.max_wait_s
+        while size < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            size += len(item.texts)
+        return batch
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            batch = self._collect()
+            if batch:
+                self._process(batch)
+
+    def _process(self, batch: List[_Pending]) -> None:
+        started = time.perf_counter()
+        texts: List[str] = []
+        for item in batch:
+            texts.extend(item.texts)
+
+        try:
+            results = self.predict_fn(texts)
+        except Exception as ex:
+            # One bad request must not fail its neighbours: retry each on its own.
+            logger.warning(f"Batched prediction failed ({ex}); falling back to per-request calls")
+            with self._lock:
+                self._fallbacks += 1
+            for item in batch:
+                try:
+                    item.result = self.predict_fn(item.texts)
+                except Exception as item_ex:
+                    item.error = item_ex
+                item.done.set()
+        else:
+            offset = 0
+            for item in batch:
+                item.result = results[offset:offset + len(item.texts)]
+                offset += len(item.texts)
+                item.done.set()
+
+        with self._lock:
+            self._batches += 1
+            self._requests += len(batch)
+            self._texts += len(texts)
+            self._batch_sizes.append(len(texts))
+            for item in batch:
+                self._queue_waits_ms.append((started - item.enqueued_at) * 1000.0)
+
+    def stats(self) -> Dict[str, Any]:
+        """Batch-size and queue-wait metrics for tuning throughput against latency."""
+        with self._lock:
+            sizes = list(self._batch_sizes)
+            waits = list(self._queue_waits_ms)
+            out = {
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait_s * 1000.0,
+                "batches": self._batches,
+                "requests": self._requests,
+                "texts": self._texts,
+                "fallbacks": self._fallbacks,
+                "queue_depth": self._queue.qsize(),
+            }
+        out["batch_size"] = {
+            "mean": (sum(sizes) / len(sizes)) if sizes else None,
+            "p50": _percentile(sizes, 50),
+            "p99": _percentile(sizes, 99),
+            "max": max(sizes) if sizes else None,
+        }
+        out["queue_wait_ms"] = {
+            "mean": (sum(waits) / len(waits)) if waits else None,
+            "p50": _percentile(waits, 50),
+            "p99": _percentile(waits, 99),
+            "max": max(waits) if waits else None,
+        }
+        return out
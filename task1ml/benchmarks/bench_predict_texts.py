@@ -0,0 +1,119 @@
+"""
+Benchmark: legacy predict_texts (predict + predict_proba, per-row class lookup)
+against the single-pass version in app.py, on the bundled review CSVs.
+
+Usage (from task1ml/):
+    python benchmarks/bench_predict_texts.py [--batch-size 256] [--repeat 3]
+
+The bundled model.pkl is a LinearSVC pipeline without predict_proba, so a
+TF-IDF + LogisticRegression pipeline is also fitted on the same reviews to
+exercise the probabilistic path.
+
+Both paths score the same model input: with PREPROCESS_TEXTS=1 app.predict_texts
+runs preprocessing.preprocess_texts, so the legacy path is given
+preprocessing.model_inputs and the timings include that step on both sides.
+Label agreement should then be exact.
+"""
+
+import argparse
+import os
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+from preprocessing import model_inputs  # noqa: E402
+from review_data import load_all_reviews  # noqa: E402
+
+
+def legacy_predict_texts(model: Any, texts: List[str]) -> List[Dict[str, Any]]:
+    """predict_texts as it was before the single-pass rewrite."""
+    preds = model.predict(texts)
+    results = []
+    probs = None
+    if hasattr(model, "predict_proba"):
+        try:
+            probs = model.predict_proba(texts)
+        except Exception:
+            probs = None
+    for i, p in enumerate(preds):
+        score = None
+        if probs is not None:
+            try:
+                classes = getattr(model, "classes_", None)
+                if classes is not None:
+                    pos_idx = None
+                    for candidate in ["positive", "pos", "1", 1, "Positive"]:
+                        if candidate in classes:
+                            pos_idx = list(classes).index(candidate)
+                            break
+                    if pos_idx is None:
+                        pos_idx = 1 if probs.shape[1] > 1 else 0
+                    score = float(probs[i, pos_idx])
+                else:
+                    score = float(probs[i].max())
+            except Exception:
+                score = float(probs[i].max())
+        results.append({"label": str(p), "score": score})
+    return results
+
+
+def use_model(model: Any) -> None:
+    app.activate_model(app.ModelHandle(model, None, "benchmark"))
+
+
+def time_path(fn: Callable[[List[str]], List[Dict[str, Any]]], texts: List[str], batch_size: int, repeat: int):
+    best = float("inf")
+    out: List[Dict[str, Any]] = []
+    for _ in range(repeat):
+        out = []
+        start = time.perf_counter()
+        for i in range(0, len(texts), batch_size):
+            out.extend(fn(texts[i:i + batch_size]))
+        best = min(best, time.perf_counter() - start)
+    return best, out
+
+
+def run(name: str, model: Any, texts: List[str], batch_size: int, repeat: int) -> None:
+    use_model(model)
+    old_s, old_out = time_path(lambda t: legacy_predict_texts(model, model_inputs(t)), texts, batch_size, repeat)
+    new_s, new_out = time_path(app.predict_texts, texts, batch_size, repeat)
+    same_labels = sum(a["label"] == b["label"] for a, b in zip(old_out, new_out))
+    print(f"[{name}] {len(texts)} texts, batch_size={batch_size}")
+    print(f"  legacy : {old_s:8.3f}s  ({len(texts) / old_s:10.0f} texts/s)")
+    print(f"  single : {new_s:8.3f}s  ({len(texts) / new_s:10.0f} texts/s)")
+    print(f"  speedup: {old_s / new_s:.2f}x, label agreement {same_labels}/{len(texts)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    df = load_all_reviews().dropna(subset=["Review_Text", "Reviewer_Rating"])
+    texts = df["Review_Text"].astype(str).tolist()
+
+    os.chdir(ROOT)
+    bundled = app.try_load_file(app.MODEL_FILENAMES)
+    if bundled is not None:
+        run("model.pkl", bundled, texts, args.batch_size, args.repeat)
+
+    from sklearn.feature_extraction.text import TfidfVectorizer
+    from sklearn.linear_model import LogisticRegression
+    from sklearn.pipeline import Pipeline
+
+    labels = df["Reviewer_Rating"].apply(lambda r: "Positive" if r > 3 else "Negative")
+    proba_model = Pipeline([
+        ("tfidf", TfidfVectorizer(ngram_range=(1, 2), min_df=5, max_features=5000, stop_words="english", sublinear_tf=True)),
+        ("model", LogisticRegression(max_iter=1000)),
+    ]).fit(model_inputs(texts), labels)  # as train.py fits
+    run("tfidf+logreg", proba_model, texts, args.batch_size, args.repeat)
+
+
+if __name__ == "__main__":
+    main()
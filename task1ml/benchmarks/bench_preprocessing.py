@@ -0,0 +1,85 @@
+"""
+Benchmark: review text normalization row by row (pandas .apply with Python
+lambdas, one pass per step, as in the notebooks) against the batched Arrow
+version in preprocessing.py, on the bundled review CSVs.
+
+Usage (from task1ml/):
+    python benchmarks/bench_preprocessing.py [--repeat 3] [--batch-size 0]
+
+--batch-size N also times preprocess_texts on request-sized batches of N.
+All paths must produce identical text; the script exits 1 if they do not.
+"""
+
+import argparse
+import os
+import re
+import sys
+import time
+import unicodedata
+from typing import Callable, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import pandas as pd  # noqa: E402
+
+import preprocessing  # noqa: E402
+from review_data import load_all_reviews  # noqa: E402
+
+
+def naive_preprocess(texts: List[str]) -> List[str]:
+    """One .apply per step, each a Python lambda per row."""
+    s = pd.Series(texts, dtype=object).fillna("").astype(str)
+    s = s.apply(lambda x: unicodedata.normalize("NFKC", x))
+    s = s.apply(lambda x: re.sub(r"\s*READ MORE\s*$", "", x))
+    s = s.apply(lambda x: "".join(f" {preprocessing.EMOJI_WORDS[c]} " if c in preprocessing.EMOJI_WORDS else c for c in x))
+    s = s.apply(lambda x: re.sub(preprocessing._EMOJI_PATTERN, " ", x))
+    s = s.apply(lambda x: x.lower())
+    s = s.apply(lambda x: re.sub(r"\s+", " ", x).strip())
+    return s.tolist()
+
+
+def best_of(fn: Callable[[], List[str]], repeat: int):
+    best, out = float("inf"), []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        out = fn()
+        best = min(best, time.perf_counter() - started)
+    return best, out
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--batch-size", type=int, default=0)
+    args = parser.parse_args()
+
+    texts = load_all_reviews()["Review_Text"].tolist()
+    paths = {
+        "naive .apply per step": lambda: naive_preprocess(texts),
+        "preprocess_text per row": lambda: [preprocessing.preprocess_text(t) for t in texts],
+        "preprocess_texts (Arrow)": lambda: preprocessing.preprocess_texts(texts),
+    }
+    if args.batch_size:
+        n = args.batch_size
+        paths[f"preprocess_texts, batches of {n}"] = lambda: [
+            t for i in range(0, len(texts), n) for t in preprocessing.preprocess_texts(texts[i:i + n])
+        ]
+
+    print(f"{len(texts)} reviews, best of {args.repeat}")
+    baseline_s, expected = None, None
+    mismatched = False
+    for name, fn in paths.items():
+        seconds, out = best_of(fn, args.repeat)
+        if expected is None:
+            baseline_s, expected = seconds, out
+        differ = sum(a != b for a, b in zip(expected, out))
+        mismatched |= differ > 0
+        print(f"  {name:<34} {seconds:8.3f}s  {len(texts) / seconds:10.0f} texts/s  "
+              f"{baseline_s / seconds:6.1f}x  ({differ} differ)")
+    return 1 if mismatched else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
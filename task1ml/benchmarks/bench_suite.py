@@ -0,0 +1,215 @@
+"""
+Reproducible benchmark suite for the sentiment model and API.
+
+Measures, on the three bundled review datasets (~20k reviews):
+ - dataset load time and peak memory (CSV parse, and the cleaned columnar cache)
+ - try_load_file load time and peak memory
+ - raw model.predict throughput at several batch sizes
+ - predict_texts overhead over raw predict at the same batch sizes
+ - end-to-end POST /api/predict latency through Flask's test client
+   (prediction cache disabled, then warm cache)
+
+Results are written as JSON tagged with the git commit and model version so
+runs can be compared across commits and retrained models.
+
+Usage (from task1ml/):
+    python benchmarks/bench_suite.py                       # -> benchmarks/results/<commit>-<model>.json
+    python benchmarks/bench_suite.py --quick --output run.json
+    python benchmarks/bench_suite.py --compare old.json new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.dirname(HERE)
+sys.path.insert(0, ROOT)
+
+import app  # noqa: E402
+from procstats import peak_rss_mb  # noqa: E402
+from review_data import ensure_review_cache, load_all_reviews, load_reviews  # noqa: E402
+
+BATCH_SIZES = [1, 8, 32, 128, 512, 2048]
+QUICK_BATCH_SIZES = [1, 32, 512]
+
+
+def git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True)
+        return out.stdout.strip() or "unknown"
+    except OSError:
+        return "unknown"
+
+
+def measure(fn: Callable[[], Any]) -> Dict[str, float]:
+    """Wall time and Python-heap peak of one call."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"seconds": round(elapsed, 4), "peak_mb": round(peak / (1024 * 1024), 2)}
+
+
+def latency_summary(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        return round(ordered[min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))] * 1000, 3)
+
+    return {"n": len(ordered), "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+            "p50_ms": pct(50), "p95_ms": pct(95), "p99_ms": pct(99)}
+
+
+def throughput(fn: Callable[[List[str]], Any], texts: List[str], batch_size: int, max_texts: int) -> Dict[str, float]:
+    texts = texts[:max_texts]
+    fn(texts[:batch_size])  # warm-up, not timed
+    started = time.perf_counter()
+    for i in range(0, len(texts), batch_size):
+        fn(texts[i:i + batch_size])
+    elapsed = time.perf_counter() - started
+    return {"texts": len(texts), "seconds": round(elapsed, 4), "texts_per_s": round(len(texts) / elapsed, 1)}
+
+
+def bench_loading(repeat: int) -> Dict[str, Any]:
+    dataset = measure(load_all_reviews)
+    ensure_review_cache()  # build outside the timing, as a warm deployment would
+    dataset_cached = measure(load_reviews)
+    model_runs = [measure(lambda: app.try_load_file(app.MODEL_FILENAMES, mmap_mode=app.MODEL_MMAP_MODE))
+                  for _ in range(repeat)]
+    return {
+        "dataset": dataset,
+        "dataset_cached": dataset_cached,
+        "model": {
+            "files": app.MODEL_FILENAMES,
+            "seconds_min": min(r["seconds"] for r in model_runs),
+            "seconds_median": statistics.median(r["seconds"] for r in model_runs),
+            "peak_mb": max(r["peak_mb"] for r in model_runs),
+        },
+    }
+
+
+def bench_predict(texts: List[str], batch_sizes: List[int], max_texts: int) -> Dict[str, Any]:
+    model = app.active_model.model
+    out: Dict[str, Any] = {}
+    for bs in batch_sizes:
+        # Small batches are slow per text; cap their work so the suite stays quick
+        limit = min(max_texts, 2000) if bs < 32 else max_texts
+        raw = throughput(model.predict, texts, bs, limit)
+        wrapped = throughput(app.predict_texts, texts, bs, limit)
+        out[str(bs)] = {
+            "raw_predict": raw,
+            "predict_texts": wrapped,
+            "overhead_pct": round((wrapped["seconds"] / raw["seconds"] - 1) * 100, 1) if raw["seconds"] else None,
+        }
+    return out
+
+
+def bench_api(texts: List[str], requests_per_case: int) -> Dict[str, Any]:
+    client = app.app.test_client()
+    cache = app.prediction_cache
+    out: Dict[str, Any] = {}
+
+    def run_case(batch: int) -> Dict[str, float]:
+        samples = []
+        for i in range(requests_per_case):
+            start = (i * batch) % max(1, len(texts) - batch)
+            payload = {"text": texts[start] if batch == 1 else texts[start:start + batch]}
+            started = time.perf_counter()
+            resp = client.post("/api/predict", json=payload)
+            samples.append(time.perf_counter() - started)
+            if resp.status_code != 200:
+                raise RuntimeError(f"/api/predict returned {resp.status_code}: {resp.get_data(as_text=True)}")
+        return latency_summary(samples)
+
+    app.prediction_cache = None
+    try:
+        out["uncached_batch_1"] = run_case(1)
+        out["uncached_batch_32"] = run_case(32)
+    finally:
+        app.prediction_cache = cache
+    if cache is not None:
+        cache.clear()
+        run_case(1)  # fill
+        out["cached_batch_1"] = run_case(1)
+    return out
+
+
+def compare(old_path: str, new_path: str) -> None:
+    with open(old_path) as f:
+        old = json.load(f)
+    with open(new_path) as f:
+        new = json.load(f)
+    print(f"old: {old['meta']['commit']} model {old['meta']['model_version']}")
+    print(f"new: {new['meta']['commit']} model {new['meta']['model_version']}")
+    for bs, row in new["predict"].items():
+        if bs in old["predict"]:
+            a = old["predict"][bs]["predict_texts"]["texts_per_s"]
+            b = row["predict_texts"]["texts_per_s"]
+            print(f"  predict_texts batch {bs:>5}: {a:>10} -> {b:>10} texts/s ({(b / a - 1) * 100:+.1f}%)")
+    for case, row in new["api"].items():
+        if case in old["api"]:
+            print(f"  api {case:<18}: p50 {old['api'][case]['p50_ms']} -> {row['p50_ms']} ms, "
+                  f"p99 {old['api'][case]['p99_ms']} -> {row['p99_ms']} ms")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", default=None, help="JSON output path")
+    parser.add_argument("--quick", action="store_true", help="fewer batch sizes and requests")
+    parser.add_argument("--repeat", type=int, default=3, help="model load repetitions")
+    parser.add_argument("--compare", nargs=2, metavar=("OLD", "NEW"), help="diff two result files and exit")
+    args = parser.parse_args()
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    os.chdir(ROOT)
+    app.load_artifacts()
+    if app.active_model is None:
+        parser.error("no model file found")
+
+    texts = load_all_reviews()["Review_Text"].dropna().astype(str).tolist()
+    batch_sizes = QUICK_BATCH_SIZES if args.quick else BATCH_SIZES
+    max_texts = 5000 if args.quick else len(texts)
+
+    results = {
+        "meta": {
+            "commit": git_commit(),
+            "model_version": app.current_model_version(),
+            "model_type": type(app.active_model.model).__name__,
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+            "texts": len(texts),
+        },
+        "loading": bench_loading(args.repeat),
+        "predict": bench_predict(texts, batch_sizes, max_texts),
+        "api": bench_api(texts, 100 if args.quick else 500),
+    }
+    results["meta"]["peak_rss_mb"] = peak_rss_mb()
+
+    output = args.output or os.path.join(
+        HERE, "results", f"{results['meta']['commit']}-{results['meta']['model_version']}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(json.dumps(results, indent=2))
+    print(f"Wrote {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
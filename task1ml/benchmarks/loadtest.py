@@ -0,0 +1,137 @@
+"""
+HTTP load-test harness for the sentiment API.
+
+Sends POST /api/predict requests from N concurrent keep-alive connections,
+using review texts from the bundled datasets, and reports throughput and
+latency percentiles. Run it against both serving modes to compare them:
+
+    python app.py                                   # Flask dev server on :5000
+    uvicorn asgi:asgi_app --port 8000               # ASGI mode
+
+    python benchmarks/loadtest.py --url http://127.0.0.1:5000 --concurrency 32 --duration 20
+    python benchmarks/loadtest.py --url http://127.0.0.1:8000 --concurrency 32 --duration 20
+
+Use --json to get machine-readable results.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Dict, List
+from urllib.parse import urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from review_data import load_all_reviews  # noqa: E402
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    if not sorted_values:
+        return float("nan")
+    idx = min(len(sorted_values) - 1, int(round(pct / 100.0 * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def worker(url: str, texts: List[str], batch: int, deadline: float, max_requests: int,
+           counter: Dict[str, int], lock: threading.Lock, latencies: List[float], statuses: Dict[int, int]) -> None:
+    parsed = urlparse(url)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+    rng = random.Random()
+    local_lat: List[float] = []
+    local_status: Dict[int, int] = {}
+    while time.perf_counter() < deadline:
+        with lock:
+            if max_requests and counter["sent"] >= max_requests:
+                break
+            counter["sent"] += 1
+        sample = rng.sample(texts, batch)
+        body = json.dumps({"text": sample[0] if batch == 1 else sample})
+        started = time.perf_counter()
+        try:
+            conn.request("POST", "/api/predict", body=body, headers={"Content-Type": "application/json"})
+            resp = conn.getresponse()
+            resp.read()
+            status = resp.status
+        except Exception:
+            status = 0
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port or 80, timeout=30)
+        elapsed = time.perf_counter() - started
+        local_status[status] = local_status.get(status, 0) + 1
+        if status == 200:
+            local_lat.append(elapsed)
+    conn.close()
+    with lock:
+        latencies.extend(local_lat)
+        for k, v in local_status.items():
+            statuses[k] = statuses.get(k, 0) + v
+
+
+def run(url: str, concurrency: int, duration: float, max_requests: int, batch: int) -> Dict[str, Any]:
+    texts = load_all_reviews()["Review_Text"].dropna().astype(str).tolist()
+    lock = threading.Lock()
+    counter = {"sent": 0}
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    deadline = time.perf_counter() + duration
+    threads = [
+        threading.Thread(target=worker, args=(url, texts, batch, deadline, max_requests, counter, lock, latencies, statuses))
+        for _ in range(concurrency)
+    ]
+    started = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    wall = time.perf_counter() - started
+
+    latencies.sort()
+    ok = len(latencies)
+    return {
+        "url": url,
+        "concurrency": concurrency,
+        "batch": batch,
+        "wall_s": round(wall, 3),
+        "requests": sum(statuses.values()),
+        "ok": ok,
+        "status_counts": {str(k): v for k, v in sorted(statuses.items())},
+        "req_per_s": round(ok / wall, 1) if wall else None,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50) * 1000, 2),
+            "p95": round(percentile(latencies, 95) * 1000, 2),
+            "p99": round(percentile(latencies, 99) * 1000, 2),
+            "max": round(latencies[-1] * 1000, 2) if latencies else None,
+        },
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", default="http://127.0.0.1:5000")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds")
+    parser.add_argument("--requests", type=int, default=0, help="stop after this many requests (0 = duration only)")
+    parser.add_argument("--batch", type=int, default=1, help="reviews per request")
+    parser.add_argument("--json", action="store_true")
+    args = parser.parse_args()
+
+    result = run(args.url, args.concurrency, args.duration, args.requests, args.batch)
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        lat = result["latency_ms"]
+        print(f"{result['url']}  concurrency={result['concurrency']} batch={result['batch']}")
+        print(f"  {result['ok']}/{result['requests']} ok in {result['wall_s']}s -> {result['req_per_s']} req/s")
+        print(f"  latency ms: p50={lat['p50']} p95={lat['p95']} p99={lat['p99']} max={lat['max']}")
+        print(f"  status codes: {result['status_counts']}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
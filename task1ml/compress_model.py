@@ -0,0 +1,151 @@
+"""
+Pruned and quantized variants of the sentiment model, with an accuracy-vs-speed report.
+
+Features are ranked by their largest absolute coefficient; pruning keeps the
+top fraction and drops the rest from both the vocabulary (so vectorizing does
+less work) and the classifier. Each kept-fraction is written as:
+ - a pruned scikit-learn pipeline (`.pkl`, loads anywhere model.pkl does)
+ - sparse-linear files (`.slm`, see sparse_linear.py) with float64, float16
+   and int8 coefficients
+
+Every variant is scored on the bundled review datasets and reported with its
+agreement with the original model, accuracy against rating-derived labels
+(rating > 3 -> Positive), batch and single-review latency, and file size.
+
+Usage:
+    python compress_model.py                           # fractions 1.0 0.5 0.25 0.1 -> compressed/
+    python compress_model.py --keep 0.3 0.05 --output-dir variants --json report.json
+"""
+
+import argparse
+import copy
+import json
+import os
+import pickle
+import statistics
+import sys
+import time
+from typing import Any, Callable, Dict, List
+
+import numpy as np
+
+from app import MODEL_FILENAMES, try_load_file
+from preprocessing import model_inputs
+from review_data import load_all_reviews
+from sparse_linear import SparseLinearModel, unwrap_pipeline, export_sparse_linear
+
+COEF_DTYPES = ["float64", "float16", "int8"]
+
+
+def feature_ranking(model: Any) -> np.ndarray:
+    """Feature columns ordered from most to least influential."""
+    _, classifier = unwrap_pipeline(model)
+    weight = np.abs(np.atleast_2d(classifier.coef_)).max(axis=0)
+    return np.argsort(-weight, kind="stable")
+
+
+def prune_pipeline(model: Any, cols: np.ndarray) -> Any:
+    """Copy of the (unwrapped) pipeline restricted to feature columns `cols`."""
+    pipeline = copy.deepcopy(getattr(model, "best_estimator_", model))
+    vectorizer, classifier = pipeline.steps[0][1], pipeline.steps[1][1]
+    cols = np.sort(cols)
+    inverse = {old: new for new, old in enumerate(cols)}
+    vectorizer.vocabulary_ = {t: inverse[c] for t, c in vectorizer.vocabulary_.items() if c in inverse}
+    if getattr(vectorizer, "use_idf", True):
+        vectorizer.idf_ = np.asarray(vectorizer.idf_)[cols]
+        # TfidfVectorizer keeps its fitted TfidfTransformer privately; it validates width
+        tfidf = getattr(vectorizer, "_tfidf", None)
+        if tfidf is not None and hasattr(tfidf, "n_features_in_"):
+            tfidf.n_features_in_ = len(cols)
+    # Terms dropped at fit time (stop_words_) are not used by transform(); keep the pickle small
+    if hasattr(vectorizer, "stop_words_"):
+        vectorizer.stop_words_ = None
+    classifier.coef_ = np.ascontiguousarray(np.atleast_2d(classifier.coef_)[:, cols])
+    if hasattr(classifier, "n_features_in_"):
+        classifier.n_features_in_ = len(cols)
+    return pipeline
+
+
+def time_single(predict: Callable[[List[str]], Any], texts: List[str], n: int = 300) -> float:
+    samples = []
+    for text in texts[:n]:
+        started = time.perf_counter()
+        predict([text])
+        samples.append(time.perf_counter() - started)
+    return statistics.median(samples) * 1000
+
+
+def evaluate(name: str, path: str, predict: Callable[[List[str]], Any], texts: List[str],
+             baseline: np.ndarray, truth: np.ndarray, n_features: int) -> Dict[str, Any]:
+    started = time.perf_counter()
+    preds = np.asarray(predict(texts))
+    batch_s = time.perf_counter() - started
+    return {
+        "variant": name,
+        "path": path,
+        "features": int(n_features),
+        "size_kb": round(os.path.getsize(path) / 1024, 1) if path else None,
+        "agreement": round(float((preds == baseline).mean()), 5),
+        "accuracy": round(float((preds == truth).mean()), 5),
+        "batch_texts_per_s": round(len(texts) / batch_s, 1),
+        "single_p50_ms": round(time_single(predict, texts), 4),
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=None, help="model file (default: first of MODEL_FILENAMES)")
+    parser.add_argument("--keep", type=float, nargs="+", default=[1.0, 0.5, 0.25, 0.1],
+                        help="fractions of features to keep, by |coef|")
+    parser.add_argument("--output-dir", default="compressed")
+    parser.add_argument("--json", default=None, help="also write the report as JSON")
+    args = parser.parse_args(argv)
+
+    source = [args.source] if args.source else MODEL_FILENAMES
+    model = try_load_file(source)
+    if model is None:
+        parser.error("no model file found")
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    df = load_all_reviews().dropna(subset=["Review_Text", "Reviewer_Rating"])
+    # Scored as the service would send them (PREPROCESS_TEXTS)
+    texts = model_inputs(df["Review_Text"].astype(str).tolist())
+    truth = np.where(df["Reviewer_Rating"].astype(float) > 3, "Positive", "Negative")
+    baseline = np.asarray(model.predict(texts))
+
+    source_path = next((fn for fn in source if os.path.exists(fn)), None)
+    ranking = feature_ranking(model)
+    rows = [evaluate("original", source_path, model.predict, texts, baseline, truth, len(ranking))]
+
+    for keep in args.keep:
+        n_keep = max(1, int(round(len(ranking) * keep)))
+        cols = np.sort(ranking[:n_keep])
+        tag = f"keep{int(round(keep * 100)):03d}"
+
+        pruned = prune_pipeline(model, cols)
+        pkl_path = os.path.join(args.output_dir, f"model_{tag}.pkl")
+        with open(pkl_path, "wb") as f:
+            pickle.dump(pruned, f)
+        rows.append(evaluate(f"{tag} sklearn", pkl_path, pruned.predict, texts, baseline, truth, n_keep))
+
+        for dtype in COEF_DTYPES:
+            slm_path = os.path.join(args.output_dir, f"model_{tag}_{dtype}.slm")
+            export_sparse_linear(model, slm_path, coef_dtype=dtype, keep_features=cols)
+            compact = SparseLinearModel.load(slm_path)
+            rows.append(evaluate(f"{tag} slm/{dtype}", slm_path, compact.predict, texts, baseline, truth, n_keep))
+
+    header = f"{'variant':<22}{'features':>9}{'size KiB':>10}{'agree':>9}{'accuracy':>10}{'texts/s':>11}{'1-text ms':>11}"
+    print(header)
+    print("-" * len(header))
+    for r in rows:
+        print(f"{r['variant']:<22}{r['features']:>9}{r['size_kb']:>10}{r['agreement']:>9.4f}"
+              f"{r['accuracy']:>10.4f}{r['batch_texts_per_s']:>11.0f}{r['single_p50_ms']:>11.3f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({"texts": len(texts), "variants": rows}, f, indent=2)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
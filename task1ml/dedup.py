@@ -0,0 +1,229 @@
+"""
+Near-duplicate review detection with MinHash signatures and an LSH band index.
+
+Each review is normalized (preprocessing.preprocess_texts), cut into 5-byte
+character shingles and summarized by a 64-value MinHash signature; two
+signatures agree in a position with probability equal to the Jaccard
+similarity of the shingle sets. The signature is split into 16 bands of 4
+values and each band is hashed into a bucket table, so reviews sharing any
+band become candidates without comparing against the whole corpus.
+
+Clustering is leader-based and incremental: a review joins the cluster of the
+most similar earlier representative whose estimated Jaccard similarity is at
+least `threshold` (default 0.8), otherwise it becomes a new representative.
+Only representatives are stored in the bucket tables, so memory and query
+cost grow with the number of distinct reviews, not with duplicates.
+
+Signatures are computed for a whole batch at once with NumPy (shingle hashes
+over one concatenated byte buffer, one vectorized pass per permutation).
+
+Usage:
+    index = NearDuplicateIndex()
+    reps = index.add_batch(texts, ids=range(len(texts)))   # representative id per text
+    index.query("Very nice product")                      # ids in that review's cluster
+    index.clusters()                                      # [[rep, dup, dup, ...], ...]
+
+    python dedup.py                                       # report on the bundled CSVs
+    python score_reviews.py --dedupe                      # score one review per cluster
+"""
+
+import argparse
+import sys
+import time
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Sequence
+
+import numpy as np
+
+from preprocessing import preprocess_texts
+from review_data import canonical_column, find_review_csvs, product_name, read_reviews_csv
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64(0xFFFFFFFF)
+_FNV_PRIME = np.uint64(1099511628211)
+_BAND_PRIME = np.uint64(0x100000001B3)
+
+
+def shingle_hashes(texts: Sequence[str], k: int = 5):
+    """(hashes, starts): 32-bit hashes of every k-byte shingle, and each text's first index.
+
+    Texts shorter than k bytes get one shingle (zero-padded), so every text has
+    at least one and empty texts all hash alike.
+    """
+    encoded = [t.encode("utf-8") for t in texts]
+    lengths = np.fromiter((len(e) for e in encoded), dtype=np.int64, count=len(encoded))
+    pad = b"\0" * k
+    buf = np.frombuffer(b"".join(e + pad for e in encoded), dtype=np.uint8)
+    doc_starts = np.concatenate(([0], np.cumsum(lengths + k)[:-1]))
+    counts = np.maximum(lengths - k + 1, 1)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+
+    # Byte position of every shingle: each text's offset plus 0..count-1
+    positions = np.arange(counts.sum()) - np.repeat(starts, counts) + np.repeat(doc_starts, counts)
+    h = np.zeros(len(positions), dtype=np.uint64)
+    for j in range(k):
+        h = h * _FNV_PRIME + buf[positions + j]
+    return (h ^ (h >> np.uint64(32))) & _MAX_HASH, starts
+
+
+class NearDuplicateIndex:
+    """Incremental MinHash/LSH index that groups near-identical reviews."""
+
+    def __init__(self, num_perm: int = 64, bands: int = 16, threshold: float = 0.8,
+                 shingle_size: int = 5, seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.shingle_size = shingle_size
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in range(bands)]
+        self._rep_ids: List[Hashable] = []
+        self._rep_sigs = np.empty((1024, num_perm), dtype=np.uint32)
+        self._duplicates: Dict[int, List[Hashable]] = {}
+        self._rep_index: Dict[Hashable, int] = {}
+        self.docs = 0
+
+    def signatures(self, texts: Sequence[str]) -> np.ndarray:
+        """(len(texts), num_perm) uint32 MinHash signatures."""
+        texts = preprocess_texts(texts)
+        if not texts:
+            return np.empty((0, self.num_perm), dtype=np.uint32)
+        # Exact repeats (common in scraped reviews) are hashed once
+        unique: Dict[str, int] = {}
+        inverse = np.fromiter((unique.setdefault(t, len(unique)) for t in texts), dtype=np.int64, count=len(texts))
+        hashes, starts = shingle_hashes(list(unique), self.shingle_size)
+        sigs = np.empty((len(unique), self.num_perm), dtype=np.uint32)
+        for i in range(self.num_perm):
+            permuted = ((self._a[i] * hashes + self._b[i]) % _MERSENNE_PRIME) & _MAX_HASH
+            sigs[:, i] = np.minimum.reduceat(permuted, starts)
+        return sigs[inverse]
+
+    def _band_keys(self, sigs: np.ndarray) -> np.ndarray:
+        bands = sigs.reshape(len(sigs), self.bands, self.rows).astype(np.uint64)
+        keys = np.zeros((len(sigs), self.bands), dtype=np.uint64)
+        for r in range(self.rows):
+            keys = keys * _BAND_PRIME + bands[:, :, r]
+        return keys
+
+    def _best_rep(self, sig: np.ndarray, keys: np.ndarray) -> Optional[int]:
+        """Internal index of the most similar representative at or above threshold."""
+        candidates = set()
+        for band, key in enumerate(keys.tolist()):
+            candidates.update(self._tables[band].get(key, ()))
+        if not candidates:
+            return None
+        cand = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+        similarity = (self._rep_sigs[cand] == sig).mean(axis=1)
+        best = int(similarity.argmax())
+        return int(cand[best]) if similarity[best] >= self.threshold else None
+
+    def _add_rep(self, doc_id: Hashable, sig: np.ndarray, keys: np.ndarray) -> None:
+        idx = len(self._rep_ids)
+        if idx == len(self._rep_sigs):
+            self._rep_sigs = np.concatenate([self._rep_sigs, np.empty_like(self._rep_sigs)])
+        self._rep_sigs[idx] = sig
+        self._rep_ids.append(doc_id)
+        self._rep_index[doc_id] = idx
+        for band, key in enumerate(keys.tolist()):
+            self._tables[band].setdefault(key, []).append(idx)
+
+    def add_batch(self, texts: Sequence[str], ids: Optional[Iterable[Hashable]] = None) -> List[Hashable]:
+        """Index `texts` in order; returns the representative id for each (its own id if new).
+
+        `ids` default to a running document counter.
+        """
+        ids = list(ids) if ids is not None else list(range(self.docs, self.docs + len(texts)))
+        if len(ids) != len(texts):
+            raise ValueError("ids and texts differ in length")
+        sigs = self.signatures(texts)
+        keys = self._band_keys(sigs)
+        reps: List[Hashable] = []
+        for doc_id, sig, key in zip(ids, sigs, keys):
+            best = self._best_rep(sig, key)
+            if best is None:
+                self._add_rep(doc_id, sig, key)
+                reps.append(doc_id)
+            else:
+                self._duplicates.setdefault(best, []).append(doc_id)
+                reps.append(self._rep_ids[best])
+        self.docs += len(texts)
+        return reps
+
+    def query(self, text: str) -> List[Hashable]:
+        """Ids of the cluster `text` falls into (representative first), or [] if none."""
+        sig = self.signatures([text])
+        best = self._best_rep(sig[0], self._band_keys(sig)[0])
+        if best is None:
+            return []
+        return [self._rep_ids[best]] + self._duplicates.get(best, [])
+
+    def cluster_of(self, rep_id: Hashable) -> List[Hashable]:
+        idx = self._rep_index[rep_id]
+        return [rep_id] + self._duplicates.get(idx, [])
+
+    def clusters(self, min_size: int = 2) -> List[List[Hashable]]:
+        """Clusters with at least `min_size` members, largest first."""
+        out = [[self._rep_ids[idx]] + dups for idx, dups in self._duplicates.items() if len(dups) + 1 >= min_size]
+        out.sort(key=len, reverse=True)
+        return out
+
+    def stats(self) -> Dict[str, Any]:
+        duplicates = sum(len(d) for d in self._duplicates.values())
+        return {
+            "docs": self.docs,
+            "representatives": len(self._rep_ids),
+            "duplicates": duplicates,
+            "clusters": len(self._duplicates),
+            "largest_cluster": max((len(d) + 1 for d in self._duplicates.values()), default=1 if self.docs else 0),
+            "duplicate_fraction": round(duplicates / self.docs, 4) if self.docs else 0.0,
+        }
+
+
+def index_csvs(paths: Sequence[str], index: Optional[NearDuplicateIndex] = None, chunksize: int = 50000,
+               text_column: str = "Review_Text"):
+    """Ingest review CSVs chunk by chunk; ids are (product, row). Returns (index, texts by id)."""
+    index = index or NearDuplicateIndex()
+    texts_by_id: Dict[Hashable, str] = {}
+    for path in paths:
+        product, row = product_name(path), 0
+        for chunk in read_reviews_csv(path, chunksize=chunksize, usecols=lambda c: canonical_column(c) == text_column):
+            texts = chunk[text_column].fillna("").astype(str).tolist()
+            ids = [(product, row + i) for i in range(len(texts))]
+            index.add_batch(texts, ids)
+            texts_by_id.update(zip(ids, texts))
+            row += len(texts)
+    return index, texts_by_id
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="CSV files (default: bundled reviews_*/data.csv)")
+    parser.add_argument("--threshold", type=float, default=0.8, help="estimated Jaccard similarity to merge")
+    parser.add_argument("--top", type=int, default=10, help="largest clusters to print")
+    args = parser.parse_args(argv)
+
+    started = time.perf_counter()
+    index, texts = index_csvs(args.inputs or find_review_csvs(), NearDuplicateIndex(threshold=args.threshold))
+    elapsed = time.perf_counter() - started
+    stats = index.stats()
+    print(f"Indexed {stats['docs']} reviews in {elapsed:.2f}s ({stats['docs'] / elapsed:,.0f}/s): {stats}")
+
+    for cluster in index.clusters()[:args.top]:
+        sample = texts[cluster[0]]
+        print(f"  {len(cluster):>5} x {sample[:70]!r}  (e.g. {texts[cluster[-1]][:40]!r})")
+
+    started = time.perf_counter()
+    probe = list(texts.values())[:1000]
+    for text in probe:
+        index.query(text)
+    print(f"query: {(time.perf_counter() - started) / len(probe) * 1000:.3f} ms per review")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
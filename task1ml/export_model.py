@@ -0,0 +1,89 @@
+"""
+Export the trained model to formats that load faster at serving time.
+
+Usage:
+    python export_model.py                      # model.pkl -> model.joblib
+    python export_model.py --source best_model.pkl --output model.joblib
+    python export_model.py --format slm --verify  # model.pkl -> model.slm, checked on the review CSVs
+
+`model.joblib` is written uncompressed by joblib.dump, which stores numpy arrays
+(TF-IDF idf_, classifier coefficients) as raw buffers that `joblib.load(...,
+mmap_mode="r")` can memory-map instead of copying. Serve it with
+MODEL_FILE=model.joblib (see app.py).
+
+`model.slm` is the compact sparse-linear format from sparse_linear.py: a single
+memory-mappable file scored with NumPy alone, for TF-IDF + linear pipelines.
+Serve it with MODEL_FILE=model.slm; --verify checks that its predictions match
+`model.predict` on every bundled review.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+
+import joblib
+
+from app import MODEL_FILENAMES, try_load_file
+from sparse_linear import SparseLinearModel, export_sparse_linear
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def export_joblib(model, output: str) -> None:
+    # compress=0 keeps arrays mmap-able
+    joblib.dump(model, output, compress=0)
+
+
+def verify_sparse_linear(model, output: str) -> int:
+    """Compare .slm predictions with the source model on the bundled reviews; returns mismatches."""
+    from review_data import load_all_reviews
+
+    texts = load_all_reviews()["Review_Text"].fillna("").astype(str).tolist()
+    compact = SparseLinearModel.load(output)
+    started = time.perf_counter()
+    expected = model.predict(texts)
+    sklearn_s = time.perf_counter() - started
+    started = time.perf_counter()
+    actual = compact.predict(texts)
+    compact_s = time.perf_counter() - started
+    mismatches = int((expected != actual).sum())
+    logger.info(
+        f"Verified {len(texts)} reviews: {mismatches} mismatches "
+        f"(sklearn {sklearn_s:.3f}s, sparse-linear {compact_s:.3f}s)"
+    )
+    return mismatches
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default=None, help="model file to export (default: first of MODEL_FILENAMES)")
+    parser.add_argument("--format", choices=["joblib", "slm"], default="joblib")
+    parser.add_argument("--output", default=None, help="default: model.<format>")
+    parser.add_argument("--verify", action="store_true", help="(slm) check predictions against the source model")
+    args = parser.parse_args(argv)
+    output = args.output or f"model.{args.format}"
+
+    model = try_load_file([args.source] if args.source else MODEL_FILENAMES)
+    if model is None:
+        parser.error("no model file found")
+
+    if args.format == "slm":
+        export_sparse_linear(model, output)
+    else:
+        export_joblib(model, output)
+    logger.info(f"Wrote {output} ({os.path.getsize(output) / 1024:.1f} KiB)")
+
+    started = time.perf_counter()
+    try_load_file([output], mmap_mode="r")
+    logger.info(f"Reload check with mmap_mode='r': {time.perf_counter() - started:.3f}s")
+
+    if args.verify and args.format == "slm" and verify_sparse_linear(model, output):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
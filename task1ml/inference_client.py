@@ -0,0 +1,308 @@
+"""
+Client for a shared sentiment inference backend.
+
+UI processes (streamlit_app.py) call one of these backends instead of each
+unpickling the model:
+
+ - HttpBackend: the Flask/ASGI service (POST /api/predict), over a pool of
+   keep-alive HTTP connections
+ - SocketBackend: a local worker (inference_worker.py) on a Unix socket,
+   newline-delimited JSON over a pool of persistent connections
+ - LocalBackend: the model file loaded in-process (the previous behavior,
+   used when no backend is configured)
+
+Results are cached client-side in a PredictionCache (LRU + TTL, keyed on the
+exact text and model name; the backend's preprocessing is not known here), so
+reruns and repeated reviews do not reach the backend at all. A request that
+fails on a pooled connection the server had already closed (reset or closed
+before any response arrived) is sent once more on a new connection.
+Timeouts and every other error are raised without retrying.
+
+Only the standard library is needed for the remote backends, so a UI replica
+starts without importing scikit-learn.
+
+Usage:
+    client = client_from_env()      # INFERENCE_URL, else INFERENCE_SOCKET, else MODEL_FILE in-process
+    client.predict(["great product", "waste of money"])   # [{"label": ..., "score": ..., ...}, ...]
+    client.predict(["nice tea"], model="tea")             # a named model of the service (app.py MODELS)
+    client.stats()
+"""
+
+import http.client
+import json
+import logging
+import os
+import queue
+import socket
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import urlsplit
+
+from prediction_cache import PredictionCache
+
+logger = logging.getLogger(__name__)
+
+INFERENCE_URL = os.environ.get("INFERENCE_URL", "")
+INFERENCE_SOCKET = os.environ.get("INFERENCE_SOCKET", "")
+INFERENCE_POOL_SIZE = int(os.environ.get("INFERENCE_POOL_SIZE", "4"))
+INFERENCE_TIMEOUT_S = float(os.environ.get("INFERENCE_TIMEOUT_S", "10"))
+CLIENT_CACHE_SIZE = int(os.environ.get("CLIENT_CACHE_SIZE", "10000"))
+CLIENT_CACHE_TTL_S = float(os.environ.get("CLIENT_CACHE_TTL_S", "300"))
+
+
+class InferenceError(RuntimeError):
+    """The backend answered with an error (bad request, unknown model, model failure)."""
+
+
+# What a send on a pooled connection the server has since closed fails with
+STALE_CONNECTION_ERRORS = (http.client.RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+
+
+class _StaleConnection(Exception):
+    """A reused connection turned out to be closed before the request got any response."""
+
+
+def _predictions(result: Any) -> List[Dict[str, Any]]:
+    if not isinstance(result, dict) or not isinstance(result.get("predictions"), list):
+        raise InferenceError(f"Malformed response from the inference backend: {str(result)[:200]}")
+    return result["predictions"]
+
+
+class _Pool:
+    """Reusable connections: idle ones are kept (up to `size`), broken ones dropped.
+
+    `connection()` yields (connection, reused); fresh=True skips the idle ones.
+    """
+
+    def __init__(self, connect: Callable[[], Any], size: int):
+        self.connect = connect
+        self._idle: "queue.LifoQueue" = queue.LifoQueue(maxsize=size)
+        self.connects = 0
+        self.reuses = 0
+
+    @contextmanager
+    def connection(self, fresh: bool = False) -> Iterator[Tuple[Any, bool]]:
+        conn = None
+        if not fresh:
+            try:
+                conn = self._idle.get_nowait()
+                self.reuses += 1
+            except queue.Empty:
+                pass
+        reused = conn is not None
+        if conn is None:
+            conn = self.connect()
+            self.connects += 1
+        try:
+            yield conn, reused
+        except BaseException:
+            conn.close()
+            raise
+        try:
+            self._idle.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+
+    def close(self) -> None:
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                return
+
+
+class HttpBackend:
+    """POST /api/predict on the sentiment service over pooled keep-alive connections."""
+
+    def __init__(self, url: str, pool_size: int = INFERENCE_POOL_SIZE, timeout_s: float = INFERENCE_TIMEOUT_S):
+        parsed = urlsplit(url)
+        if parsed.scheme not in ("http", "https") or not parsed.hostname:
+            raise ValueError(f"INFERENCE_URL must be an http(s) URL, got {url!r}")
+        conn_cls = http.client.HTTPSConnection if parsed.scheme == "https" else http.client.HTTPConnection
+        self.name = url
+        self.path = parsed.path.rstrip("/") + "/api/predict"
+        self.pool = _Pool(lambda: conn_cls(parsed.hostname, parsed.port, timeout=timeout_s), pool_size)
+
+    def _post(self, body: bytes, headers: Dict[str, str], fresh: bool) -> Tuple[Any, bytes]:
+        with self.pool.connection(fresh) as (conn, reused):
+            try:
+                conn.request("POST", self.path, body, headers)
+                response = conn.getresponse()
+            except STALE_CONNECTION_ERRORS as ex:
+                if reused:
+                    raise _StaleConnection() from ex
+                raise
+            return response, response.read()
+
+    def predict(self, texts: List[str], model: Optional[str] = None) -> List[Dict[str, Any]]:
+        payload: Dict[str, Any] = {"text": texts}
+        if model:
+            payload["model"] = model
+        body = json.dumps(payload).encode("utf-8")
+        headers = {"Content-Type": "application/json", "Connection": "keep-alive"}
+        try:
+            response, data = self._post(body, headers, fresh=False)
+        except _StaleConnection:
+            # Closed by the server while idle, before it answered: resend once on a new connection
+            response, data = self._post(body, headers, fresh=True)
+        result = json.loads(data) if data else {}
+        if response.status != 200:
+            error = result.get("error") if isinstance(result, dict) else None
+            raise InferenceError(f"{response.status}: {error or response.reason}")
+        return _predictions(result)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class _SocketConnection:
+    __slots__ = ("sock", "file")
+
+    def __init__(self, path: str, timeout_s: float):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(timeout_s)
+        self.sock.connect(path)
+        self.file = self.sock.makefile("rwb")
+
+    def close(self) -> None:
+        try:
+            self.file.close()  # flushes; fails if the worker already closed its end
+        except OSError:
+            pass
+        self.sock.close()
+
+
+class SocketBackend:
+    """A local inference_worker.py on a Unix socket: one JSON line per request and per response."""
+
+    def __init__(self, path: str, pool_size: int = INFERENCE_POOL_SIZE, timeout_s: float = INFERENCE_TIMEOUT_S):
+        self.name = f"unix:{path}"
+        self.path = path
+        self.pool = _Pool(lambda: _SocketConnection(path, timeout_s), pool_size)
+
+    def _exchange(self, line: bytes, fresh: bool) -> bytes:
+        with self.pool.connection(fresh) as (conn, reused):
+            try:
+                conn.file.write(line)
+                conn.file.flush()
+                reply = conn.file.readline()
+                if not reply:
+                    raise ConnectionResetError("inference worker closed the connection")
+            except STALE_CONNECTION_ERRORS as ex:
+                if reused:
+                    raise _StaleConnection() from ex
+                raise
+            return reply
+
+    def predict(self, texts: List[str], model: Optional[str] = None) -> List[Dict[str, Any]]:
+        line = json.dumps({"texts": texts, "model": model}).encode("utf-8") + b"\n"
+        try:
+            reply = self._exchange(line, fresh=False)
+        except _StaleConnection:
+            # e.g. the worker restarted since this connection was pooled
+            reply = self._exchange(line, fresh=True)
+        result = json.loads(reply)
+        if isinstance(result, dict) and "error" in result:
+            raise InferenceError(result["error"])
+        return _predictions(result)
+
+    def close(self) -> None:
+        self.pool.close()
+
+
+class LocalBackend:
+    """The model file loaded in this process (what streamlit_app.py did before)."""
+
+    def __init__(self, model_file: str):
+        self.name = f"local:{model_file}"
+        self.model_file = model_file
+        self._model = None
+        self._lock = threading.Lock()
+
+    def _load(self) -> Any:
+        with self._lock:
+            if self._model is None:
+                if self.model_file.endswith(".slm"):
+                    from sparse_linear import SparseLinearModel
+
+                    self._model = SparseLinearModel.load(self.model_file)
+                else:
+                    import pickle
+
+                    with open(self.model_file, "rb") as f:
+                        self._model = pickle.load(f)
+        return self._model
+
+    def predict(self, texts: List[str], model: Optional[str] = None) -> List[Dict[str, Any]]:
+        from preprocessing import preprocess_texts
+
+        if model:
+            raise InferenceError(f"Named models ({model!r}) need INFERENCE_URL or INFERENCE_SOCKET")
+        preds = self._load().predict(preprocess_texts(texts))
+        return [{"label": str(p), "score": None} for p in preds]
+
+    def close(self) -> None:
+        pass
+
+
+class InferenceClient:
+    """A backend behind a client-side prediction cache, with request stats."""
+
+    def __init__(self, backend: Any, cache_size: int = CLIENT_CACHE_SIZE, cache_ttl_s: float = CLIENT_CACHE_TTL_S):
+        self.backend = backend
+        self.cache = (
+            PredictionCache(lambda: backend.name, max_entries=cache_size, ttl_s=cache_ttl_s, normalize_fn=list)
+            if cache_size > 0 else None
+        )
+        self._lock = threading.Lock()
+        self.calls = 0
+        self.backend_calls = 0
+        self.backend_s = 0.0
+
+    def _call_backend(self, texts: List[str], model: Optional[str]) -> List[Dict[str, Any]]:
+        started = time.perf_counter()
+        try:
+            return self.backend.predict(texts, model)
+        finally:
+            with self._lock:
+                self.backend_calls += 1
+                self.backend_s += time.perf_counter() - started
+
+    def predict(self, texts: List[str], model: Optional[str] = None) -> List[Dict[str, Any]]:
+        with self._lock:
+            self.calls += 1
+        if self.cache is None:
+            return self._call_backend(texts, model)
+        return self.cache.predict(texts, lambda batch: self._call_backend(batch, model), namespace="\0" + (model or ""))
+
+    def stats(self) -> Dict[str, Any]:
+        pool = getattr(self.backend, "pool", None)
+        with self._lock:
+            out = {
+                "backend": self.backend.name,
+                "calls": self.calls,
+                "backend_calls": self.backend_calls,
+                "backend_ms_mean": (self.backend_s / self.backend_calls * 1000.0) if self.backend_calls else None,
+            }
+        if pool is not None:
+            out["pool"] = {"connects": pool.connects, "reuses": pool.reuses}
+        if self.cache is not None:
+            out["cache"] = self.cache.stats()
+        return out
+
+    def close(self) -> None:
+        self.backend.close()
+
+
+def client_from_env(model_file: Optional[str] = None) -> InferenceClient:
+    """INFERENCE_URL (HTTP service), else INFERENCE_SOCKET (local worker), else `model_file` in-process."""
+    if INFERENCE_URL:
+        backend = HttpBackend(INFERENCE_URL)
+    elif INFERENCE_SOCKET:
+        backend = SocketBackend(INFERENCE_SOCKET)
+    else:
+        backend = LocalBackend(model_file or os.environ.get("MODEL_FILE", "model.pkl"))
+    logger.info(f"Inference backend: {backend.name}")
+    return InferenceClient(backend)
@@ -0,0 +1,105 @@
+"""
+Local inference worker on a Unix socket, shared by every UI process on the host.
+
+Loads the model once (app.load_artifacts, plus the MODELS registry) and
+answers newline-delimited JSON requests on persistent connections, one thread
+per connection:
+
+    -> {"texts": ["great product"], "model": null}
+    <- {"predictions": [{"label": "Positive", "score": null, "model_version": "..."}]}
+    <- {"error": "..."}                      # bad request, unknown model, model failure
+
+Requests go through app.score_texts, so preprocessing, the prediction cache,
+micro-batching (BATCHING_ENABLED=1) and named models behave as in the Flask
+service.
+
+The socket is created with mode 0600, so only processes running as the same
+user as the worker can use it.
+
+Usage:
+    python inference_worker.py --socket /tmp/sentiment.sock
+    INFERENCE_SOCKET=/tmp/sentiment.sock streamlit run streamlit_app.py
+"""
+
+import argparse
+import json
+import logging
+import os
+import socketserver
+import sys
+from typing import Any, Dict
+
+import app as flask_service
+from model_registry import UnknownModelError
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SOCKET = os.environ.get("INFERENCE_SOCKET", "/tmp/sentiment.sock")
+
+
+def handle_request(line: bytes) -> Dict[str, Any]:
+    try:
+        request = json.loads(line)
+    except ValueError:
+        return {"error": "Invalid JSON request"}
+    texts = request.get("texts") if isinstance(request, dict) else None
+    if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+        return {"error": "'texts' must be a list of strings"}
+    model_name = request.get("model")
+    if model_name is not None and not isinstance(model_name, str):
+        return {"error": "'model' must be a string"}
+    try:
+        return {"predictions": flask_service.score_texts(texts, model_name)}
+    except UnknownModelError:
+        return {"error": f"Unknown model {model_name!r}"}
+    except Exception as ex:
+        return {"error": str(ex)}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            self.wfile.write(json.dumps(handle_request(line)).encode("utf-8") + b"\n")
+            self.wfile.flush()
+
+
+class InferenceServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def serve(path: str) -> None:
+    flask_service.load_artifacts()
+    flask_service.build_model_registry()
+    if flask_service.BATCHING_ENABLED:
+        flask_service.start_batcher()
+    if os.path.exists(path):
+        os.unlink(path)  # left over from a previous run
+    # Created 0600 (umask applies to bind) so only this user can connect and submit texts
+    umask = os.umask(0o177)
+    try:
+        server = InferenceServer(path, _Handler)
+    finally:
+        os.umask(umask)
+    with server:
+        logger.info(f"Inference worker listening on {path} (model {flask_service.current_model_version()})")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Unix socket path (default: INFERENCE_SOCKET)")
+    args = parser.parse_args(argv)
+    try:
+        serve(args.socket)
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
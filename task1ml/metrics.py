@@ -0,0 +1,191 @@
+"""
+Minimal Prometheus-style metrics (counters and histograms) for the sentiment service.
+
+Metrics live in the process that records them; under a pre-fork server each
+worker exposes its own series, so scrape per worker or aggregate by `pid`. A
+worker process that serves no /metrics of its own can hand its observations to
+one that does: drain() in the worker, merge() the result in the server.
+
+Usage:
+    REQUESTS = Counter("sentiment_requests_total", "Requests served", ["endpoint", "status"])
+    REQUESTS.inc(endpoint="/api/predict", status="200")
+
+    STAGE_SECONDS = Histogram("sentiment_stage_seconds", "Time per stage", ["stage", "step"])
+    with STAGE_SECONDS.time(stage="vectorize", step="tfidf"):
+        ...
+
+    render()  # text exposition format for a /metrics route
+
+    merge(worker_deltas)  # worker_deltas = drain(), run in the worker process
+"""
+
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Seconds; fine-grained at the low end where single-review stages live
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+_registry: List["_Metric"] = []
+_collectors: List[Callable[[], List[str]]] = []
+_registry_lock = threading.Lock()
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: Optional[Tuple[str, str]] = None) -> str:
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra is not None:
+        pairs.append(f'{extra[0]}="{extra[1]}"')
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        with _registry_lock:
+            _registry.append(self)
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    def _drain(self) -> List[Tuple[Tuple[str, ...], Any]]:
+        with self._lock:
+            items = list(self._values.items())
+            self._values.clear()
+        return items
+
+    def header(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def _merge(self, key: Tuple[str, ...], value: float) -> None:
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return self.header() + [
+            f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(v)}" for key, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # key -> (per-bucket counts incl. +Inf, sum)
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], float]] = {}
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        idx = bisect_left(self.buckets, value)
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            counts[idx] += 1
+            self._values[key] = (counts, total + value)
+
+    def _merge(self, key: Tuple[str, ...], value: Tuple[List[int], float]) -> None:
+        other_counts, other_total = value
+        with self._lock:
+            counts, total = self._values.get(key) or ([0] * (len(self.buckets) + 1), 0.0)
+            self._values[key] = ([a + b for a, b in zip(counts, other_counts)], total + other_total)
+
+    @contextmanager
+    def time(self, **labels: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, (list(c), s)) for k, (c, s) in self._values.items())
+        lines = self.header()
+        for key, (counts, total) in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = ("le", _format_value(bound))
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, le)} {cumulative}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(total)}")
+            lines.append(f"{self.name}_count{labels} {cumulative}")
+        return lines
+
+
+def gauge_lines(name: str, documentation: str, value: Optional[float], labels: str = "") -> List[str]:
+    """Exposition lines for a value read at scrape time (e.g. cache or batcher stats)."""
+    if value is None:
+        return []
+    return [f"# HELP {name} {documentation}", f"# TYPE {name} gauge", f"{name}{labels} {_format_value(value)}"]
+
+
+def register_collector(fn: Callable[[], List[str]]) -> None:
+    """Add a callable that returns extra exposition lines on every render()."""
+    with _registry_lock:
+        _collectors.append(fn)
+
+
+def drain() -> List[Tuple[str, Tuple[str, ...], Any]]:
+    """Take every series recorded in this process since the last drain, resetting them."""
+    with _registry_lock:
+        metrics = list(_registry)
+    return [(metric.name, key, value) for metric in metrics for key, value in metric._drain()]
+
+
+def merge(deltas: List[Tuple[str, Tuple[str, ...], Any]]) -> None:
+    """Add another process's drain() to the metrics of the same name here."""
+    with _registry_lock:
+        by_name = {metric.name: metric for metric in _registry}
+    for name, key, value in deltas:
+        metric = by_name.get(name)
+        if metric is not None:
+            metric._merge(key, value)
+
+
+def render() -> str:
+    with _registry_lock:
+        metrics = list(_registry)
+        collectors = list(_collectors)
+    lines: List[str] = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    for fn in collectors:
+        lines.extend(fn())
+    return "\n".join(lines) + "\n"
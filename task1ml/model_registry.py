@@ -0,0 +1,224 @@
+"""
+Named sentiment models served side by side from one process.
+
+Models are declared up front (name -> file) and loaded on first request.
+Each loaded model's memory is estimated from the arrays, dicts and strings it
+holds (`estimate_size`); when loading one more would push the total past
+`budget_bytes`, least recently used models are evicted until it fits. A model
+evicted while a request still holds it stays alive until that request
+finishes; it is only dropped from the registry.
+
+Per-model request, text and load counts, hits (requests served by an already
+resident model), evictions and latency percentiles are kept for /api/models.
+
+Usage (see app.py):
+    registry = ModelRegistry({"tea": "models/tea.pkl", "tawa": "models/tawa.pkl"},
+                             loader=load_model, budget_bytes=512 << 20)
+    handle = registry.get("tea")               # loads on first use; UnknownModelError if unknown
+    registry.record("tea", seconds, texts=3)
+    registry.stats()
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Optional, Sequence
+
+from batching import _percentile
+
+logger = logging.getLogger(__name__)
+
+# Number of recent requests per model kept for latency percentiles
+STATS_WINDOW = 2048
+
+
+def estimate_size(obj: Any, _seen: Optional[set] = None) -> int:
+    """Approximate bytes held by a loaded model: array buffers plus Python containers and strings."""
+    seen = set() if _seen is None else _seen
+    stack = [obj]
+    total = 0
+    while stack:
+        item = stack.pop()
+        if id(item) in seen:
+            continue
+        seen.add(id(item))
+        nbytes = getattr(item, "nbytes", None)
+        if isinstance(nbytes, int) and hasattr(item, "dtype"):
+            # NumPy arrays: count the buffer once, however many views share it
+            base = getattr(item, "base", None)
+            total += nbytes if base is None or id(base) not in seen else 0
+            continue
+        total += sys.getsizeof(item, 0)
+        if isinstance(item, dict):
+            stack.extend(item.keys())
+            stack.extend(item.values())
+        elif isinstance(item, (list, tuple, set, frozenset)):
+            stack.extend(item)
+        elif hasattr(item, "__dict__") and not isinstance(item, type):
+            stack.append(item.__dict__)
+    return total
+
+
+class UnknownModelError(KeyError):
+    """No model of that name is declared (a KeyError, for callers that catch that)."""
+
+
+class _Entry:
+    __slots__ = ("handle", "size", "loaded_at")
+
+    def __init__(self, handle: Any, size: int):
+        self.handle = handle
+        self.size = size
+        self.loaded_at = time.time()
+
+
+class _ModelStats:
+    __slots__ = ("requests", "hits", "texts", "loads", "load_s", "evictions", "errors", "last_used", "latencies_ms")
+
+    def __init__(self):
+        self.requests = 0
+        self.hits = 0
+        self.texts = 0
+        self.loads = 0
+        self.load_s = 0.0
+        self.evictions = 0
+        self.errors = 0
+        self.last_used: Optional[float] = None
+        self.latencies_ms: deque = deque(maxlen=STATS_WINDOW)
+
+
+class ModelRegistry:
+    """Lazily loaded named models with LRU eviction under a memory budget."""
+
+    def __init__(
+        self,
+        paths: Dict[str, str],
+        loader: Callable[[str], Any],
+        budget_bytes: int = 512 << 20,
+        size_fn: Callable[[Any], int] = estimate_size,
+    ):
+        self.paths = dict(paths)
+        self.loader = loader
+        self.budget_bytes = budget_bytes
+        self.size_fn = size_fn
+        self._loaded: "OrderedDict[str, _Entry]" = OrderedDict()
+        self._stats: Dict[str, _ModelStats] = {}
+        self._lock = threading.Lock()
+        # One lock per model so concurrent first requests load it once, without blocking other models
+        self._load_locks = {name: threading.Lock() for name in self.paths}
+
+    def names(self):
+        return list(self.paths)
+
+    def _model_stats(self, name: str) -> _ModelStats:
+        stats = self._stats.get(name)
+        if stats is None:
+            stats = self._stats[name] = _ModelStats()
+        return stats
+
+    def _resident(self, name: str) -> Any:
+        entry = self._loaded.get(name)
+        if entry is None:
+            return None
+        self._loaded.move_to_end(name)
+        self._model_stats(name).hits += 1
+        return entry.handle
+
+    def get(self, name: str) -> Any:
+        """The loaded model for `name`, loading it (and evicting others) if needed."""
+        if name not in self.paths:
+            raise UnknownModelError(name)
+        with self._lock:
+            handle = self._resident(name)
+        if handle is not None:
+            return handle
+
+        with self._load_locks[name]:
+            with self._lock:
+                handle = self._resident(name)
+            if handle is not None:
+                return handle
+            started = time.perf_counter()
+            handle = self.loader(self.paths[name])
+            if handle is None:
+                raise RuntimeError(f"Could not load model {name!r} from {self.paths[name]}")
+            size = self.size_fn(handle)
+            elapsed = time.perf_counter() - started
+            with self._lock:
+                self._evict_for(size)
+                self._loaded[name] = _Entry(handle, size)
+                stats = self._model_stats(name)
+                stats.loads += 1
+                stats.load_s += elapsed
+            logger.info(f"Loaded model {name!r} from {self.paths[name]} in {elapsed:.3f}s "
+                        f"(~{size / 2**20:.1f} MB, {self.resident_bytes() / 2**20:.1f} MB resident)")
+            return handle
+
+    def _evict_for(self, size: int) -> None:
+        # Caller holds self._lock
+        used = sum(e.size for e in self._loaded.values())
+        while self._loaded and used + size > self.budget_bytes:
+            name, entry = self._loaded.popitem(last=False)
+            used -= entry.size
+            self._model_stats(name).evictions += 1
+            logger.info(f"Evicted model {name!r} (~{entry.size / 2**20:.1f} MB) to stay under the memory budget")
+        if used + size > self.budget_bytes:
+            logger.warning(f"Model of ~{size / 2**20:.1f} MB exceeds the {self.budget_bytes / 2**20:g} MB budget on its own")
+
+    def evict(self, name: str) -> bool:
+        with self._lock:
+            entry = self._loaded.pop(name, None)
+            if entry is not None:
+                self._model_stats(name).evictions += 1
+            return entry is not None
+
+    def record(self, name: str, seconds: float, texts: int = 1, error: bool = False) -> None:
+        """Account one request to `name` (any name, so the default model is reported too)."""
+        with self._lock:
+            stats = self._model_stats(name)
+            stats.requests += 1
+            stats.texts += texts
+            stats.errors += int(error)
+            stats.last_used = time.time()
+            stats.latencies_ms.append(seconds * 1000.0)
+
+    def resident_bytes(self) -> int:
+        with self._lock:
+            return sum(e.size for e in self._loaded.values())
+
+    def stats(self, include: Sequence[str] = ()) -> Dict[str, Any]:
+        """Registry totals and per-model counters; `include` adds names reported via record() only."""
+        with self._lock:
+            models = {}
+            for name in dict.fromkeys(list(self.paths) + list(include) + list(self._stats)):
+                stats = self._model_stats(name)
+                entry = self._loaded.get(name)
+                latencies = list(stats.latencies_ms)
+                models[name] = {
+                    "path": self.paths.get(name),
+                    "resident": entry is not None if name in self.paths else None,
+                    "size_mb": round(entry.size / 2**20, 2) if entry is not None else None,
+                    "version": getattr(entry.handle, "version", None) if entry is not None else None,
+                    "requests": stats.requests,
+                    "hits": stats.hits,
+                    "texts": stats.texts,
+                    "errors": stats.errors,
+                    "loads": stats.loads,
+                    "load_s": round(stats.load_s, 4),
+                    "evictions": stats.evictions,
+                    "last_used": stats.last_used,
+                    "latency_ms": {
+                        "mean": (sum(latencies) / len(latencies)) if latencies else None,
+                        "p50": _percentile(latencies, 50),
+                        "p99": _percentile(latencies, 99),
+                    },
+                }
+            used = sum(e.size for e in self._loaded.values())
+        return {
+            "budget_mb": round(self.budget_bytes / 2**20, 2),
+            "resident_mb": round(used / 2**20, 2),
+            "resident": [n for n in self._loaded],
+            "models": models,
+        }
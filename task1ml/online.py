@@ -0,0 +1,361 @@
+"""
+Incremental (online) sentiment model updates from new reviews.
+
+Instead of refitting TF-IDF over every review (train.py), the online model is a
+Pipeline of a stateless HashingVectorizer and an SGDClassifier updated with
+`partial_fit`, so each update costs time proportional to the new rows only.
+
+New labelled rows come from two sources, each tailed from a saved byte offset:
+ - review CSVs (`reviews_*/data.csv`): appended rows, labelled by
+   Reviewer_Rating > 3 like train.py
+ - the feedback spool (FEEDBACK_FILE, default feedback.jsonl next to this file;
+   JSON lines written by POST /api/feedback):
+   {"text": "...", "label": "Positive"} or {"text": "...", "rating": 2}
+
+Rows are learned in mini-batches. The model is checkpointed atomically (write +
+rename) every `checkpoint_s` seconds when it changed, followed by a small state
+file holding the source offsets, so a restart resumes where the last checkpoint
+left off (rows after it are learned again: at-least-once). On first run, with
+no saved offsets, the existing rows are learned once as a bootstrap.
+
+The checkpoint is an ordinary pickled Pipeline with predict_proba, so the
+service loads it through the normal reload path:
+ - in-process: ONLINE_LEARNING=1 MODEL_FILE=model_online.pkl python app.py
+   (each checkpoint is swapped in with reload_model)
+ - separate process: python online.py, with the service started as
+   MODEL_FILE=model_online.pkl MODEL_WATCH_INTERVAL_S=5
+
+Usage:
+    python online.py --once                        # learn everything new, checkpoint, exit
+    python online.py --poll-s 5 --checkpoint-s 60  # keep tailing
+    python online.py --no-csvs --feedback feedback.jsonl
+"""
+
+import argparse
+import io
+import json
+import logging
+import os
+import pickle
+import sys
+import tempfile
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.linear_model import SGDClassifier
+from sklearn.pipeline import Pipeline
+
+from preprocessing import model_inputs
+from review_data import clean_reviews, find_review_csvs, normalize_columns
+from train import texts_and_labels
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLASSES = np.array(["Negative", "Positive"])
+# Shared with app.py, which starts the learner with these defaults
+DEFAULT_CHECKPOINT = os.environ.get("ONLINE_CHECKPOINT", os.path.join(HERE, "model_online.pkl"))
+DEFAULT_FEEDBACK = os.environ.get("FEEDBACK_FILE", os.path.join(HERE, "feedback.jsonl"))
+
+# Bytes read per source per poll, so a large backlog is learned in bounded memory
+MAX_READ_BYTES = 8 * 1024 * 1024
+
+
+def build_online_pipeline(n_features: int = 2 ** 20) -> Pipeline:
+    return Pipeline([
+        ("hashing", HashingVectorizer(
+            ngram_range=(1, 2), stop_words="english", n_features=n_features, alternate_sign=False, norm="l2",
+        )),
+        ("model", SGDClassifier(loss="log_loss", alpha=1e-5, random_state=0)),
+    ])
+
+
+def _atomic_write(path: str, data: bytes) -> None:
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+class _TailSource:
+    """Complete records appended to a file since a byte offset.
+
+    `read_records` leaves the offset alone; `read` moves it past the records
+    only once they parsed, so a failed parse is retried on the next poll
+    instead of skipping them.
+    """
+
+    def __init__(self, path: str, offset: Optional[int] = None):
+        self.path = path
+        self.offset = offset
+
+    def _start_offset(self, f) -> int:
+        return 0
+
+    def _records_end(self, data: bytes) -> int:
+        """Length of the complete records at the start of `data` (one per line)."""
+        return data.rfind(b"\n") + 1
+
+    def read_records(self) -> Tuple[bytes, int]:
+        """(complete records after the offset, offset just past them)."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return b"", self.offset
+        with open(self.path, "rb") as f:
+            start = self._start_offset(f)
+            if self.offset is None or size < self.offset:
+                # First run, or the file was truncated/replaced: read it from the start
+                self.offset = start
+            limit = MAX_READ_BYTES
+            while True:
+                f.seek(self.offset)
+                data = f.read(min(size - self.offset, limit))
+                # A partially written last record is left for the next poll
+                end = self._records_end(data)
+                if end or len(data) < limit:
+                    return data[:end], self.offset + end
+                # One record is larger than the read size
+                limit *= 2
+
+
+class CsvTail(_TailSource):
+    """New rows of a review CSV, with canonical column names."""
+
+    def __init__(self, path: str, offset: Optional[int] = None):
+        super().__init__(path, offset)
+        self._header = b""
+
+    def _start_offset(self, f) -> int:
+        if not self._header:
+            f.seek(0)
+            self._header = f.readline()
+        return len(self._header)
+
+    def _records_end(self, data: bytes) -> int:
+        # A newline ends a row only outside a quoted field, i.e. after an even number of quotes
+        buf = np.frombuffer(data, dtype=np.uint8)
+        newlines = np.flatnonzero(buf == ord("\n"))
+        quotes = np.cumsum(buf == ord('"'))
+        ends = newlines[quotes[newlines] % 2 == 0]
+        return int(ends[-1]) + 1 if len(ends) else 0
+
+    def read(self) -> Tuple[List[str], np.ndarray]:
+        data, end = self.read_records()
+        if not data:
+            return [], np.empty(0, dtype=object)
+        df = normalize_columns(pd.read_csv(io.BytesIO(self._header + data)))
+        texts, labels = texts_and_labels(clean_reviews(df))
+        self.offset = end
+        return texts, labels
+
+
+class FeedbackTail(_TailSource):
+    """Labelled texts from the JSON-lines feedback spool."""
+
+    def read(self) -> Tuple[List[str], np.ndarray]:
+        data, end = self.read_records()
+        texts, labels = [], []
+        for line in data.splitlines():
+            try:
+                item = json.loads(line)
+                label = feedback_label(item)
+            except ValueError as ex:
+                logger.warning(f"Skipping feedback line in {self.path}: {ex}")
+                continue
+            texts.append(item["text"])
+            labels.append(label)
+        texts = model_inputs(texts)
+        self.offset = end
+        return texts, np.array(labels, dtype=object)
+
+
+def feedback_label(item: Dict[str, Any]) -> str:
+    """Label of a feedback item ({"text", "label"} or {"text", "rating"}); ValueError if invalid."""
+    if not isinstance(item, dict) or not isinstance(item.get("text"), str) or not item["text"].strip():
+        raise ValueError("feedback needs a non-empty 'text'")
+    if "label" in item:
+        if item["label"] not in CLASSES:
+            raise ValueError(f"'label' must be one of {CLASSES.tolist()}")
+        return item["label"]
+    if isinstance(item.get("rating"), (int, float)):
+        return "Positive" if item["rating"] > 3 else "Negative"
+    raise ValueError("feedback needs a 'label' or a numeric 'rating'")
+
+
+class OnlineLearner:
+    """Tails review sources, updates the online pipeline in mini-batches and checkpoints it."""
+
+    def __init__(
+        self,
+        checkpoint_path: str = DEFAULT_CHECKPOINT,
+        csv_paths: Optional[List[str]] = None,
+        feedback_path: Optional[str] = DEFAULT_FEEDBACK,
+        batch_size: int = 1000,
+        checkpoint_s: float = 60.0,
+        on_checkpoint: Optional[Callable[[str], None]] = None,
+    ):
+        self.checkpoint_path = checkpoint_path
+        self.feedback_path = feedback_path
+        self.state_path = os.path.splitext(checkpoint_path)[0] + ".state.json"
+        self.batch_size = batch_size
+        self.checkpoint_s = checkpoint_s
+        self.on_checkpoint = on_checkpoint
+
+        state = self._load_state()
+        offsets = state.get("offsets", {})
+        self.sources: List[_TailSource] = [CsvTail(p, offsets.get(p)) for p in (csv_paths or [])]
+        if feedback_path:
+            self.sources.append(FeedbackTail(feedback_path, offsets.get(feedback_path)))
+
+        self.pipeline = self._load_pipeline()
+        self._stats = {
+            "rows_learned": state.get("rows_learned", 0),
+            "batches": 0,
+            "pending_rows": 0,
+            "partial_fit_s": 0.0,
+            "checkpoints": 0,
+            "last_checkpoint_s": None,
+            "last_checkpoint_at": state.get("checkpoint_at"),
+        }
+        self._last_checkpoint = time.monotonic()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load_state(self) -> Dict[str, Any]:
+        try:
+            with open(self.state_path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _load_pipeline(self) -> Pipeline:
+        if os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "rb") as f:
+                logger.info(f"Resuming online model from {self.checkpoint_path}")
+                return pickle.load(f)
+        return build_online_pipeline()
+
+    def learn(self, texts: List[str], labels: np.ndarray) -> None:
+        """partial_fit on `texts` in mini-batches of batch_size."""
+        vectorizer, model = self.pipeline.named_steps["hashing"], self.pipeline.named_steps["model"]
+        for i in range(0, len(texts), self.batch_size):
+            started = time.perf_counter()
+            batch_labels = labels[i:i + self.batch_size]
+            model.partial_fit(vectorizer.transform(texts[i:i + self.batch_size]), batch_labels, classes=CLASSES)
+            with self._lock:
+                self._stats["partial_fit_s"] += time.perf_counter() - started
+                self._stats["batches"] += 1
+                self._stats["rows_learned"] += len(batch_labels)
+                self._stats["pending_rows"] += len(batch_labels)
+
+    def step(self, force_checkpoint: bool = False) -> int:
+        """Learn every new row from all sources; checkpoint when due. Returns rows learned."""
+        learned = 0
+        for source in self.sources:
+            # Drain the source a bounded read at a time
+            while True:
+                texts, labels = source.read()
+                if not texts:
+                    break
+                self.learn(texts, labels)
+                learned += len(texts)
+        due = time.monotonic() - self._last_checkpoint >= self.checkpoint_s
+        if self._stats["pending_rows"] and (due or force_checkpoint):
+            self.checkpoint()
+        return learned
+
+    def checkpoint(self) -> None:
+        started = time.perf_counter()
+        _atomic_write(self.checkpoint_path, pickle.dumps(self.pipeline, protocol=pickle.HIGHEST_PROTOCOL))
+        # The state is written after the model, so offsets never run ahead of it
+        state = {
+            "offsets": {s.path: s.offset for s in self.sources if s.offset is not None},
+            "rows_learned": self._stats["rows_learned"],
+            "checkpoint_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        _atomic_write(self.state_path, json.dumps(state, indent=2).encode("utf-8"))
+        elapsed = time.perf_counter() - started
+        self._last_checkpoint = time.monotonic()
+        with self._lock:
+            pending = self._stats["pending_rows"]
+            self._stats.update({
+                "pending_rows": 0,
+                "checkpoints": self._stats["checkpoints"] + 1,
+                "last_checkpoint_s": round(elapsed, 4),
+                "last_checkpoint_at": state["checkpoint_at"],
+            })
+        logger.info(f"Checkpointed online model ({pending} new rows) to {self.checkpoint_path} in {elapsed:.3f}s")
+        if self.on_checkpoint is not None:
+            self.on_checkpoint(self.checkpoint_path)
+
+    def run(self, poll_s: float) -> None:
+        while not self._stop.is_set():
+            try:
+                self.step()
+            except Exception as ex:
+                logger.exception("Online update failed: %s", ex)
+            self._stop.wait(poll_s)
+
+    def start(self, poll_s: float) -> None:
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self.run, args=(poll_s,), name="online-learner", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            out = dict(self._stats)
+        out["partial_fit_s"] = round(out["partial_fit_s"], 4)
+        out["checkpoint_path"] = self.checkpoint_path
+        out["sources"] = {s.path: s.offset for s in self.sources}
+        return out
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    parser.add_argument("--feedback", default=DEFAULT_FEEDBACK, help="feedback spool (JSON lines)")
+    parser.add_argument("--no-csvs", action="store_true", help="do not tail the bundled review CSVs")
+    parser.add_argument("--csv", nargs="*", default=None, help="review CSVs to tail (default: bundled)")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--poll-s", type=float, default=5.0)
+    parser.add_argument("--checkpoint-s", type=float, default=60.0)
+    parser.add_argument("--once", action="store_true", help="learn what is new, checkpoint and exit")
+    args = parser.parse_args(argv)
+
+    csv_paths = [] if args.no_csvs else (args.csv if args.csv is not None else find_review_csvs())
+    learner = OnlineLearner(args.checkpoint, csv_paths, args.feedback, args.batch_size, args.checkpoint_s)
+    if args.once:
+        started = time.perf_counter()
+        rows = learner.step(force_checkpoint=True)
+        logger.info(f"Learned {rows} rows in {time.perf_counter() - started:.2f}s: {learner.stats()}")
+        return 0
+    try:
+        learner.run(args.poll_s)
+    except KeyboardInterrupt:
+        if learner.stats()["pending_rows"]:
+            learner.checkpoint()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
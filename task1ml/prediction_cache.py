@@ -0,0 +1,147 @@
+"""
+Bounded LRU/TTL cache for sentiment predictions.
+
+Entries are keyed by a hash of the review text as the model will see it
+(`normalize_fn` of the texts given; app.py passes them already preprocessed)
+plus the active model version (`fingerprint_fn`), so loading or hot-reloading
+a different model invalidates every cached result. Models sharing one cache
+are kept apart by a per-call `namespace` (e.g. a registry model's version).
+Only cache misses are sent to the model (in one batch, duplicates collapsed)
+and results are merged back in the caller's order.
+
+Usage (see app.py):
+    cache = PredictionCache(current_model_version, max_entries=50000, ttl_s=3600, normalize_fn=list)
+    results = cache.predict(prepare_texts(texts), predict_prepared_texts)
+    results = cache.predict(texts, tea_predict, namespace="\0" + tea_handle.version)
+    cache.stats()  # hits / misses / evictions / expirations
+"""
+
+import hashlib
+import logging
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Case- and whitespace-insensitive form of a review (a default TfidfVectorizer ignores both)."""
+    return _WHITESPACE_RE.sub(" ", str(text)).strip().lower()
+
+
+def normalize_texts(texts: List[str]) -> List[str]:
+    return [normalize_text(t) for t in texts]
+
+
+def file_digest(path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class PredictionCache:
+    """Thread-safe LRU cache with per-entry TTL in front of a batch predict function.
+
+    `normalize_fn` maps a batch of texts to what the predict function's model
+    sees; two texts share a cached result only when it maps them to the same string.
+    """
+
+    def __init__(self, fingerprint_fn: Callable[[], str], max_entries: int = 50000, ttl_s: float = 3600.0,
+                 normalize_fn: Callable[[List[str]], List[str]] = normalize_texts):
+        self.fingerprint_fn = fingerprint_fn
+        self.normalize_fn = normalize_fn
+        self.max_entries = max_entries
+        self.ttl_s = ttl_s
+        self._entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._fingerprint: Optional[str] = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(normalized: str, fingerprint: str) -> str:
+        return hashlib.blake2b((fingerprint + "\0" + normalized).encode("utf-8"), digest_size=16).hexdigest()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def _check_fingerprint(self) -> str:
+        fp = self.fingerprint_fn()
+        if fp != self._fingerprint:
+            with self._lock:
+                if fp != self._fingerprint:
+                    if self._fingerprint is not None:
+                        logger.info(f"Model fingerprint changed ({self._fingerprint} -> {fp}); clearing prediction cache")
+                        self.invalidations += 1
+                    self._entries.clear()
+                    self._fingerprint = fp
+        return fp
+
+    def predict(self, texts: List[str], predict_fn: Callable[[List[str]], List[Dict[str, Any]]],
+                namespace: str = "") -> List[Dict[str, Any]]:
+        """Cached results for `texts`; `namespace` separates models sharing one cache (e.g. a model's version)."""
+        fp = self._check_fingerprint()
+        keys = [self.key(t, fp + namespace) for t in self.normalize_fn(texts)]
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        # key -> positions in `texts` still waiting for a model result
+        missing: "OrderedDict[str, List[int]]" = OrderedDict()
+
+        now = time.monotonic()
+        with self._lock:
+            for i, k in enumerate(keys):
+                entry = self._entries.get(k)
+                if entry is not None:
+                    expires_at, value = entry
+                    if expires_at > now:
+                        self._entries.move_to_end(k)
+                        results[i] = dict(value)
+                        self.hits += 1
+                        continue
+                    del self._entries[k]
+                    self.expirations += 1
+                self.misses += 1
+                missing.setdefault(k, []).append(i)
+
+        if missing:
+            miss_texts = [texts[positions[0]] for positions in missing.values()]
+            scored = predict_fn(miss_texts)
+            expires_at = time.monotonic() + self.ttl_s
+            with self._lock:
+                for (k, positions), value in zip(missing.items(), scored):
+                    for i in positions:
+                        results[i] = dict(value)
+                    if self._fingerprint == fp:
+                        self._entries[k] = (expires_at, value)
+                        self._entries.move_to_end(k)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+
+        return results
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_s": self.ttl_s,
+                "model_fingerprint": self._fingerprint,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": (self.hits / lookups) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+            }
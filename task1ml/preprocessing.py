@@ -0,0 +1,117 @@
+"""
+Review text normalization shared by training and serving.
+
+With PREPROCESS_TEXTS=1, train.py / online.py (through `model_inputs`) and
+app.predict_texts run reviews through `preprocess_texts`, so a model sees text
+cleaned the same way at fit and at predict time:
+
+ 1. Unicode NFKC normalization (full-width letters, ligatures)
+ 2. the trailing "READ MORE" left by the Flipkart scraper is stripped
+ 3. common sentiment emojis become words ("😍" -> " love "), other emojis and
+    pictographs become spaces, so they separate words instead of joining them
+ 4. lowercase
+ 5. runs of whitespace collapse to one space, ends trimmed
+
+`preprocess_texts` runs each step once over the whole batch with Arrow compute
+kernels (RE2 regexes, no per-row Python). Below VECTORIZED_MIN_BATCH texts,
+where kernel dispatch costs more than the work, and when pyarrow is not
+installed, it runs `preprocess_text` per row instead. `preprocess_text` is the reference
+implementation; both produce identical output (see
+benchmarks/bench_preprocessing.py).
+
+The default, PREPROCESS_TEXTS=0, gives models the raw review text: that is
+how the bundled model.pkl was trained, and preprocessing its input changes
+2.8% of its labels. Set it to 1 for training and serving alike, since a model
+should only be served with the input it was trained and evaluated on.
+
+Usage:
+    preprocess_texts(["Great product 😍😍READ MORE", None])  # ['great product love love', '']
+    model_inputs(texts)                                     # what the model sees under PREPROCESS_TEXTS
+"""
+
+import os
+import re
+import unicodedata
+from typing import Any, Dict, List, Optional, Sequence
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+except Exception:
+    pa = None
+    pc = None
+
+# Whether models are trained on and served preprocess_texts output (1) or the raw review text (0)
+PREPROCESS_TEXTS = os.environ.get("PREPROCESS_TEXTS", "0") == "1"
+
+# Emojis frequent in the review data that carry sentiment, mapped to words the vectorizer can use
+EMOJI_WORDS: Dict[str, str] = {
+    "😍": "love", "🥰": "love", "😘": "love", "❤": "love", "💕": "love", "💖": "love", "♥": "love",
+    "👍": "good", "👌": "good", "👏": "good", "🙏": "thanks", "💯": "perfect", "🔥": "great", "⭐": "star",
+    "😊": "happy", "😀": "happy", "😁": "happy", "😃": "happy", "😄": "happy", "🙂": "happy", "🤗": "happy",
+    "😋": "tasty", "😂": "funny", "🤣": "funny",
+    "👎": "bad", "😡": "angry", "😠": "angry", "🤬": "angry",
+    "😞": "sad", "😔": "sad", "😢": "sad", "😭": "sad", "☹": "sad", "🙁": "sad",
+    "🤮": "disgusting", "🤢": "disgusting", "😒": "unhappy", "😑": "unhappy", "😐": "neutral",
+}
+
+# Measured crossover: smaller batches are faster through the per-row path
+VECTORIZED_MIN_BATCH = 128
+
+_READ_MORE_PATTERN = r"\s*READ MORE\s*$"
+# Pictographs, emoticons, dingbats, flags, and the joiners/selectors that combine them.
+# Python expands the escapes, so Python re and RE2 both see literal characters.
+_EMOJI_PATTERN = (
+    "[\U0001F000-\U0001FAFF\u2300-\u23FF\u2600-\u27BF\u2B00-\u2BFF"
+    "\uFE00-\uFE0F\u200D\u20E3\U000E0020-\U000E007F]"
+)
+_WHITESPACE_PATTERN = r"\s+"
+
+_READ_MORE_RE = re.compile(_READ_MORE_PATTERN)
+_EMOJI_RE = re.compile(_EMOJI_PATTERN)
+_WHITESPACE_RE = re.compile(_WHITESPACE_PATTERN)
+_SPACE = pa.scalar(" ", pa.large_string()) if pa is not None else None
+_EMOJI_TABLE = str.maketrans({emoji: f" {word} " for emoji, word in EMOJI_WORDS.items()})
+
+
+def preprocess_text(text: Optional[Any]) -> str:
+    """Normalize one review (reference implementation of preprocess_texts)."""
+    if text is None or (isinstance(text, float) and text != text):
+        return ""
+    text = unicodedata.normalize("NFKC", str(text))
+    text = _READ_MORE_RE.sub("", text)
+    text = _EMOJI_RE.sub(" ", text.translate(_EMOJI_TABLE))
+    return _WHITESPACE_RE.sub(" ", text.lower()).strip()
+
+
+def _preprocess_array(arr: "pa.Array") -> "pa.Array":
+    arr = pc.fill_null(arr.cast(pa.large_string()), "")
+    # NFKC and emojis only concern non-ASCII rows (a fifth of the reviews); run those steps on just them
+    non_ascii = pc.invert(pc.string_is_ascii(arr))
+    if pc.any(non_ascii).as_py():
+        sub = pc.utf8_normalize(arr.filter(non_ascii), form="NFKC")
+        for emoji, word in EMOJI_WORDS.items():
+            sub = pc.replace_substring(sub, emoji, f" {word} ")
+        sub = pc.replace_substring_regex(sub, _EMOJI_PATTERN, " ")
+        arr = pc.replace_with_mask(arr, non_ascii, sub)
+    arr = pc.replace_substring_regex(arr, _READ_MORE_PATTERN, "")
+    arr = pc.utf8_lower(arr)
+    # Splitting on whitespace runs and re-joining is about twice as fast as a \s+ regex
+    arr = pc.binary_join(pc.utf8_split_whitespace(arr), _SPACE)
+    return pc.utf8_trim_whitespace(arr)
+
+
+def preprocess_texts(texts: Sequence[Any]) -> List[str]:
+    """Normalize a batch of reviews; None/NaN become empty strings."""
+    if pc is None or len(texts) < VECTORIZED_MIN_BATCH:
+        return [preprocess_text(t) for t in texts]
+    try:
+        arr = pa.array(texts, type=pa.large_string(), from_pandas=True)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        arr = pa.array([t if t is None or t != t else str(t) for t in texts], type=pa.large_string(), from_pandas=True)
+    return _preprocess_array(arr).to_pylist()
+
+
+def model_inputs(texts: Sequence[Any]) -> List[str]:
+    """`texts` as a model gets them: preprocessed with PREPROCESS_TEXTS=1, else unchanged."""
+    return preprocess_texts(texts) if PREPROCESS_TEXTS else list(texts)
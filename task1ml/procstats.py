@@ -0,0 +1,47 @@
+"""
+Process memory measurements for the sentiment service.
+
+On Linux, /proc/self/smaps_rollup separates pages shared with other processes
+(e.g. a memory-mapped model shared by pre-forked workers through the page
+cache) from private ones; PSS charges each shared page fractionally, so summing
+PSS over workers gives the real footprint. Elsewhere only peak RSS is known.
+"""
+
+import os
+from typing import Dict, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+_SMAPS_FIELDS = {
+    "Rss": "rss_mb",
+    "Pss": "pss_mb",
+    "Shared_Clean": "shared_clean_mb",
+    "Shared_Dirty": "shared_dirty_mb",
+    "Private_Clean": "private_clean_mb",
+    "Private_Dirty": "private_dirty_mb",
+}
+
+
+def peak_rss_mb() -> Optional[float]:
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024.0 * 1024.0) if os.uname().sysname == "Darwin" else peak / 1024.0
+
+
+def memory_usage() -> Dict[str, Optional[float]]:
+    """Current memory of this process in MiB."""
+    out: Dict[str, Optional[float]] = {"pid": os.getpid(), "peak_rss_mb": peak_rss_mb()}
+    try:
+        with open("/proc/self/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].rstrip(":") in _SMAPS_FIELDS:
+                    out[_SMAPS_FIELDS[parts[0].rstrip(":")]] = int(parts[1]) / 1024.0
+    except OSError:
+        pass
+    return out
@@ -0,0 +1,275 @@
+"""
+Helpers for the bundled Flipkart review datasets.
+
+The three `reviews_*/data.csv` files were scraped by different teams and use
+different headers (e.g. `Review_Text`, `Review text`, `review_text`). The
+readers here map them onto one canonical schema:
+
+    Reviewer_Name, Reviewer_Rating, Review_Title, Review_Text,
+    Place_of_Review, Date_of_Review, Up_Votes, Down_Votes
+
+`load_reviews` serves the same data cleaned and typed from a columnar cache:
+each CSV is parsed once into a memory-mapped Arrow IPC file (one per CSV path,
+rebuilt only when the CSV changes), with
+
+ - "READ MORE" scraping artifacts stripped from Review_Text
+ - Reviewer_Rating as int8, Up_Votes / Down_Votes as int32 (nullable)
+ - Date_of_Review as a month date; the tawa and tea files hold the reviewer's
+   name in that column, which becomes null
+ - Place_of_Review and Product dictionary-encoded (categories in pandas)
+
+and reads only the requested columns and rows:
+
+    load_reviews(columns=["Review_Text", "Reviewer_Rating"])
+    load_reviews(filters=[("Product", "=", "tea"), ("Reviewer_Rating", "<=", 2)])
+"""
+
+import glob
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+from typing import Any, Dict, List, Optional, Sequence
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.fs as pafs
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+    ds = None
+
+logger = logging.getLogger(__name__)
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(HERE, "Hemanth_s_Daily_Task-7_on_Lambda_Map_While_Loop_Questions")
+CACHE_DIR = os.environ.get("REVIEW_CACHE_DIR", os.path.join(HERE, ".review_cache"))
+
+# Bump when clean_reviews or REVIEW_SCHEMA change so existing caches are rebuilt
+CACHE_FORMAT_VERSION = 1
+_CACHE_METADATA_KEY = b"review_cache"
+_READ_MORE_RE = r"\s*READ MORE\s*$"
+
+CANONICAL_COLUMNS = [
+    "Reviewer_Name",
+    "Reviewer_Rating",
+    "Review_Title",
+    "Review_Text",
+    "Place_of_Review",
+    "Date_of_Review",
+    "Up_Votes",
+    "Down_Votes",
+]
+
+# Lower-cased, underscore-joined header -> canonical column name
+COLUMN_ALIASES: Dict[str, str] = {
+    "reviewer_name": "Reviewer_Name",
+    "reviewer_rating": "Reviewer_Rating",
+    "ratings": "Reviewer_Rating",
+    "review_title": "Review_Title",
+    "review_text": "Review_Text",
+    "place_of_review": "Place_of_Review",
+    "date_of_review": "Date_of_Review",
+    "month": "Date_of_Review",
+    "up_votes": "Up_Votes",
+    "down_votes": "Down_Votes",
+}
+
+
+def find_review_csvs(data_dir: Optional[str] = None) -> List[str]:
+    """All `reviews_*/data.csv` files under `data_dir`, sorted by path."""
+    return sorted(glob.glob(os.path.join(data_dir or DATA_DIR, "reviews_*", "data.csv")))
+
+
+def product_name(path: str) -> str:
+    """`.../reviews_tawa/data.csv` -> `tawa`."""
+    folder = os.path.basename(os.path.dirname(os.path.abspath(path)))
+    return folder[len("reviews_"):] if folder.startswith("reviews_") else folder
+
+
+def canonical_column(name: str) -> str:
+    key = re.sub(r"\s+", "_", name.strip()).lower()
+    return COLUMN_ALIASES.get(key, name)
+
+
+def normalize_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """Rename a review frame's columns onto the canonical schema."""
+    return df.rename(columns=canonical_column)
+
+
+def read_reviews_csv(path: str, **kwargs) -> pd.DataFrame:
+    """Read one review CSV with canonical column names.
+
+    Extra keyword arguments go to `pandas.read_csv`; with `chunksize` the
+    result is an iterator of normalized chunks.
+    """
+    reader = pd.read_csv(path, **kwargs)
+    if isinstance(reader, pd.DataFrame):
+        return normalize_columns(reader)
+    return (normalize_columns(chunk) for chunk in reader)
+
+
+def load_all_reviews(data_dir: Optional[str] = None) -> pd.DataFrame:
+    """Concatenate every bundled dataset, adding a `Product` column."""
+    frames = []
+    for path in find_review_csvs(data_dir):
+        df = read_reviews_csv(path)
+        df["Product"] = product_name(path)
+        frames.append(df)
+    return pd.concat(frames, ignore_index=True)
+
+
+def clean_reviews(df: pd.DataFrame) -> pd.DataFrame:
+    """Typed, cleaned copy of a canonical review frame (see module docstring)."""
+    df = df.copy()
+    for col in ("Reviewer_Name", "Review_Title", "Review_Text", "Place_of_Review"):
+        if col in df:
+            df[col] = df[col].astype("string").str.strip()
+    if "Review_Text" in df:
+        df["Review_Text"] = df["Review_Text"].str.replace(_READ_MORE_RE, "", regex=True)
+    if "Reviewer_Rating" in df:
+        df["Reviewer_Rating"] = pd.to_numeric(df["Reviewer_Rating"], errors="coerce").astype("Int8")
+    for col in ("Up_Votes", "Down_Votes"):
+        if col in df:
+            df[col] = pd.to_numeric(df[col], errors="coerce").astype("Int32")
+    if "Date_of_Review" in df:
+        dates = df["Date_of_Review"].astype("string").str.strip()
+        if "Reviewer_Name" in df:
+            dates = dates.mask(dates == df["Reviewer_Name"])
+        # Only "Mon YYYY" values are real dates; anything else left is another scraping slip
+        df["Date_of_Review"] = pd.to_datetime(dates, format="%b %Y", errors="coerce")
+    if "Place_of_Review" in df:
+        df["Place_of_Review"] = df["Place_of_Review"].astype("category")
+    return df
+
+
+def _require_pyarrow() -> None:
+    if pa is None:
+        raise RuntimeError("The columnar review cache needs pyarrow: pip install pyarrow")
+
+
+def review_schema() -> "pa.Schema":
+    _require_pyarrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ("Reviewer_Name", pa.string()),
+        ("Reviewer_Rating", pa.int8()),
+        ("Review_Title", pa.string()),
+        ("Review_Text", pa.string()),
+        ("Place_of_Review", category),
+        ("Date_of_Review", pa.date32()),
+        ("Up_Votes", pa.int32()),
+        ("Down_Votes", pa.int32()),
+        ("Product", category),
+    ])
+
+
+def _source_stamp(path: str) -> Dict[str, Any]:
+    st = os.stat(path)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns, "version": CACHE_FORMAT_VERSION}
+
+
+def review_cache_path(path: str, cache_dir: Optional[str] = None) -> str:
+    """`<cache_dir>/tawa-<hash>.arrow`; the hash of the CSV's absolute path keeps
+    same-named products from different data dirs apart in a shared cache dir."""
+    source = hashlib.sha256(os.path.abspath(path).encode("utf-8")).hexdigest()[:12]
+    return os.path.join(cache_dir or CACHE_DIR, f"{product_name(path)}-{source}.arrow")
+
+
+def _cache_stamp(cache_path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with pa.memory_map(cache_path) as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+        return json.loads(metadata[_CACHE_METADATA_KEY])
+    except (OSError, KeyError, ValueError, pa.ArrowInvalid):
+        return None
+
+
+def build_review_cache(path: str, cache_dir: Optional[str] = None) -> str:
+    """Parse, clean and write one CSV as an Arrow IPC file; returns the cache path."""
+    _require_pyarrow()
+    cache_path = review_cache_path(path, cache_dir)
+    os.makedirs(os.path.dirname(cache_path), exist_ok=True)
+    stamp = _source_stamp(path)
+    df = clean_reviews(read_reviews_csv(path))
+    df["Product"] = pd.Categorical([product_name(path)] * len(df))
+    schema = review_schema()
+    table = pa.Table.from_pandas(df[schema.names], schema=schema, preserve_index=False)
+    table = table.replace_schema_metadata({_CACHE_METADATA_KEY: json.dumps(stamp)})
+
+    # Readers may have the old file memory-mapped; write aside and rename over it
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(cache_path), suffix=".tmp")
+    os.close(fd)
+    try:
+        with pa.OSFile(tmp, "wb") as sink, pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table, max_chunksize=8192)
+        os.replace(tmp, cache_path)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+    logger.info(f"Cached {len(table)} reviews from {path} -> {cache_path}")
+    return cache_path
+
+
+def ensure_review_cache(data_dir: Optional[str] = None, cache_dir: Optional[str] = None) -> List[str]:
+    """Cache paths for every review CSV, rebuilding those whose CSV changed since."""
+    _require_pyarrow()
+    paths = []
+    for path in find_review_csvs(data_dir):
+        cache_path = review_cache_path(path, cache_dir)
+        if _cache_stamp(cache_path) != _source_stamp(path):
+            build_review_cache(path, cache_dir)
+        paths.append(cache_path)
+    return paths
+
+
+def _as_expression(filters: Any) -> Any:
+    if filters is None or isinstance(filters, ds.Expression):
+        return filters
+    # [(column, op, value), ...] as in pandas.read_parquet / pyarrow.parquet
+    return pq.filters_to_expression(filters)
+
+
+def load_reviews_table(
+    columns: Optional[Sequence[str]] = None,
+    filters: Any = None,
+    data_dir: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> "pa.Table":
+    """Cleaned reviews as an Arrow table, reading only `columns` and rows matching `filters`.
+
+    `filters` is a pyarrow.dataset expression or a list of (column, op, value)
+    tuples. Files are memory-mapped, so unread columns are never paged in.
+    """
+    paths = ensure_review_cache(data_dir, cache_dir)
+    if not paths:
+        return review_schema().empty_table().select(list(columns) if columns else review_schema().names)
+    dataset = ds.dataset(paths, format="ipc", filesystem=pafs.LocalFileSystem(use_mmap=True))
+    return dataset.to_table(columns=list(columns) if columns else None, filter=_as_expression(filters))
+
+
+def load_reviews(
+    columns: Optional[Sequence[str]] = None,
+    filters: Any = None,
+    data_dir: Optional[str] = None,
+    cache_dir: Optional[str] = None,
+) -> pd.DataFrame:
+    """load_reviews_table as a pandas frame with nullable integer dtypes and categories.
+
+    Without pyarrow this falls back to parsing and cleaning the CSVs (no filters).
+    """
+    if pa is None:
+        if filters is not None:
+            _require_pyarrow()
+        df = clean_reviews(load_all_reviews(data_dir))
+        df["Product"] = df["Product"].astype("category")
+        return df[list(columns)] if columns else df
+    table = load_reviews_table(columns, filters, data_dir, cache_dir)
+    nullable = {pa.int8(): pd.Int8Dtype(), pa.int32(): pd.Int32Dtype()}
+    return table.to_pandas(types_mapper=nullable.get, date_as_object=False)
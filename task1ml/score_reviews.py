@@ -0,0 +1,227 @@
+"""
+Offline bulk scoring of review CSVs (no HTTP).
+
+Reads the review text column in fixed-size chunks so memory stays bounded no
+matter how large the file is, fans the chunks out to a process pool (each
+worker loads the model once via `load_artifacts`) and streams labels and
+scores to CSV or Parquet in input order.
+
+Usage:
+    python score_reviews.py                        # every bundled reviews_*/data.csv
+    python score_reviews.py dump.csv --format parquet --chunksize 100000 --workers 8
+    python score_reviews.py --output-dir scored --include-text
+    python score_reviews.py --dedupe 0.9                # skip reviews >= 90% similar to an earlier one
+
+Output: one `<name>_scored.<csv|parquet>` file per input with columns
+`row, label, score` (plus `text` with --include-text). `<name>` is the input
+file's name without its extension, or the product for the bundled
+`reviews_<product>/data.csv` layout. Inputs that would share an output file
+are rejected before anything is scored.
+
+With --dedupe, each chunk first goes through its own near-duplicate index
+(dedup.py): only the first review of each cluster is sent to the model, and
+later near-duplicates in the same chunk reuse its result. They get an extra
+`duplicate_of` column with the row they copied. Clusters never span chunks,
+so the index and the reused results stay bounded by --chunksize; a larger
+chunk finds more duplicates.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, List, Optional
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except Exception:
+    pa = None
+    pq = None
+
+from dedup import NearDuplicateIndex
+from review_data import canonical_column, find_review_csvs, product_name, read_reviews_csv
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+TEXT_COLUMN = "Review_Text"
+
+
+def _init_worker() -> None:
+    # app resolves MODEL_FILENAMES relative to its own folder
+    os.chdir(HERE)
+    import app
+    app.load_artifacts()
+    if app.model is None:
+        raise RuntimeError("Model not loaded. Put model.pkl next to app.py.")
+
+
+def _score_chunk(texts: List[str]) -> List[Dict[str, Any]]:
+    import app
+    return app.predict_texts(texts)
+
+
+class ChunkWriter:
+    """Appends scored chunks to a CSV or Parquet file."""
+
+    def __init__(self, path: str, fmt: str):
+        self.path = path
+        self.fmt = fmt
+        self._parquet = None
+        self._wrote_header = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        if self.fmt == "parquet":
+            table = pa.Table.from_pandas(df, preserve_index=False)
+            if self._parquet is None:
+                self._parquet = pq.ParquetWriter(self.path, table.schema)
+            self._parquet.write_table(table)
+        else:
+            df.to_csv(self.path, mode="a" if self._wrote_header else "w", header=not self._wrote_header, index=False)
+            self._wrote_header = True
+
+    def close(self) -> None:
+        if self._parquet is not None:
+            self._parquet.close()
+
+
+def output_path(path: str, output_dir: str, fmt: str) -> str:
+    """`reviews_tawa/data.csv` -> `<output_dir>/tawa_scored.csv`; `dump.csv` -> `<output_dir>/dump_scored.csv`."""
+    name = os.path.splitext(os.path.basename(path))[0]
+    if os.path.basename(path) == "data.csv":
+        name = product_name(path)
+    return os.path.join(output_dir, f"{name}_scored.{fmt}")
+
+
+def _to_frame(start_row: int, texts: List[str], scored: List[Dict[str, Any]], include_text: bool,
+              duplicate_of: Optional[List[Optional[int]]] = None) -> pd.DataFrame:
+    data = {
+        "row": range(start_row, start_row + len(scored)),
+        "label": [r["label"] for r in scored],
+        "score": pd.array([r["score"] for r in scored], dtype="Float64"),
+    }
+    if duplicate_of is not None:
+        data["duplicate_of"] = pd.array(duplicate_of, dtype="Int64")
+    if include_text:
+        data["text"] = texts
+    return pd.DataFrame(data)
+
+
+def score_file(
+    path: str,
+    out_path: str,
+    pool: ProcessPoolExecutor,
+    chunksize: int,
+    max_in_flight: int,
+    fmt: str,
+    include_text: bool,
+    text_column: str = TEXT_COLUMN,
+    dedupe_threshold: Optional[float] = None,
+) -> int:
+    """Score one CSV, keeping at most `max_in_flight` chunks in memory. Returns rows scored."""
+    writer = ChunkWriter(out_path, fmt)
+    pending: Deque[tuple] = deque()
+    rows = 0
+    representatives = 0
+
+    def drain_one() -> None:
+        nonlocal rows
+        start_row, texts, reps, future = pending.popleft()
+        scored = future.result()
+        duplicate_of = None
+        if reps is not None:
+            # Representatives come before their duplicates in the chunk, so their results are already known
+            own = iter(scored)
+            rep_results: Dict[int, Dict[str, Any]] = {}
+            duplicate_of, scored = [], []
+            for row, rep in enumerate(reps, start_row):
+                if rep == row:
+                    rep_results[row] = next(own)
+                duplicate_of.append(None if rep == row else rep)
+                scored.append(rep_results[rep])
+        writer.write(_to_frame(start_row, texts, scored, include_text, duplicate_of))
+        rows += len(scored)
+
+    try:
+        next_row = 0
+        for chunk in read_reviews_csv(
+            path, chunksize=chunksize, usecols=lambda c: canonical_column(c) == text_column
+        ):
+            if text_column not in chunk.columns:
+                raise KeyError(f"{path} has no '{text_column}' column")
+            texts = chunk[text_column].fillna("").astype(str).tolist()
+            reps = None
+            to_score = texts
+            if dedupe_threshold is not None:
+                index = NearDuplicateIndex(threshold=dedupe_threshold)
+                reps = index.add_batch(texts, ids=range(next_row, next_row + len(texts)))
+                to_score = [t for row, (t, rep) in enumerate(zip(texts, reps), next_row) if rep == row]
+                representatives += len(to_score)
+            future: Future = pool.submit(_score_chunk, to_score)
+            pending.append((next_row, texts if include_text else [], reps, future))
+            next_row += len(texts)
+            if len(pending) >= max_in_flight:
+                drain_one()
+        while pending:
+            drain_one()
+    finally:
+        writer.close()
+    if dedupe_threshold is not None:
+        logger.info(f"{path}: scored {representatives} of {rows} reviews, "
+                    f"{rows - representatives} near-duplicates reused")
+    return rows
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("inputs", nargs="*", help="CSV files to score (default: bundled reviews_*/data.csv)")
+    parser.add_argument("--output-dir", default="scored")
+    parser.add_argument("--format", choices=["csv", "parquet"], default="csv")
+    parser.add_argument("--chunksize", type=int, default=50000, help="rows per chunk")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--include-text", action="store_true", help="copy the review text into the output")
+    parser.add_argument("--dedupe", type=float, nargs="?", const=0.8, default=None, metavar="THRESHOLD",
+                        help="score one review per near-duplicate cluster (Jaccard >= THRESHOLD, default 0.8)")
+    args = parser.parse_args(argv)
+
+    if args.format == "parquet" and pq is None:
+        parser.error("--format parquet requires pyarrow (pip install pyarrow)")
+
+    inputs = args.inputs or find_review_csvs()
+    if not inputs:
+        parser.error("no input files found")
+    out_paths: Dict[str, str] = {}
+    for path in inputs:
+        out_path = output_path(path, args.output_dir, args.format)
+        if out_path in out_paths:
+            parser.error(f"{out_paths[out_path]} and {path} would both be written to {out_path}; "
+                         f"rename one or score them separately")
+        out_paths[out_path] = path
+    os.makedirs(args.output_dir, exist_ok=True)
+
+    total_rows = 0
+    total_start = time.perf_counter()
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=_init_worker) as pool:
+        for out_path, path in out_paths.items():
+            start = time.perf_counter()
+            rows = score_file(path, out_path, pool, args.chunksize, 2 * args.workers, args.format, args.include_text,
+                              dedupe_threshold=args.dedupe)
+            elapsed = time.perf_counter() - start
+            total_rows += rows
+            print(f"{path}: {rows} rows in {elapsed:.2f}s ({rows / elapsed if elapsed else 0:,.0f} rows/sec) -> {out_path}")
+
+    elapsed = time.perf_counter() - total_start
+    print(f"Total: {total_rows} rows in {elapsed:.2f}s ({total_rows / elapsed if elapsed else 0:,.0f} rows/sec)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
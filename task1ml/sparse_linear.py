@@ -0,0 +1,297 @@
+"""
+Compact sparse-linear inference for TF-IDF + linear classifier pipelines.
+
+`export_sparse_linear` flattens a fitted Pipeline (TfidfVectorizer followed by a
+linear model such as LinearSVC or LogisticRegression, optionally wrapped in a
+fitted GridSearchCV) into one memory-mappable `.slm` file:
+
+    b"SLM1" | uint32 header length | JSON header | arrays (64-byte aligned)
+
+The arrays are a sorted table of 64-bit term hashes with their feature columns,
+the IDF vector, the coefficient matrix and intercepts. `SparseLinearModel`
+scores raw texts from that file with the same tokenization, n-grams, stop
+words, sublinear TF, IDF weighting and L2 norm as scikit-learn, using only the
+standard library and NumPy, so loading takes milliseconds and never imports
+sklearn.
+
+Usage:
+    python export_model.py --format slm            # model.pkl -> model.slm
+    model = SparseLinearModel.load("model.slm")
+    model.predict(["great product"])               # same labels as the pipeline
+"""
+
+import hashlib
+import json
+import mmap
+import re
+import struct
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+MAGIC = b"SLM1"
+ALIGN = 64
+SUPPORTED_NORMS = ("l2", "l1", None)
+
+
+def term_hash(term: str) -> int:
+    """Stable 64-bit hash of a vocabulary term (Python's hash() is salted per process)."""
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def unwrap_pipeline(model: Any) -> Tuple[Any, Any]:
+    estimator = getattr(model, "best_estimator_", model)
+    steps = getattr(estimator, "steps", None)
+    if not steps or len(steps) != 2:
+        raise ValueError("Expected a Pipeline of [TfidfVectorizer, linear classifier]")
+    return steps[0][1], steps[1][1]
+
+
+def _vectorizer_config(vectorizer: Any) -> Dict[str, Any]:
+    params = vectorizer.get_params()
+    unsupported = []
+    if params.get("analyzer") != "word":
+        unsupported.append("analyzer")
+    if params.get("tokenizer") is not None or params.get("preprocessor") is not None:
+        unsupported.append("custom tokenizer/preprocessor")
+    if params.get("strip_accents") is not None:
+        unsupported.append("strip_accents")
+    if params.get("binary"):
+        unsupported.append("binary")
+    if params.get("norm") not in SUPPORTED_NORMS:
+        unsupported.append("norm")
+    if unsupported:
+        raise ValueError(f"Unsupported vectorizer settings for sparse-linear export: {', '.join(unsupported)}")
+
+    stop_words = vectorizer.get_stop_words()
+    return {
+        "lowercase": bool(params["lowercase"]),
+        "token_pattern": params["token_pattern"],
+        "ngram_range": list(params["ngram_range"]),
+        "stop_words": sorted(stop_words) if stop_words else [],
+        "sublinear_tf": bool(params.get("sublinear_tf", False)),
+        "use_idf": bool(params.get("use_idf", True)),
+        "norm": params.get("norm"),
+    }
+
+
+def export_sparse_linear(
+    model: Any,
+    path: str,
+    coef_dtype: str = "float64",
+    keep_features: Optional[np.ndarray] = None,
+) -> Dict[str, Any]:
+    """Write `model` to `path` in .slm format and return the header.
+
+    `keep_features` (boolean mask or column indices) drops vocabulary entries;
+    `coef_dtype` may be float64, float32, float16 or int8 (symmetric per-class
+    scale stored in the header).
+    """
+    vectorizer, classifier = unwrap_pipeline(model)
+    coef = np.atleast_2d(np.asarray(classifier.coef_, dtype=np.float64))
+    intercept = np.atleast_1d(np.asarray(classifier.intercept_, dtype=np.float64))
+    classes = [c.item() if hasattr(c, "item") else c for c in classifier.classes_]
+
+    vocab = vectorizer.vocabulary_
+    terms = np.empty(len(vocab), dtype=object)
+    for term, col in vocab.items():
+        terms[col] = term
+    idf = np.asarray(vectorizer.idf_, dtype=np.float64) if getattr(vectorizer, "use_idf", True) else np.ones(len(terms))
+
+    if keep_features is not None:
+        keep = np.asarray(keep_features)
+        cols = np.flatnonzero(keep) if keep.dtype == bool else np.sort(keep)
+        terms, idf, coef = terms[cols], idf[cols], coef[:, cols]
+
+    hashes = np.fromiter((term_hash(t) for t in terms), dtype=np.uint64, count=len(terms))
+    order = np.argsort(hashes, kind="stable")
+    if len(hashes) and np.any(np.diff(hashes[order]) == 0):
+        raise ValueError("64-bit term hash collision in vocabulary")
+
+    scales = None
+    if coef_dtype == "int8":
+        scales = np.abs(coef).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        coef_out = np.round(coef / scales[:, None]).astype(np.int8)
+    else:
+        coef_out = coef.astype(coef_dtype)
+
+    arrays = {
+        "term_hashes": hashes[order],
+        "term_columns": order.astype(np.int32),
+        "idf": idf,
+        "coef": np.ascontiguousarray(coef_out),
+        "intercept": intercept,
+    }
+
+    header: Dict[str, Any] = {
+        "format": "sparse-linear",
+        "version": 1,
+        "vectorizer": _vectorizer_config(vectorizer),
+        "classifier": type(classifier).__name__,
+        "proba": "logistic" if hasattr(classifier, "predict_proba") and type(classifier).__name__ == "LogisticRegression" else None,
+        "classes": classes,
+        "n_features": int(len(terms)),
+        "coef_scales": scales.tolist() if scales is not None else None,
+        "arrays": {},
+    }
+
+    # Offsets are relative to the start of the data section, which is aligned after the header
+    offset = 0
+    for name, arr in arrays.items():
+        offset = (offset + ALIGN - 1) // ALIGN * ALIGN
+        header["arrays"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape), "offset": offset}
+        offset += arr.nbytes
+
+    header_bytes = json.dumps(header).encode("utf-8")
+    data_start = (len(MAGIC) + 4 + len(header_bytes) + ALIGN - 1) // ALIGN * ALIGN
+    with open(path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<I", len(header_bytes)))
+        f.write(header_bytes)
+        f.write(b"\0" * (data_start - f.tell()))
+        for name, arr in arrays.items():
+            f.write(b"\0" * (data_start + header["arrays"][name]["offset"] - f.tell()))
+            f.write(arr.tobytes())
+    return header
+
+
+class SparseLinearModel:
+    """Scores raw texts from a memory-mapped .slm file (no scikit-learn needed)."""
+
+    def __init__(self, header: Dict[str, Any], arrays: Dict[str, np.ndarray], buffer: Any = None):
+        self.header = header
+        self._buffer = buffer  # keeps the mmap alive
+        cfg = header["vectorizer"]
+        self.lowercase = cfg["lowercase"]
+        self._token_re = re.compile(cfg["token_pattern"])
+        self.min_n, self.max_n = cfg["ngram_range"]
+        self.stop_words = frozenset(cfg["stop_words"])
+        self.sublinear_tf = cfg["sublinear_tf"]
+        self.norm = cfg["norm"]
+        self.n_features = header["n_features"]
+        self.classes_ = np.array(header["classes"])
+
+        self.term_hashes = arrays["term_hashes"]
+        self.term_columns = arrays["term_columns"]
+        self.idf = arrays["idf"]
+        coef = arrays["coef"]
+        if header.get("coef_scales") is not None:
+            coef = coef.astype(np.float64) * np.asarray(header["coef_scales"])[:, None]
+        elif coef.dtype != np.float64:
+            coef = coef.astype(np.float64)
+        self.coef_ = coef
+        self.intercept_ = arrays["intercept"]
+        self._hash_cache: Dict[str, int] = {}
+
+    @classmethod
+    def load(cls, path: str) -> "SparseLinearModel":
+        with open(path, "rb") as f:
+            buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if buf[:4] != MAGIC:
+            raise ValueError(f"{path} is not a sparse-linear model file")
+        (header_len,) = struct.unpack_from("<I", buf, 4)
+        header = json.loads(buf[8:8 + header_len].decode("utf-8"))
+        data_start = (8 + header_len + ALIGN - 1) // ALIGN * ALIGN
+        arrays = {}
+        for name, spec in header["arrays"].items():
+            dtype = np.dtype(spec["dtype"])
+            count = int(np.prod(spec["shape"])) if spec["shape"] else 1
+            arr = np.frombuffer(buf, dtype=dtype, count=count, offset=data_start + spec["offset"])
+            arrays[name] = arr.reshape(spec["shape"])
+        return cls(header, arrays, buf)
+
+    # --- text -> features -------------------------------------------------
+
+    def _analyze(self, doc: str) -> List[str]:
+        """Same token and n-gram sequence as sklearn's word analyzer."""
+        if self.lowercase:
+            doc = doc.lower()
+        tokens = self._token_re.findall(doc)
+        if self.stop_words:
+            tokens = [t for t in tokens if t not in self.stop_words]
+        if self.max_n == 1:
+            return tokens
+        grams = list(tokens) if self.min_n == 1 else []
+        n_tokens = len(tokens)
+        for n in range(max(self.min_n, 2), min(self.max_n, n_tokens) + 1):
+            for i in range(n_tokens - n + 1):
+                grams.append(" ".join(tokens[i:i + n]))
+        return grams
+
+    def _hash(self, term: str) -> int:
+        h = self._hash_cache.get(term)
+        if h is None:
+            h = term_hash(term)
+            if len(self._hash_cache) < 1_000_000:
+                self._hash_cache[term] = h
+        return h
+
+    def transform(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Sparse TF-IDF rows as (doc index, feature column, value) arrays."""
+        doc_ids: List[int] = []
+        hashes: List[int] = []
+        for i, text in enumerate(texts):
+            grams = self._analyze(text)
+            doc_ids.extend([i] * len(grams))
+            hashes.extend(self._hash(g) for g in grams)
+        if not hashes:
+            empty = np.empty(0)
+            return empty.astype(np.int64), empty.astype(np.int64), empty
+
+        doc_arr = np.asarray(doc_ids, dtype=np.int64)
+        hash_arr = np.asarray(hashes, dtype=np.uint64)
+        pos = np.searchsorted(self.term_hashes, hash_arr)
+        pos[pos == len(self.term_hashes)] = 0
+        found = self.term_hashes[pos] == hash_arr
+        doc_arr = doc_arr[found]
+        cols = self.term_columns[pos[found]].astype(np.int64)
+
+        keys, counts = np.unique(doc_arr * self.n_features + cols, return_counts=True)
+        rows = keys // self.n_features
+        cols = keys % self.n_features
+        values = counts.astype(np.float64)
+        if self.sublinear_tf:
+            values = np.log(values) + 1.0
+        values *= self.idf[cols]
+
+        if self.norm is not None:
+            if self.norm == "l2":
+                norms = np.sqrt(np.bincount(rows, weights=values * values, minlength=len(texts)))
+            else:
+                norms = np.bincount(rows, weights=np.abs(values), minlength=len(texts))
+            norms[norms == 0] = 1.0
+            values /= norms[rows]
+        return rows, cols, values
+
+    # --- scoring ----------------------------------------------------------
+
+    def decision_function(self, texts: Sequence[str]) -> np.ndarray:
+        rows, cols, values = self.transform(texts)
+        n_docs = len(texts)
+        out = np.empty((n_docs, self.coef_.shape[0]))
+        for k in range(self.coef_.shape[0]):
+            out[:, k] = np.bincount(rows, weights=values * self.coef_[k, cols], minlength=n_docs)
+        out += self.intercept_
+        return out[:, 0] if out.shape[1] == 1 else out
+
+    def predict(self, texts: Sequence[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            return self.classes_[(scores > 0).astype(int)]
+        return self.classes_[scores.argmax(axis=1)]
+
+    def __getattr__(self, name: str) -> Any:
+        # predict_proba only exists for logistic models, so hasattr() reflects support
+        if name == "predict_proba" and self.__dict__.get("header", {}).get("proba") == "logistic":
+            return self._predict_proba
+        raise AttributeError(name)
+
+    def _predict_proba(self, texts: Sequence[str]) -> np.ndarray:
+        scores = self.decision_function(texts)
+        if scores.ndim == 1:
+            pos = 1.0 / (1.0 + np.exp(-scores))
+            return np.column_stack([1.0 - pos, pos])
+        scores = scores - scores.max(axis=1, keepdims=True)
+        exp = np.exp(scores)
+        return exp / exp.sum(axis=1, keepdims=True)
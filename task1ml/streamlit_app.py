@@ -1,5 +1,14 @@
+import http.client
+import os
 import streamlit as st
-import pickle
+
+from inference_client import InferenceError, client_from_env
+
+# Without INFERENCE_URL / INFERENCE_SOCKET the model is loaded in this process.
+# model.slm (python export_model.py --format slm) loads in milliseconds without scikit-learn
+MODEL_FILE = os.environ.get("MODEL_FILE", "model.pkl")
+# Named model of the shared backend (app.py MODELS), e.g. "tea"; empty uses its default
+SENTIMENT_MODEL = os.environ.get("SENTIMENT_MODEL", "") or None
 
 # Page config
 st.set_page_config(
@@ -257,14 +266,14 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Load model using pickle
+# One client per server process: its connection pool and result cache are shared by all sessions.
+# INFERENCE_URL=http://localhost:5000 (app.py / asgi.py) or INFERENCE_SOCKET=/tmp/sentiment.sock
+# (inference_worker.py) keeps the model out of this process.
 @st.cache_resource
-def load_model():
-    with open("model.pkl", "rb") as file:
-        model = pickle.load(file)
-    return model
+def get_client():
+    return client_from_env(MODEL_FILE)
 
-model = load_model()
+client = get_client()
 
 # UI
 st.title(" Product Review Sentiment Analysis")
@@ -282,8 +291,11 @@ if st.button("Analyze Sentiment"):
     if review_text.strip() == "":
         st.warning("Please enter a review first!")
     else:
-        # Direct prediction (string output)
-        prediction = model.predict([review_text])[0]
+        try:
+            prediction = client.predict([review_text], model=SENTIMENT_MODEL)[0]["label"]
+        except (InferenceError, OSError, ValueError, http.client.HTTPException) as ex:
+            st.warning(f"Sentiment service unavailable: {ex}")
+            st.stop()
 
         # Display result directly
         if prediction.lower() == "positive":
@@ -0,0 +1,65 @@
+"""
+Scored files join back to their reviews only when their rows are the product's bundled rows.
+
+Usage (from task1ml/):
+    python -m unittest test_aggregates
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import aggregates
+
+
+def _reviews(n):
+    return pd.DataFrame({
+        "Reviewer_Rating": pd.array(range(1, n + 1), dtype="Int8"),
+        "Place_of_Review": ["Delhi"] * n,
+        "Date_of_Review": pd.to_datetime(["2021-03-01"] * n),
+        "Up_Votes": pd.array([0] * n, dtype="Int32"),
+        "Down_Votes": pd.array([0] * n, dtype="Int32"),
+    })
+
+
+class ScoredWithReviewsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.scored_dir = tmp.name
+        patcher = mock.patch.object(aggregates, "load_reviews", return_value=_reviews(2))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def write_scored(self, name, labels):
+        path = os.path.join(self.scored_dir, f"{name}_scored.csv")
+        pd.DataFrame({"row": range(len(labels)), "label": labels, "score": [0.5] * len(labels)}).to_csv(path, index=False)
+        return path
+
+    def test_rows_join_by_position(self):
+        joined = aggregates.scored_with_reviews(self.write_scored("tea", ["Positive", "Negative"]), "tea")
+        self.assertEqual(joined["Reviewer_Rating"].tolist(), [1, 2])
+        self.assertEqual(joined["label"].tolist(), ["Positive", "Negative"])
+        self.assertEqual(set(joined["Product"]), {"tea"})
+
+    def test_a_file_that_is_not_the_products_data_is_rejected(self):
+        path = self.write_scored("dump", ["Positive"] * 3)
+        with self.assertRaisesRegex(ValueError, "has 3 rows but the bundled reviews for 'dump' have 2"):
+            aggregates.scored_with_reviews(path, "dump")
+
+    def test_ingest_skips_files_it_cannot_join(self):
+        self.write_scored("tea", ["Positive", "Negative"])
+        self.write_scored("dump", ["Positive"] * 3)
+        store = os.path.join(self.scored_dir, "aggregates.pkl")
+        with mock.patch("sys.stdout"), mock.patch("sys.stderr"):
+            status = aggregates.main(["ingest", self.scored_dir, "--store", store])
+        self.assertEqual(status, 1)
+        result = aggregates.SentimentAggregates.load(store).query(["product"])
+        self.assertEqual(result["reviews"].to_dict(), {"tea": 2})
+
+
+if __name__ == "__main__":
+    unittest.main()
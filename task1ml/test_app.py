@@ -0,0 +1,50 @@
+"""
+/api/predict input validation and the text each request hands the model.
+
+Usage (from task1ml/):
+    python -m unittest test_app
+"""
+
+import unittest
+from unittest import mock
+
+import app
+from prediction_cache import PredictionCache
+from preprocessing import preprocess_texts
+
+
+class PredictValidationTest(unittest.TestCase):
+    def setUp(self):
+        self.client = app.app.test_client()
+
+    def test_text_must_be_a_string_or_a_list_of_strings(self):
+        for payload in ({"text": [None]}, {"text": [1, 2]}, {"text": ["ok", {"text": "nested"}]}, {"text": 3}, [1, 2]):
+            response = self.client.post("/api/predict", json=payload)
+            self.assertEqual(response.status_code, 400, payload)
+
+
+class PreprocessOnceTest(unittest.TestCase):
+    def test_cache_misses_reach_the_model_preprocessed_once(self):
+        calls = []
+
+        def counting_preprocess(texts):
+            calls.append(list(texts))
+            return preprocess_texts(texts)
+
+        def model(texts, handle=None):
+            return [{"label": t} for t in texts]
+
+        cache = PredictionCache(lambda: "v1", normalize_fn=list)
+        with mock.patch.multiple(app, PREPROCESS_TEXTS=True, prediction_cache=cache, batcher=None,
+                                 preprocess_texts=counting_preprocess, predict_prepared_texts=model):
+            first = app.score_texts(["Great product 😍READ MORE", "great   PRODUCT 😍"])
+            again = app.score_texts(["Great product 😍READ MORE"])
+
+        self.assertEqual(len(calls), 2)  # one per request, none inside the model call
+        self.assertEqual([r["label"] for r in first], ["great product love"] * 2)
+        self.assertEqual(again, first[:1])
+        self.assertEqual(cache.stats()["entries"], 1)  # both spellings share one entry
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+"""
+ASGI admission control holds limits until executor work has really finished,
+and /api/predict reports the same metrics as the Flask route.
+
+Usage (from task1ml/):
+    python -m unittest test_asgi
+"""
+
+import asyncio
+import threading
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
+import httpx
+
+import asgi
+from app import REQUESTS, STAGE_SECONDS, TEXTS_SCORED
+
+
+class AsgiTestCase(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.gate = threading.Event()
+        self.addCleanup(self.gate.set)
+        pool = ThreadPoolExecutor(max_workers=2)
+        self.addCleanup(pool.shutdown, wait=True)
+
+        def score(texts, model_name=None):
+            self.gate.wait(5)
+            return [{"label": "Positive", "score": None, "model_version": "test"} for _ in texts]
+
+        for patcher in (
+            mock.patch.object(asgi, "executor", pool),
+            mock.patch.object(asgi, "admission", asgi.AdmissionController(max_concurrency=1, max_queue=0)),
+            mock.patch.object(asgi, "REQUEST_TIMEOUT_S", 0.05),
+            mock.patch.object(asgi, "_score_in_worker", score),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        # No lifespan: the executor and admission controller above stand in for it
+        self.client = httpx.AsyncClient(transport=httpx.ASGITransport(app=asgi.asgi_app), base_url="http://test")
+        self.addAsyncCleanup(self.client.aclose)
+
+    async def predict(self):
+        return await self.client.post("/api/predict", json={"text": "great product"})
+
+    async def wait_until_idle(self):
+        for _ in range(100):
+            if asgi.admission.in_system == 0:
+                break
+            await asyncio.sleep(0.01)
+        self.assertEqual(asgi.admission.in_system, 0)
+
+
+class AdmissionTest(AsgiTestCase):
+    async def test_timed_out_work_keeps_its_slot_until_it_finishes(self):
+        first = await self.predict()
+        self.assertEqual(first.status_code, 503)
+        self.assertIn("no result within", first.json()["error"])
+
+        # The abandoned job is still running, so there is no room for another
+        second = await self.predict()
+        self.assertEqual(second.status_code, 503)
+        self.assertIn("queue full", second.json()["error"])
+        self.assertEqual(asgi.admission.in_system, 1)
+
+        self.gate.set()
+        await self.wait_until_idle()
+        third = await self.predict()
+        self.assertEqual(third.status_code, 200)
+        self.assertEqual(third.json()["label"], "Positive")
+        self.assertEqual(asgi.admission.stats()["rejected"], 1)
+
+    async def test_text_lists_must_hold_strings(self):
+        response = await self.client.post("/api/predict", json={"text": ["ok", None]})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(asgi.admission.admitted, 0)
+
+
+def _count(metric, *key):
+    value = metric._values.get(key, 0)
+    return sum(value[0]) if isinstance(value, tuple) else value  # histograms: observations in all buckets
+
+
+class MetricsTest(AsgiTestCase):
+    async def test_requests_and_stages_are_recorded(self):
+        self.gate.set()
+        before = (_count(REQUESTS, "/api/predict", "200"), _count(STAGE_SECONDS, "parse", "json"))
+        await self.predict()
+        after = (_count(REQUESTS, "/api/predict", "200"), _count(STAGE_SECONDS, "parse", "json"))
+        self.assertEqual((after[0] - before[0], after[1] - before[1]), (1, 1))
+
+    async def test_worker_process_metrics_reach_this_process(self):
+        def score_in_process(texts, model_name=None):
+            results = asgi._score_in_worker(texts, model_name)
+            return results, [("sentiment_texts_scored_total", ("worker",), len(texts))]
+
+        before = _count(TEXTS_SCORED, "worker")
+        with mock.patch.multiple(asgi, INFERENCE_EXECUTOR="process", _score_in_process=score_in_process):
+            timed_out = await self.predict()
+            self.gate.set()
+            await self.wait_until_idle()
+            served = await self.client.post("/api/predict", json={"text": ["a", "b"]})
+        self.assertEqual((timed_out.status_code, served.status_code), (503, 200))
+        self.assertEqual(len(served.json()["predictions"]), 2)
+        self.assertEqual(_count(TEXTS_SCORED, "worker") - before, 3)  # the abandoned job counts too
+
+
+if __name__ == "__main__":
+    unittest.main()
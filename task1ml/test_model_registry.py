@@ -0,0 +1,64 @@
+"""
+Named models load once on first use and are evicted least recently used first under the budget.
+
+Usage (from task1ml/):
+    python -m unittest test_model_registry
+"""
+
+import threading
+import unittest
+
+from model_registry import ModelRegistry, UnknownModelError
+
+
+class ModelRegistryTest(unittest.TestCase):
+    def setUp(self):
+        self.loads = []
+
+        def loader(path):
+            self.loads.append(path)
+            return {"path": path}
+
+        # Every model costs 100 bytes; the budget holds two
+        self.registry = ModelRegistry(
+            {"tea": "tea.pkl", "tawa": "tawa.pkl", "badminton": "badminton.pkl"},
+            loader=loader, budget_bytes=250, size_fn=lambda handle: 100,
+        )
+
+    def test_least_recently_used_model_is_evicted(self):
+        self.registry.get("tea")
+        self.registry.get("tawa")
+        self.registry.get("tea")  # tawa is now least recently used
+        self.registry.get("badminton")
+
+        stats = self.registry.stats()
+        self.assertEqual(stats["resident"], ["tea", "badminton"])
+        self.assertEqual(stats["models"]["tawa"]["evictions"], 1)
+        self.assertEqual(stats["models"]["tea"]["hits"], 1)
+        self.assertEqual(self.registry.resident_bytes(), 200)
+
+        self.registry.get("tawa")
+        self.assertEqual(self.loads, ["tea.pkl", "tawa.pkl", "badminton.pkl", "tawa.pkl"])
+        self.assertEqual(self.registry.stats()["resident"], ["badminton", "tawa"])
+
+    def test_an_evicted_model_stays_usable_by_whoever_holds_it(self):
+        held = self.registry.get("tea")
+        self.assertTrue(self.registry.evict("tea"))
+        self.assertEqual(held, {"path": "tea.pkl"})
+        self.assertIsNot(self.registry.get("tea"), held)
+
+    def test_concurrent_first_requests_load_once(self):
+        threads = [threading.Thread(target=self.registry.get, args=("tea",)) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(self.loads, ["tea.pkl"])
+
+    def test_unknown_names_raise(self):
+        with self.assertRaises(UnknownModelError):
+            self.registry.get("coffee")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+Hot reload swaps models in place and makes a service that started without one ready.
+
+Usage (from task1ml/):
+    python -m unittest test_model_reload
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import joblib
+
+import app
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+MODEL = os.path.join(HERE, "model.pkl")
+
+
+class ModelReloadTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.model_path = os.path.join(self.tmp.name, "model.pkl")
+        for name, value in [
+            ("MODEL_FILENAMES", [self.model_path]),
+            ("MODEL_WATCH_INTERVAL_S", 60.0),
+            ("PREDICTION_CACHE_SIZE", 100),
+            ("ready", False),
+            ("active_model", None),
+            ("model", None),
+            ("model_path", None),
+            ("model_version", None),
+            ("prediction_cache", None),
+            ("batcher", None),
+        ]:
+            patcher = mock.patch.object(app, name, value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.watchers = []
+        patcher = mock.patch.object(app, "start_model_watcher", self.watchers.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = app.app.test_client()
+
+    def test_model_that_appears_after_startup_makes_the_service_ready(self):
+        app.load_artifacts()
+        self.assertFalse(app.ready)
+        self.assertEqual(self.client.get("/healthz").status_code, 503)
+        self.assertEqual(self.watchers, [60.0])
+
+        shutil.copy(MODEL, self.model_path)
+        app._reload_job(force=False)  # what the watcher runs when the file appears
+
+        self.assertTrue(app.ready)
+        self.assertIsNotNone(app.prediction_cache)
+        self.assertEqual(self.client.get("/healthz").status_code, 200)
+        response = self.client.post("/api/predict", json={"text": "Great product"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()["model_version"], app.current_model_version())
+
+    def test_reload_swaps_the_version_and_keeps_the_cache(self):
+        shutil.copy(MODEL, self.model_path)
+        app.load_artifacts()
+        cache, first = app.prediction_cache, app.current_model_version()
+        self.client.post("/api/predict", json={"text": "Great product"})
+
+        joblib.dump(joblib.load(MODEL), self.model_path, compress=3)  # same model, new bytes
+        app._reload_job(force=False)
+
+        self.assertNotEqual(app.current_model_version(), first)
+        self.assertIs(app.prediction_cache, cache)
+        response = self.client.post("/api/predict", json={"text": "Great product"})
+        self.assertEqual(response.get_json()["model_version"], app.current_model_version())
+        self.assertEqual(cache.stats()["invalidations"], 1)
+
+    def test_reload_listeners_see_the_new_model(self):
+        shutil.copy(MODEL, self.model_path)
+        app.load_artifacts()
+        seen = []
+        with mock.patch.object(app, "reload_listeners", [seen.append]):
+            joblib.dump(joblib.load(MODEL), self.model_path, compress=3)
+            app._reload_job(force=False)
+        self.assertEqual([h.version for h in seen], [app.current_model_version()])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,56 @@
+"""
+The online learner's CSV tail reads whole rows and never skips ones it failed to parse.
+
+Usage (from task1ml/):
+    python -m unittest test_online
+"""
+
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import online
+from preprocessing import model_inputs
+
+
+class CsvTailTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "data.csv")
+        self.append("Review text,Ratings\n")
+
+    def append(self, text):
+        with open(self.path, "a") as f:
+            f.write(text)
+
+    def test_quoted_multiline_rows_are_read_once_complete(self):
+        self.append('"Great product,\nreally good",5\n"Bad\n')
+        tail = online.CsvTail(self.path)
+        texts, labels = tail.read()
+        self.assertEqual((texts, labels.tolist()), (model_inputs(["Great product,\nreally good"]), ["Positive"]))
+
+        self.append('awful",1\n')
+        texts, labels = tail.read()
+        self.assertEqual((texts, labels.tolist()), (model_inputs(["Bad\nawful"]), ["Negative"]))
+        self.assertEqual(tail.offset, os.path.getsize(self.path))
+
+    def test_offset_moves_only_after_a_successful_parse(self):
+        self.append('"nice tea",5\n')
+        tail = online.CsvTail(self.path)
+        with mock.patch.object(online.pd, "read_csv", side_effect=ValueError("bad chunk")):
+            with self.assertRaises(ValueError):
+                tail.read()
+        texts, _ = tail.read()
+        self.assertEqual(texts, model_inputs(["nice tea"]))
+
+    def test_a_row_longer_than_the_read_size_is_still_read(self):
+        self.append('"a review much longer than the read size",2\n')
+        with mock.patch.object(online, "MAX_READ_BYTES", 4):
+            texts, _ = online.CsvTail(self.path).read()
+        self.assertEqual(texts, model_inputs(["a review much longer than the read size"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,63 @@
+"""
+Prediction cache keys must follow the text the model actually sees.
+
+Usage (from task1ml/):
+    python -m unittest test_prediction_cache
+"""
+
+import unittest
+
+from prediction_cache import PredictionCache
+from preprocessing import preprocess_texts
+
+TEXTS = [
+    "Worstread more",
+    "WorstREAD MORE",  # the scraper's trailing READ MORE is only stripped in capitals
+    "Great   product 😍",
+    "great product love",
+    "GREAT PRODUCT",
+    "nice tea",
+]
+
+
+def model_input(texts):
+    """Stand-in model: its 'label' is the exact text it was given after preprocessing."""
+    return [{"label": t} for t in preprocess_texts(texts)]
+
+
+class PredictionCacheKeyTest(unittest.TestCase):
+    def test_texts_share_a_key_only_when_they_preprocess_to_the_same_string(self):
+        cleaned = preprocess_texts(TEXTS)
+        keys = [PredictionCache.key(t, "v1") for t in cleaned]
+        for i in range(len(TEXTS)):
+            for j in range(len(TEXTS)):
+                self.assertEqual(keys[i] == keys[j], cleaned[i] == cleaned[j], (TEXTS[i], TEXTS[j]))
+
+    def test_cached_results_match_an_uncached_prediction(self):
+        cache = PredictionCache(lambda: "v1", normalize_fn=preprocess_texts)
+        expected = model_input(TEXTS)
+        for text, want in zip(TEXTS, expected):
+            self.assertEqual(cache.predict([text], model_input), [want], text)
+        self.assertEqual(cache.predict(TEXTS, model_input), expected)
+        # 5 distinct model inputs among the 6 texts; the batch above is served from the cache
+        self.assertEqual(cache.stats()["entries"], 5)
+        self.assertEqual(cache.misses, 5)
+
+    def test_versions_and_namespaces_do_not_share_entries(self):
+        version = ["v1"]
+        calls = []
+
+        def predict(texts):
+            calls.append(list(texts))
+            return model_input(texts)
+
+        cache = PredictionCache(lambda: version[0], normalize_fn=preprocess_texts)
+        cache.predict(["nice tea"], predict)
+        cache.predict(["nice tea"], predict, namespace="\0tea")
+        version[0] = "v2"
+        cache.predict(["nice tea"], predict)
+        self.assertEqual(len(calls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
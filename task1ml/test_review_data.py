@@ -0,0 +1,41 @@
+"""
+The columnar review cache keeps data dirs with the same product names apart.
+
+Usage (from task1ml/):
+    python -m unittest test_review_data
+"""
+
+import os
+import tempfile
+import unittest
+
+import review_data
+
+
+class ReviewCacheTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        self.cache_dir = os.path.join(self.root, "cache")
+
+    def data_dir(self, name, reviews):
+        folder = os.path.join(self.root, name, "reviews_tea")
+        os.makedirs(folder)
+        with open(os.path.join(folder, "data.csv"), "w") as f:
+            f.write(",".join(review_data.CANONICAL_COLUMNS) + "\n")
+            for text, rating in reviews:
+                f.write(f"Asha,{rating},Title,{text},Delhi,Mar 2021,0,0\n")
+        return os.path.dirname(folder)
+
+    def test_same_product_in_two_data_dirs_gets_two_caches(self):
+        first = self.data_dir("a", [("lovely tea", 5)])
+        second = self.data_dir("b", [("stale", 1), ("bitter", 2)])
+        for data_dir, expected in ((first, ["lovely tea"]), (second, ["stale", "bitter"]), (first, ["lovely tea"])):
+            df = review_data.load_reviews(columns=["Review_Text"], data_dir=data_dir, cache_dir=self.cache_dir)
+            self.assertEqual(df["Review_Text"].tolist(), expected)
+        self.assertEqual(len(os.listdir(self.cache_dir)), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
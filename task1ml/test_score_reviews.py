@@ -0,0 +1,82 @@
+"""
+Bulk scoring writes one output per input and never lets two inputs share it.
+
+Usage (from task1ml/):
+    python -m unittest test_score_reviews
+"""
+
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+import score_reviews
+
+
+def write_reviews(path, texts):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    pd.DataFrame({"Review text": texts}).to_csv(path, index=False)
+
+
+class OutputNamingTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.out = os.path.join(self.tmp.name, "scored")
+
+    def score(self, *args):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return score_reviews.main([*args, "--output-dir", self.out, "--workers", "1"])
+
+    def test_bundled_layout_is_named_after_the_product(self):
+        path = os.path.join("data", "reviews_tawa", "data.csv")
+        self.assertEqual(score_reviews.output_path(path, "scored", "csv"), os.path.join("scored", "tawa_scored.csv"))
+
+    def test_files_from_one_directory_get_their_own_outputs(self):
+        a = os.path.join(self.tmp.name, "rv", "a.csv")
+        b = os.path.join(self.tmp.name, "rv", "b.csv")
+        write_reviews(a, ["Great product", "Terrible, broke in a day"])
+        write_reviews(b, ["Nice tea", "Nice tea", "Awful taste"])
+
+        self.assertEqual(self.score(a, b), 0)
+        self.assertEqual(sorted(os.listdir(self.out)), ["a_scored.csv", "b_scored.csv"])
+        self.assertEqual(len(pd.read_csv(os.path.join(self.out, "a_scored.csv"))), 2)
+        self.assertEqual(len(pd.read_csv(os.path.join(self.out, "b_scored.csv"))), 3)
+
+    def test_inputs_sharing_an_output_are_rejected_before_scoring(self):
+        a = os.path.join(self.tmp.name, "one", "dump.csv")
+        b = os.path.join(self.tmp.name, "two", "dump.csv")
+        write_reviews(a, ["Great product"])
+        write_reviews(b, ["Awful taste"])
+
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit):
+            self.score(a, b)
+        self.assertFalse(os.path.exists(self.out))
+
+
+class DedupeTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.path = os.path.join(self.tmp.name, "dump.csv")
+        write_reviews(self.path, ["Great product", "Great product", "Awful taste", "Great product", "Great product"])
+
+    def score(self, out, *args):
+        with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+            score_reviews.main([self.path, "--output-dir", out, "--workers", "1", *args])
+        return pd.read_csv(os.path.join(out, "dump_scored.csv"))
+
+    def test_duplicates_reuse_a_representative_from_their_own_chunk(self):
+        plain = self.score(os.path.join(self.tmp.name, "plain"))
+        deduped = self.score(os.path.join(self.tmp.name, "dedupe"), "--dedupe", "--chunksize", "3")
+
+        self.assertEqual(deduped["label"].tolist(), plain["label"].tolist())
+        # rows 0-2 and 3-4 are separate chunks, so row 3 is scored again instead of pointing back at row 0
+        self.assertEqual(deduped["duplicate_of"].fillna(-1).tolist(), [-1, 0, -1, -1, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,356 @@
+"""
+Rebuild the sentiment model from the bundled review CSVs.
+
+Loads every `reviews_*/data.csv` (cleaned, via review_data.load_reviews), labels reviews Positive when
+`Reviewer_Rating > 3` (Negative otherwise) and trains on title + text, as in
+the original notebook. A grid search over TF-IDF and classifier settings runs
+its (fold, vectorizer) tasks on a process pool, then the best setting is refit
+with a real TfidfVectorizer pipeline and checked on a held-out split.
+Texts go through preprocessing.model_inputs, so search, held-out check and the
+served model (app.py) all see the PREPROCESS_TEXTS form; the sidecar records it.
+
+Vectorizing dominates the search, so it is done once: each distinct analyzer
+(n-gram range, stop words) counts n-grams over the whole corpus up front, and
+every fold derives its TF-IDF matrices from those cached counts by column
+selection (min_df / max_df / max_features over the fold's training rows) and
+IDF re-weighting. The result is identical to fitting TfidfVectorizer per fold.
+
+The artifact is a pickled sklearn Pipeline, loadable by `load_artifacts` like
+the original model.pkl, written as `models/model-<timestamp>.pkl` with a JSON
+sidecar (model version as reported by the API, parameters, scores, data size,
+per-stage wall-clock). `--install` atomically replaces model.pkl so a running
+service picks it up through /admin/reload or MODEL_WATCH_INTERVAL_S.
+
+Usage:
+    python train.py                                 # search, refit, write models/model-<timestamp>.pkl
+    python train.py --workers 4 --folds 5 --install
+    python train.py --classifier logreg --quick     # probability scores, smaller grid
+    python train.py --product tea --install models/tea.pkl   # one category model (app.py MODELS)
+"""
+
+import argparse
+import json
+import logging
+import os
+import pickle
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+import sklearn
+from sklearn.feature_extraction.text import CountVectorizer, TfidfTransformer, TfidfVectorizer
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import f1_score
+from sklearn.model_selection import ParameterGrid, StratifiedKFold, train_test_split
+from sklearn.pipeline import Pipeline
+from sklearn.svm import LinearSVC
+
+from prediction_cache import file_digest
+from preprocessing import PREPROCESS_TEXTS, model_inputs
+from review_data import load_reviews
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Settings of the notebook's GridSearchCV that produced model.pkl
+TFIDF_DEFAULTS = {
+    "ngram_range": (1, 2),
+    "max_df": 0.9,
+    "min_df": 5,
+    "max_features": 5000,
+    "stop_words": "english",
+    "sublinear_tf": True,
+}
+
+PARAM_GRID = {
+    "tfidf__ngram_range": [(1, 1), (1, 2)],
+    "tfidf__min_df": [2, 5],
+    "tfidf__max_features": [5000, 20000],
+    "model__C": [0.01, 0.1, 1, 10],
+}
+QUICK_PARAM_GRID = {
+    "tfidf__ngram_range": [(1, 2)],
+    "tfidf__min_df": [5],
+    "tfidf__max_features": [5000],
+    "model__C": [0.1, 1],
+}
+
+CLASSIFIERS = {
+    "linearsvc": lambda **params: LinearSVC(**params),
+    "logreg": lambda **params: LogisticRegression(max_iter=1000, **params),
+}
+
+# TfidfVectorizer parameters that change which n-grams are counted (the cache key)
+ANALYZER_PARAMS = ("ngram_range", "stop_words", "lowercase", "token_pattern")
+
+SCORING = "f1_weighted"
+
+# Per-process state for search workers, set once by _init_worker
+_counts: Dict[Tuple, Any] = {}
+_labels: np.ndarray = np.empty(0)
+_folds: List[Tuple[np.ndarray, np.ndarray]] = []
+_classifier = "linearsvc"
+
+
+class StageTimer:
+    """Wall-clock per named stage."""
+
+    def __init__(self):
+        self.seconds: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[name] = round(time.perf_counter() - started, 3)
+            logger.info(f"{name}: {self.seconds[name]:.2f}s")
+
+
+def texts_and_labels(df) -> Tuple[List[str], np.ndarray]:
+    """Training texts (title + text, as model_inputs) and Positive/Negative labels from a canonical review frame."""
+    df = df.dropna(subset=["Review_Text", "Reviewer_Rating"])
+    titles = df["Review_Title"].fillna("").astype(str) if "Review_Title" in df else ""
+    texts = model_inputs((df["Review_Text"].astype(str) + " " + titles).str.strip().tolist())
+    labels = np.where(df["Reviewer_Rating"].astype(float) > 3, "Positive", "Negative")
+    return texts, labels
+
+
+def load_training_data(data_dir: str = None, product: str = None) -> Tuple[List[str], np.ndarray]:
+    """texts_and_labels over every bundled CSV (or one product's), read from the cleaned columnar cache."""
+    filters = [("Product", "=", product)] if product else None
+    df = load_reviews(columns=["Review_Title", "Review_Text", "Reviewer_Rating"], filters=filters, data_dir=data_dir)
+    if df.empty:
+        raise ValueError(f"No reviews found for product {product!r}")
+    return texts_and_labels(df)
+
+
+def split_params(params: Dict[str, Any]) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """`tfidf__x` / `model__y` grid entries -> (TfidfVectorizer kwargs, classifier kwargs)."""
+    tfidf, model = dict(TFIDF_DEFAULTS), {}
+    for key, value in params.items():
+        step, name = key.split("__", 1)
+        (tfidf if step == "tfidf" else model)[name] = value
+    return tfidf, model
+
+
+def analyzer_key(tfidf_params: Dict[str, Any]) -> Tuple:
+    return tuple((p, tfidf_params[p]) for p in ANALYZER_PARAMS if p in tfidf_params)
+
+
+def count_ngrams(texts: List[str], key: Tuple) -> Any:
+    """Raw n-gram counts over the whole corpus, no document-frequency filtering."""
+    return CountVectorizer(min_df=1, max_df=1.0, **dict(key)).fit_transform(texts).tocsr()
+
+
+def select_features(train_counts: Any, tfidf_params: Dict[str, Any]) -> np.ndarray:
+    """Columns TfidfVectorizer.fit would keep for these training rows (mirrors _limit_features)."""
+    n_docs = train_counts.shape[0]
+    max_df, min_df = tfidf_params.get("max_df", 1.0), tfidf_params.get("min_df", 1)
+    high = max_df if isinstance(max_df, int) else max_df * n_docs
+    low = min_df if isinstance(min_df, int) else min_df * n_docs
+    dfs = np.bincount(train_counts.indices, minlength=train_counts.shape[1])
+    # Terms that never occur in the training rows are dropped like unseen vocabulary
+    mask = (dfs <= high) & (dfs >= max(low, 1))
+    limit = tfidf_params.get("max_features")
+    if limit is not None and mask.sum() > limit:
+        tfs = np.asarray(train_counts.sum(axis=0)).ravel()
+        mask_inds = (-tfs[mask]).argsort()[:limit]
+        new_mask = np.zeros(len(dfs), dtype=bool)
+        new_mask[np.where(mask)[0][mask_inds]] = True
+        mask = new_mask
+    return np.flatnonzero(mask)
+
+
+def tfidf_features(counts: Any, train_idx: np.ndarray, test_idx: np.ndarray, tfidf_params: Dict[str, Any]):
+    """(X_train, X_test) equal to TfidfVectorizer(**tfidf_params) fit on the training rows."""
+    train_counts = counts[train_idx]
+    cols = select_features(train_counts, tfidf_params)
+    transformer = TfidfTransformer(
+        norm=tfidf_params.get("norm", "l2"),
+        use_idf=tfidf_params.get("use_idf", True),
+        smooth_idf=tfidf_params.get("smooth_idf", True),
+        sublinear_tf=tfidf_params.get("sublinear_tf", False),
+    )
+    X_train = transformer.fit_transform(train_counts[:, cols])
+    X_test = transformer.transform(counts[test_idx][:, cols])
+    return X_train, X_test
+
+
+def _init_worker(counts: Dict[Tuple, Any], labels: np.ndarray, folds, classifier: str) -> None:
+    global _counts, _labels, _folds, _classifier
+    _counts, _labels, _folds, _classifier = counts, labels, folds, classifier
+
+
+def _search_task(fold: int, tfidf_grid_params: Dict[str, Any], model_grid: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Vectorize one fold once, then fit and score every classifier setting on it."""
+    train_idx, test_idx = _folds[fold]
+    tfidf_params, _ = split_params(tfidf_grid_params)
+    started = time.perf_counter()
+    X_train, X_test = tfidf_features(_counts[analyzer_key(tfidf_params)], train_idx, test_idx, tfidf_params)
+    vectorize_s = time.perf_counter() - started
+    results = []
+    for model_params in model_grid:
+        started = time.perf_counter()
+        clf = CLASSIFIERS[_classifier](**{k.split("__", 1)[1]: v for k, v in model_params.items()})
+        clf.fit(X_train, _labels[train_idx])
+        score = f1_score(_labels[test_idx], clf.predict(X_test), average="weighted")
+        results.append({
+            "params": {**tfidf_grid_params, **model_params},
+            "fold": fold,
+            "score": float(score),
+            "vectorize_s": vectorize_s,
+            "fit_s": time.perf_counter() - started,
+        })
+    return results
+
+
+def grid_search(texts: List[str], labels: np.ndarray, param_grid: Dict[str, List[Any]], folds: int,
+                workers: int, classifier: str, seed: int, timer: StageTimer) -> List[Dict[str, Any]]:
+    """Mean cross-validated score per parameter setting, best first."""
+    tfidf_grid = list(ParameterGrid({k: v for k, v in param_grid.items() if k.startswith("tfidf__")}))
+    model_grid = list(ParameterGrid({k: v for k, v in param_grid.items() if k.startswith("model__")}))
+    splits = list(StratifiedKFold(n_splits=folds, shuffle=True, random_state=seed).split(texts, labels))
+
+    with timer.stage("count_ngrams"):
+        keys = {analyzer_key(split_params(p)[0]) for p in tfidf_grid}
+        counts = {key: count_ngrams(texts, key) for key in keys}
+
+    per_fold: List[Dict[str, Any]] = []
+    with timer.stage("search"):
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(counts, labels, splits, classifier)) as pool:
+            futures = [pool.submit(_search_task, fold, p, model_grid) for fold in range(folds) for p in tfidf_grid]
+            for future in as_completed(futures):
+                per_fold.extend(future.result())
+
+    by_params: Dict[str, Dict[str, Any]] = {}
+    for r in per_fold:
+        key = json.dumps(r["params"], sort_keys=True, default=list)
+        entry = by_params.setdefault(key, {"params": r["params"], "scores": [], "fit_s": 0.0})
+        entry["scores"].append(r["score"])
+        entry["fit_s"] += r["fit_s"]
+    ranked = []
+    for entry in by_params.values():
+        ranked.append({
+            "params": entry["params"],
+            "mean_score": round(float(np.mean(entry["scores"])), 5),
+            "std_score": round(float(np.std(entry["scores"])), 5),
+            "fit_s": round(entry["fit_s"], 3),
+        })
+    ranked.sort(key=lambda r: -r["mean_score"])
+    return ranked
+
+
+def build_pipeline(params: Dict[str, Any], classifier: str) -> Pipeline:
+    tfidf_params, model_params = split_params(params)
+    return Pipeline([
+        ("tfidf", TfidfVectorizer(**tfidf_params)),
+        ("model", CLASSIFIERS[classifier](**model_params)),
+    ])
+
+
+def write_artifact(pipeline: Pipeline, output_dir: str) -> str:
+    """Pickle the pipeline as <output_dir>/model-<timestamp>.pkl; returns the path."""
+    os.makedirs(output_dir, exist_ok=True)
+    path = os.path.join(output_dir, f"model-{time.strftime('%Y%m%d-%H%M%S')}.pkl")
+    with open(path, "wb") as f:
+        pickle.dump(pipeline, f)
+    return path
+
+
+def install_artifact(path: str, target: str) -> None:
+    """Copy next to the target and rename over it, so readers never see a partial file."""
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(target)), suffix=".tmp")
+    os.close(fd)
+    try:
+        shutil.copyfile(path, tmp)
+        os.replace(tmp, target)
+    except BaseException:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data-dir", default=None, help="folder with reviews_*/data.csv (default: bundled)")
+    parser.add_argument("--product", default=None, help="train on one product's reviews only (e.g. tea)")
+    parser.add_argument("--classifier", choices=sorted(CLASSIFIERS), default="linearsvc")
+    parser.add_argument("--folds", type=int, default=5)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--test-size", type=float, default=0.2, help="held-out fraction for the final check")
+    parser.add_argument("--seed", type=int, default=45)
+    parser.add_argument("--quick", action="store_true", help="small grid for smoke runs")
+    parser.add_argument("--output-dir", default=os.path.join(HERE, "models"))
+    parser.add_argument("--install", nargs="?", const=os.path.join(HERE, "model.pkl"), default=None,
+                        metavar="PATH", help="also replace PATH (default: model.pkl next to app.py)")
+    args = parser.parse_args(argv)
+
+    timer = StageTimer()
+    started = time.perf_counter()
+    with timer.stage("load_data"):
+        texts, labels = load_training_data(args.data_dir, args.product)
+    train_texts, test_texts, y_train, y_test = train_test_split(
+        texts, labels, test_size=args.test_size, random_state=args.seed, stratify=labels
+    )
+    logger.info(f"{len(texts)} reviews ({int((labels == 'Positive').sum())} positive), "
+                f"{len(train_texts)} for search, {len(test_texts)} held out")
+
+    grid = QUICK_PARAM_GRID if args.quick else PARAM_GRID
+    ranked = grid_search(train_texts, y_train, grid, args.folds, args.workers, args.classifier, args.seed, timer)
+    best = ranked[0]
+    logger.info(f"Best {SCORING} {best['mean_score']:.4f} (+/- {best['std_score']:.4f}) with {best['params']}")
+
+    with timer.stage("refit"):
+        pipeline = build_pipeline(best["params"], args.classifier).fit(train_texts, y_train)
+    with timer.stage("evaluate"):
+        y_pred = pipeline.predict(test_texts)
+        holdout = {
+            SCORING: round(float(f1_score(y_test, y_pred, average="weighted")), 5),
+            "f1_negative": round(float(f1_score(y_test, y_pred, pos_label="Negative")), 5),
+            "accuracy": round(float((y_pred == y_test).mean()), 5),
+        }
+    logger.info(f"Held-out: {holdout}")
+
+    metadata = {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "sklearn": sklearn.__version__,
+        "classifier": args.classifier,
+        # Serve the model with the same PREPROCESS_TEXTS setting
+        "preprocess_texts": PREPROCESS_TEXTS,
+        "best_params": best["params"],
+        "cv": {"folds": args.folds, "scoring": SCORING, "mean": best["mean_score"], "std": best["std_score"]},
+        "holdout": holdout,
+        "data": {"product": args.product, "reviews": len(texts), "train": len(train_texts), "test": len(test_texts)},
+        "search": ranked,
+        "workers": args.workers,
+    }
+    with timer.stage("save"):
+        path = write_artifact(pipeline, args.output_dir)
+        if args.install:
+            install_artifact(path, args.install)
+    # Same version string the API reports for this file (app.load_model_handle)
+    metadata["model_version"] = file_digest(path)[:16]
+    metadata["artifact"] = os.path.basename(path)
+    metadata["stages_s"] = timer.seconds
+    metadata["total_s"] = round(time.perf_counter() - started, 3)
+    with open(os.path.splitext(path)[0] + ".json", "w") as f:
+        json.dump(metadata, f, indent=2, default=list)
+
+    logger.info(f"Wrote {path} (version {metadata['model_version']}) in {metadata['total_s']:.1f}s; stages {timer.seconds}")
+    if args.install:
+        logger.info(f"Installed as {args.install}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())